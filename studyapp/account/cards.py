@@ -0,0 +1,137 @@
+"""
+Cached user cards: the request-independent view of a user that chat messages,
+thread lists and user pickers render next to every row.
+
+Cards live in the "shared" cache alias (Redis, or a node-local file cache; see
+CACHES), so every worker sees the same entries. They are cached per user under
+a version token. A User/Student/Teacher save replaces the token once its
+transaction commits (see account.signals), so a card built from pre-commit
+data can never be served again, by any worker. Rendering N rows costs one
+`get_many` for the versions plus one for the cards, and a single query for the
+users that missed.
+"""
+from __future__ import annotations
+
+import uuid
+from typing import Iterable
+
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+from .models import User
+
+# Bump when the card layout changes so old entries are ignored.
+CARD_SCHEMA = 1
+CARD_TTL_SECONDS = 3600
+# Avatar thumbnails are derived in the background; re-check soon while pending.
+PENDING_AVATAR_TTL_SECONDS = 60
+
+# Versions must be seen by every worker, hence not the per-process default cache.
+cache = ConnectionProxy(caches, "shared")
+
+_VERSION_PREFIX = "account:usercard:ver:"
+_CARD_PREFIX = f"account:usercard:{CARD_SCHEMA}:"
+
+
+def _version_key(user_id) -> str:
+    return f"{_VERSION_PREFIX}{user_id}"
+
+
+def _card_key(user_id, version) -> str:
+    return f"{_CARD_PREFIX}{user_id}:{version}"
+
+
+def _display_id(user: User) -> str:
+    try:
+        if user.role == "STUDENT" and hasattr(user, "student_profile"):
+            return str(user.student_profile.student_id).zfill(4)
+        if user.role == "TEACHER" and hasattr(user, "teacher_profile") and user.teacher_profile.teacher_id:
+            return str(user.teacher_profile.teacher_id).zfill(4)
+    except Exception:
+        pass
+    # Fallback: short UUID
+    return str(user.id).split("-")[0]
+
+
+def build_user_card(user: User) -> tuple[dict, bool]:
+    """
+    Card for one user, and whether its avatar thumbnail is still pending.
+    Avatar URLs are site-relative; callers make them absolute per request.
+    """
+    from uploads.thumbnails import needs_derivatives, thumb_url
+
+    avatar_url, pending = None, False
+    picture = getattr(user, "profile_picture", None)
+    if picture and picture.name:
+        thumb = thumb_url(picture)
+        avatar_url = thumb or picture.url
+        pending = thumb is None and needs_derivatives(picture)
+    full_name = user.get_full_name()
+    card = {
+        "id": str(user.id),
+        "name": full_name or user.email,
+        "full_name": full_name,
+        "email": user.email,
+        "role": user.role,
+        "role_display": user.get_role_display(),
+        "display_id": _display_id(user),
+        "avatar_url": avatar_url,
+    }
+    return card, pending
+
+
+def get_user_cards(user_ids: Iterable, users: Iterable[User] = ()) -> dict[str, dict]:
+    """
+    Cards keyed by user id (str). `users` are already-loaded instances used for
+    cache misses before querying; unknown ids are left out.
+    """
+    ids = list(dict.fromkeys(str(uid) for uid in user_ids if uid))
+    if not ids:
+        return {}
+    versions = cache.get_many([_version_key(uid) for uid in ids])
+    unversioned = [uid for uid in ids if _version_key(uid) not in versions]
+    if unversioned:
+        # First read, or the version was evicted: start a fresh one (whichever
+        # worker's `add` wins), so cards cached under an older version stay unreachable.
+        for uid in unversioned:
+            cache.add(_version_key(uid), uuid.uuid4().hex, timeout=None)
+        versions.update(cache.get_many([_version_key(uid) for uid in unversioned]))
+    keys = {uid: _card_key(uid, versions.get(_version_key(uid), "")) for uid in ids}
+    found = cache.get_many(list(keys.values()))
+    cards = {uid: found[key] for uid, key in keys.items() if key in found}
+
+    missing = [uid for uid in ids if uid not in cards]
+    if not missing:
+        return cards
+    known = {str(u.id): u for u in users}
+    to_load = [uid for uid in missing if uid not in known]
+    if to_load:
+        known.update(
+            (str(u.id), u)
+            for u in User.objects.filter(id__in=to_load).select_related("student_profile", "teacher_profile")
+        )
+    fresh, pending = {}, {}
+    for uid in missing:
+        user = known.get(uid)
+        if user is None:
+            continue
+        card, avatar_pending = build_user_card(user)
+        cards[uid] = card
+        (pending if avatar_pending else fresh)[keys[uid]] = card
+    if fresh:
+        cache.set_many(fresh, timeout=CARD_TTL_SECONDS)
+    if pending:
+        cache.set_many(pending, timeout=PENDING_AVATAR_TTL_SECONDS)
+    return cards
+
+
+def get_user_card(user: User) -> dict:
+    return get_user_cards([user.id], users=[user])[str(user.id)]
+
+
+def invalidate_user_card(user_id) -> None:
+    """
+    Retire the cached card of `user_id`: later reads, in any worker, use a new
+    version key. A random token needs no atomic increment from the backend.
+    """
+    cache.set(_version_key(user_id), uuid.uuid4().hex, timeout=None)
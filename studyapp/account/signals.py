@@ -1,5 +1,6 @@
 import random
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from .models import User, Student, Teacher, CSRep, Admin, UserNotificationSettings
 
@@ -29,6 +30,58 @@ def create_user_profile(sender, instance, created, **kwargs):
         UserNotificationSettings.objects.create(user=instance)
 
 
+# Dashboard entity types of each role's users (see realtime.sections).
+ROLE_ENTITIES = {'STUDENT': 'student', 'TEACHER': 'teacher', 'CS_REP': 'csrep'}
+
+
+def invalidate_user_sections(user):
+    """
+    Mark admin/CS-Rep sections listing users of this role as stale (best-effort).
+    """
+    entity = ROLE_ENTITIES.get(user.role)
+    if not entity:
+        return
+    try:
+        from realtime.sections import invalidate_sections
+
+        invalidate_sections(entity, roles=('ADMIN', 'CS_REP'), data={'user_id': str(user.id)})
+    except Exception:
+        pass
+
+
+@receiver(post_save, sender=User)
+def user_created_sections(sender, instance, created, **kwargs):
+    if created:
+        invalidate_user_sections(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted_sections(sender, instance, **kwargs):
+    invalidate_user_sections(instance)
+
+
+def _invalidate_card_on_commit(user_id):
+    # After commit: a reader in between would otherwise re-cache the old data.
+    from .cards import invalidate_user_card
+
+    transaction.on_commit(lambda: invalidate_user_card(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_card_changed(sender, instance, **kwargs):
+    # Every login saves last_login alone, which no card shows.
+    if kwargs.get('update_fields') == {'last_login'}:
+        return
+    _invalidate_card_on_commit(instance.id)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+def profile_card_changed(sender, instance, **kwargs):
+    _invalidate_card_on_commit(instance.user_id)
+
+
 def generate_unique_student_id():
     """
     Generate a unique 4-digit student ID (1000-9999).
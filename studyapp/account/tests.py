@@ -1,3 +1,49 @@
-from django.test import TestCase
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+from .cards import get_user_card
+from .models import User
+
+# A fresh in-memory "shared" cache instead of the on-disk one other processes use.
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'account-tests'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class UserCardTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.student = User.objects.create_user('student@example.com', 'student', 'pw', role='STUDENT')
+        self.teacher = User.objects.create_user('teacher@example.com', 'teacher', 'pw', role='TEACHER')
+
+    def _save(self, obj, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            obj.save(**kwargs)
+
+    def test_user_save_invalidates_card(self):
+        self.assertEqual(get_user_card(self.student)['role'], 'STUDENT')
+        self.student.first_name = 'Ada'
+        self._save(self.student)
+        # A fresh instance: the card must come from the cache, not the one passed in.
+        self.assertEqual(get_user_card(User.objects.get(id=self.student.id))['full_name'], 'Ada')
+
+    def test_profile_saves_invalidate_card(self):
+        for user, profile, field in (
+            (self.student, self.student.student_profile, 'student_id'),
+            (self.teacher, self.teacher.teacher_profile, 'teacher_id'),
+        ):
+            get_user_card(user)
+            setattr(profile, field, 4321)
+            self._save(profile)
+            fresh = User.objects.get(id=user.id)
+            self.assertEqual(get_user_card(fresh)['display_id'], '4321')
+
+    def test_login_does_not_invalidate_card(self):
+        get_user_card(self.student)
+        version = caches['shared'].get(f'account:usercard:ver:{self.student.id}')
+        self.student.last_login = timezone.now()
+        self._save(self.student, update_fields=['last_login'])
+        self.assertEqual(caches['shared'].get(f'account:usercard:ver:{self.student.id}'), version)
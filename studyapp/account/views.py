@@ -23,9 +23,11 @@ from django.db.models import Q
 from .models import User, Student, Teacher, CSRep, Admin, TeacherFeedback, TeacherReport, MaskedLink, Visitor
 from .decorators import student_required, teacher_required, csrep_required, admin_required
 from .utils import log_security_event, generate_masked_link
+from .signals import invalidate_user_sections
 from assingment.models import Assignment, TeacherAssignment, AssignmentFile, AssignmentFeedback
 from invoice.models import Invoice
 from todo.models import Todo
+from realtime.sections import invalidate_sections
 from django.views.decorators.http import require_GET
 
 
@@ -1125,6 +1127,7 @@ def teacher_student_feedback_submit_api(request):
             message=message,
             priority=priority or 'normal'
         )
+        invalidate_sections('feedback', user_ids=[request.user.id], roles=('ADMIN',))
         
         from notifications.services import notify_role
         teacher_name = request.user.get_full_name() or request.user.username
@@ -1195,6 +1198,7 @@ def teacher_student_report_submit_api(request):
             severity=severity or 'normal',
             report_date=report_date or timezone.now().date()
         )
+        invalidate_sections('feedback', user_ids=[request.user.id], roles=('ADMIN',))
 
         from notifications.services import notify_role
         teacher_name = request.user.get_full_name() or request.user.username
@@ -1623,6 +1627,7 @@ def toggle_user_status(request):
         if user == request.user or user.role == 'ADMIN': return JsonResponse({'success': False, 'error': 'Cannot block admins.'}, status=403)
         user.is_active = (action == 'unblock')
         user.save()
+        invalidate_user_sections(user)
         return JsonResponse({'success': True, 'message': 'Status updated.', 'is_active': user.is_active})
     except Exception as e: return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
@@ -2260,6 +2265,10 @@ def visitor_form_submit_api(request):
             email=email,
             details=details
         )
+        try:
+            invalidate_sections('visitor', roles=('ADMIN',))
+        except Exception:
+            pass
         
         return JsonResponse({
             'success': True,
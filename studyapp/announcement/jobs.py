@@ -0,0 +1,33 @@
+"""
+Background handlers for announcements (see jobs.queue).
+"""
+from django.utils import timezone
+
+from jobs.queue import register
+
+from .models import Announcement
+from .services import PUBLISH_BATCH, PUBLISH_DUE_JOB, notify_announcement
+
+
+@register(PUBLISH_DUE_JOB)
+def publish_due(job) -> bool:
+    """
+    Publish the next batch of announcements whose `scheduled_at` has passed.
+
+    Rows are claimed with SKIP LOCKED and stamped `published_at` in the same
+    transaction as their notifications, so each is published exactly once
+    however many jobs or workers run at the same time.
+    """
+    now = timezone.now()
+    batch = list(
+        Announcement.objects.select_for_update(skip_locked=True)
+        .filter(published_at__isnull=True, scheduled_at__lte=now)
+        .select_related("author")
+        .order_by("scheduled_at", "id")[:PUBLISH_BATCH]
+    )
+    for ann in batch:
+        ann.published_at = now
+        ann.save(update_fields=["published_at"])
+        notify_announcement(ann)
+    job.progress_done += len(batch)
+    return len(batch) < PUBLISH_BATCH
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:29
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def backfill_published(apps, schema_editor):
+    """
+    Past announcements were published when created; future ones get a
+    publisher job at their scheduled time.
+    """
+    Announcement = apps.get_model('announcement', 'Announcement')
+    Job = apps.get_model('jobs', 'Job')
+    now = timezone.now()
+    Announcement.objects.filter(scheduled_at__lte=now).update(published_at=F('scheduled_at'))
+    Job.objects.bulk_create(
+        Job(kind='announcements.publish_due', payload={'announcement_id': ann_id}, available_at=at)
+        for ann_id, at in Announcement.objects.filter(scheduled_at__gt=now).values_list('id', 'scheduled_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcement', '0006_alter_announcement_id'),
+        ('jobs', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='published_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(condition=models.Q(('published_at__isnull', True)), fields=['scheduled_at'], name='announcements_due_idx'),
+        ),
+        migrations.RunPython(backfill_published, migrations.RunPython.noop),
+    ]
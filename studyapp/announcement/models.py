@@ -24,6 +24,8 @@ class Announcement(models.Model):
     tags = models.JSONField(default=list, blank=True)
     
     scheduled_at = models.DateTimeField(default=timezone.now)
+    # Set once its notifications went out (at creation, or by the scheduled publisher).
+    published_at = models.DateTimeField(null=True, blank=True)
     send_email = models.BooleanField(default=True)
     pin_to_dashboard = models.BooleanField(default=False)
     
@@ -33,6 +35,14 @@ class Announcement(models.Model):
     class Meta:
         ordering = ['-created_at']
         db_table = 'announcements'
+        indexes = [
+            # Due scan of the scheduled publisher: unpublished rows only.
+            models.Index(
+                fields=['scheduled_at'],
+                name='announcements_due_idx',
+                condition=models.Q(published_at__isnull=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title
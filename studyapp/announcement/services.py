@@ -0,0 +1,71 @@
+from notifications.broadcasts import broadcast
+from notifications.services import notify_users
+from realtime.sections import invalidate_sections
+
+from account.models import User
+
+# Job kind publishing due scheduled announcements (handler in announcement/jobs.py).
+PUBLISH_DUE_JOB = "announcements.publish_due"
+PUBLISH_BATCH = 50
+
+
+def announcement_roles(ann):
+    """
+    Roles that see the announcement as a whole (admins always do).
+    """
+    roles = {"ADMIN"}
+    if ann.all_students:
+        roles.add("STUDENT")
+    if ann.all_teachers:
+        roles.add("TEACHER")
+    if ann.all_csreps:
+        roles.add("CS_REP")
+    return roles
+
+
+def notify_announcement(ann):
+    """
+    Notify an announcement's audience and refresh their announcement lists.
+
+    Whole roles get one broadcast notification each (stored once, merged into
+    feeds on read); specific recipients outside those roles get personal rows.
+    """
+    fields = {
+        "actor": ann.author,
+        "notification_type": "announcement",
+        "title": "New announcement",
+        "message": f"{ann.title}",
+        "related_entity_type": "announcement",
+        "related_entity_id": str(ann.id),
+    }
+    broadcast_roles = announcement_roles(ann) - {"ADMIN"}
+    broadcast(roles=sorted(broadcast_roles), **fields)
+
+    specific_qs = (
+        User.objects.filter(received_announcements=ann, is_active=True)
+        .exclude(role__in=broadcast_roles)
+        .exclude(id=ann.author_id)
+    )
+    notify_users(recipients=specific_qs, **fields)
+
+    # Real-time UI sync: prompt recipients to refresh announcements instantly
+    try:
+        invalidate_sections(
+            "announcement",
+            user_ids=ann.specific_recipients.values_list("id", flat=True),
+            # Admins can always see announcements list
+            roles=announcement_roles(ann),
+            data={"announcement_id": str(ann.id), "action": "published"},
+        )
+    except Exception:
+        pass
+
+
+def schedule_publication(ann):
+    """
+    Queue the publisher for `ann.scheduled_at`; any due announcements are
+    published by whichever publish job runs first.
+    """
+    from jobs.queue import enqueue
+
+    enqueue(PUBLISH_DUE_JOB, {"announcement_id": ann.id}, run_at=ann.scheduled_at)
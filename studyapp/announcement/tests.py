@@ -1,3 +1,54 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+
+from account.models import User
+from jobs.models import Job
+from jobs.queue import run_until_idle
+from notifications.models import BroadcastNotification
+
+from .models import Announcement
+from .services import PUBLISH_DUE_JOB, schedule_publication
+
+
+class ScheduledAnnouncementTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin@example.com', 'admin', 'pw', role='ADMIN')
+
+    def _bring_due(self, ann):
+        # Let the scheduled time pass.
+        past = timezone.now() - timedelta(seconds=1)
+        Announcement.objects.filter(id=ann.id).update(scheduled_at=past)
+        Job.objects.filter(kind=PUBLISH_DUE_JOB).update(available_at=past)
+
+    def _broadcasts(self, ann):
+        return BroadcastNotification.objects.filter(related_entity_type='announcement', related_entity_id=str(ann.id))
+
+    def test_published_once_when_due(self):
+        ann = Announcement.objects.create(
+            title='Exam week', content='...', author=self.admin, all_teachers=True,
+            scheduled_at=timezone.now() + timedelta(hours=1),
+        )
+        schedule_publication(ann)
+
+        self.assertEqual(run_until_idle(kinds=[PUBLISH_DUE_JOB]), 0)
+        ann.refresh_from_db()
+        self.assertIsNone(ann.published_at)
+        self.assertFalse(self._broadcasts(ann).exists())
+
+        self._bring_due(ann)
+        self.assertEqual(run_until_idle(kinds=[PUBLISH_DUE_JOB]), 1)
+        ann.refresh_from_db()
+        published_at = ann.published_at
+        self.assertIsNotNone(published_at)
+        self.assertEqual(list(self._broadcasts(ann).values_list('audience_role', flat=True)), ['TEACHER'])
 
-# Create your tests here.
+        # A second publish run (another job, a restart) finds nothing left to publish.
+        schedule_publication(ann)
+        self._bring_due(ann)
+        self.assertEqual(run_until_idle(kinds=[PUBLISH_DUE_JOB]), 1)
+        ann.refresh_from_db()
+        self.assertEqual(ann.published_at, published_at)
+        self.assertEqual(self._broadcasts(ann).count(), 1)
+        self.assertFalse(Job.objects.filter(kind=PUBLISH_DUE_JOB).exclude(status=Job.STATUS_DONE).exists())
@@ -8,7 +8,9 @@ from django.db.models import Q
 import json
 from .models import Announcement
 from account.models import User, Student, Teacher, CSRep
-from realtime.services import publish_to_role, publish_to_users
+from realtime.sections import invalidate_sections
+from .services import announcement_roles, notify_announcement, schedule_publication
+
 
 @login_required
 def get_announcements(request):
@@ -53,6 +55,7 @@ def get_announcements(request):
             'author_avatar': ann.author.profile_picture.url if ann.author.profile_picture else None,
             'tags': ann.tags,
             'scheduled_at': ann.scheduled_at.isoformat(),
+            'published': ann.published_at is not None,
             'created_at': ann.created_at.isoformat(),
             'pin_to_dashboard': ann.pin_to_dashboard,
             'all_students': ann.all_students,
@@ -127,45 +130,11 @@ def create_announcement(request):
             now = timezone.now()
             is_published_now = (ann.scheduled_at is None) or (ann.scheduled_at <= now)
             if is_published_now:
-                from notifications.services import notify_users
-
-                recipients_qs = User.objects.none()
-                if ann.all_students:
-                    recipients_qs = recipients_qs | User.objects.filter(role="STUDENT", is_active=True)
-                if ann.all_teachers:
-                    recipients_qs = recipients_qs | User.objects.filter(role="TEACHER", is_active=True)
-                if ann.all_csreps:
-                    recipients_qs = recipients_qs | User.objects.filter(role="CS_REP", is_active=True)
-
-                specific_qs = ann.specific_recipients.all()
-                recipients_qs = (recipients_qs | specific_qs).exclude(id=request.user.id).distinct()
-
-                notify_users(
-                    recipients=recipients_qs,
-                    actor=request.user,
-                    notification_type="announcement",
-                    title="New announcement",
-                    message=f"{ann.title}",
-                    related_entity_type="announcement",
-                    related_entity_id=str(ann.id),
-                )
-
-                # Real-time UI sync: prompt recipients to refresh announcements instantly
-                try:
-                    recipient_ids = list(recipients_qs.values_list("id", flat=True))
-                    publish_to_users(
-                        user_ids=[str(uid) for uid in recipient_ids],
-                        event="announcement.changed",
-                        data={"announcement_id": str(ann.id), "action": "published"},
-                    )
-                    # Admins can always see announcements list; include them too (excluding author already handled client-side)
-                    publish_to_role(
-                        role="ADMIN",
-                        event="announcement.changed",
-                        data={"announcement_id": str(ann.id), "action": "published"},
-                    )
-                except Exception:
-                    pass
+                ann.published_at = now
+                ann.save(update_fields=['published_at'])
+                notify_announcement(ann)
+            else:
+                schedule_publication(ann)
         except Exception:
             # Never block announcement creation if notification fanout fails
             pass
@@ -190,18 +159,11 @@ def delete_announcement(request, announcement_id):
     # Capture recipients for real-time removal before delete
     try:
         recipient_ids = set(ann.specific_recipients.values_list("id", flat=True))
-        if ann.all_students:
-            recipient_ids.update(User.objects.filter(role="STUDENT", is_active=True).values_list("id", flat=True))
-        if ann.all_teachers:
-            recipient_ids.update(User.objects.filter(role="TEACHER", is_active=True).values_list("id", flat=True))
-        if ann.all_csreps:
-            recipient_ids.update(User.objects.filter(role="CS_REP", is_active=True).values_list("id", flat=True))
         recipient_ids.add(ann.author_id)
-        # Admins always have visibility
-        recipient_ids.update(User.objects.filter(role="ADMIN", is_active=True).values_list("id", flat=True))
-        publish_to_users(
-            user_ids=[str(uid) for uid in recipient_ids if uid],
-            event="announcement.changed",
+        invalidate_sections(
+            "announcement",
+            user_ids=recipient_ids,
+            roles=announcement_roles(ann),
             data={"announcement_id": str(ann.id), "action": "deleted"},
         )
     except Exception:
@@ -6,11 +6,14 @@ from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.utils import timezone
+from django.db import transaction
 from .models import Assignment, AssignmentFile, TeacherAssignment, AssignmentFeedback
 from account.models import Student, Teacher, User
 from account.decorators import student_required, teacher_required, admin_required
 from account.utils import generate_masked_link
-from realtime.services import publish_to_role, publish_to_users
+from realtime.sections import invalidate_sections
+from uploads.services import ChunkedUploadFile, UploadError, files_from_request
+from uploads.thumbnails import thumb_url
 
 @login_required
 @csrf_exempt
@@ -51,190 +54,200 @@ def create_assignment(request):
         # Additional features
         features = request.POST.getlist('features')
         
-        # Parse dates - due_date is date input, exam_date is datetime-local
-        due_date = None
-        if due_date_str:
+        # One transaction from the claim to the last attachment: a claimed upload
+        # is only spent (and its partial removed) if the assignment is stored with it.
+        with transaction.atomic():
+            # Supporting files: multipart `supportFiles` plus finalized chunked uploads
+            # (`upload_tokens`). Claimed before anything is created so a bad token rejects the request.
             try:
-                # Parse date string (YYYY-MM-DD) and convert to datetime
-                from datetime import datetime
-                due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
-                # Set to end of day
-                due_date = due_date.replace(hour=23, minute=59, second=59)
-                due_date = timezone.make_aware(due_date) if timezone.is_naive(due_date) else due_date
-            except (ValueError, TypeError) as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to parse due_date '{due_date_str}': {e}")
+                files = files_from_request(request, 'supportFiles')
+            except UploadError as e:
+                return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
         
-        exam_date = None
-        if exam_date_str:
-            try:
-                # Parse datetime-local string (YYYY-MM-DDTHH:MM)
-                from datetime import datetime
-                exam_date = datetime.strptime(exam_date_str, '%Y-%m-%dT%H:%M')
-                exam_date = timezone.make_aware(exam_date) if timezone.is_naive(exam_date) else exam_date
-            except (ValueError, TypeError) as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to parse exam_date '{exam_date_str}': {e}")
+            # Parse dates - due_date is date input, exam_date is datetime-local
+            due_date = None
+            if due_date_str:
+                try:
+                    # Parse date string (YYYY-MM-DD) and convert to datetime
+                    from datetime import datetime
+                    due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
+                    # Set to end of day
+                    due_date = due_date.replace(hour=23, minute=59, second=59)
+                    due_date = timezone.make_aware(due_date) if timezone.is_naive(due_date) else due_date
+                except (ValueError, TypeError) as e:
+                    import logging
+                    logger = logging.getLogger(__name__)
+                    logger.warning(f"Failed to parse due_date '{due_date_str}': {e}")
         
-        # Generate unique assignment code
-        assignment_code = Assignment.generate_assignment_code(student)
+            exam_date = None
+            if exam_date_str:
+                try:
+                    # Parse datetime-local string (YYYY-MM-DDTHH:MM)
+                    from datetime import datetime
+                    exam_date = datetime.strptime(exam_date_str, '%Y-%m-%dT%H:%M')
+                    exam_date = timezone.make_aware(exam_date) if timezone.is_naive(exam_date) else exam_date
+                except (ValueError, TypeError) as e:
+                    import logging
+                    logger = logging.getLogger(__name__)
+                    logger.warning(f"Failed to parse exam_date '{exam_date_str}': {e}")
         
-        # Create assignment
-        assignment = Assignment.objects.create(
-            assignment_code=assignment_code,
-            student=student,
-            title=title,
-            service_type=service_type,
-            priority=priority,
-            due_date=due_date,
-            exam_date=exam_date,
-            description=description,
-            writing_type=writing_type if writing_type else None,
-            num_pages=int(num_pages) if num_pages and num_pages.isdigit() else None,
-            online_paper_type=solve_paper_type if solve_paper_type else None,
-            other_paper_type=other_paper_input if other_paper_input else None,
-            additional_features=features,
-            status='pending'
-        )
+            # Generate unique assignment code
+            assignment_code = Assignment.generate_assignment_code(student)
         
-        # Handle supporting file uploads
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"=== Assignment Creation Debug ===")
-        logger.info(f"Assignment ID: {assignment.id}")
-        logger.info(f"Assignment Code: {assignment_code}")
-        logger.info(f"Request Content-Type: {request.content_type}")
-        logger.info(f"Request Method: {request.method}")
-        logger.info(f"request.FILES keys: {list(request.FILES.keys())}")
-        logger.info(f"request.POST keys: {list(request.POST.keys())}")
+            # Create assignment
+            assignment = Assignment.objects.create(
+                assignment_code=assignment_code,
+                student=student,
+                title=title,
+                service_type=service_type,
+                priority=priority,
+                due_date=due_date,
+                exam_date=exam_date,
+                description=description,
+                writing_type=writing_type if writing_type else None,
+                num_pages=int(num_pages) if num_pages and num_pages.isdigit() else None,
+                online_paper_type=solve_paper_type if solve_paper_type else None,
+                other_paper_type=other_paper_input if other_paper_input else None,
+                additional_features=features,
+                status='pending'
+            )
         
-        files = request.FILES.getlist('supportFiles')
-        uploaded_file_count = 0
-        saved_file_ids = []
-        file_errors = []
+            # Handle supporting file uploads
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.info(f"=== Assignment Creation Debug ===")
+            logger.info(f"Assignment ID: {assignment.id}")
+            logger.info(f"Assignment Code: {assignment_code}")
+            logger.info(f"Request Content-Type: {request.content_type}")
+            logger.info(f"Request Method: {request.method}")
+            logger.info(f"request.FILES keys: {list(request.FILES.keys())}")
+            logger.info(f"request.POST keys: {list(request.POST.keys())}")
         
-        logger.info(f"Received {len(files)} file(s) from request.FILES.getlist('supportFiles')")
+            uploaded_file_count = 0
+            saved_file_ids = []
+            file_errors = []
         
-        # Log each file received
-        for idx, f in enumerate(files, 1):
-            logger.info(f"  File {idx}: {f.name} (Size: {f.size} bytes, Content-Type: {getattr(f, 'content_type', 'unknown')})")
+            logger.info(f"Received {len(files)} supporting file(s) (multipart + upload tokens)")
         
-        if len(files) == 0:
-            logger.warning("⚠ WARNING: No files received in request.FILES.getlist('supportFiles')")
-            logger.warning("This could mean:")
-            logger.warning("  1. Files were not included in FormData")
-            logger.warning("  2. FormData was not sent as multipart/form-data")
-            logger.warning("  3. File input name mismatch (expected 'supportFiles')")
-            logger.warning(f"  4. All available FILES keys: {list(request.FILES.keys())}")
+            # Log each file received
+            for idx, f in enumerate(files, 1):
+                logger.info(f"  File {idx}: {f.name} (Size: {f.size} bytes, Content-Type: {getattr(f, 'content_type', 'unknown')})")
         
-        for f in files:
-            try:
-                # Validate file before saving
-                file_name = getattr(f, 'name', None) or 'unnamed_file'
-                if not file_name or file_name.strip() == '':
-                    file_name = f'file_{uploaded_file_count + 1}'
-                
-                # Ensure file_name doesn't exceed max length
-                if len(file_name) > 255:
-                    # Truncate and preserve extension if possible
-                    name, ext = os.path.splitext(file_name)
-                    if ext:
-                        file_name = name[:255-len(ext)] + ext
-                    else:
-                        file_name = file_name[:255]
+            if len(files) == 0:
+                logger.warning("⚠ WARNING: No files received in request.FILES.getlist('supportFiles')")
+                logger.warning("This could mean:")
+                logger.warning("  1. Files were not included in FormData")
+                logger.warning("  2. FormData was not sent as multipart/form-data")
+                logger.warning("  3. File input name mismatch (expected 'supportFiles')")
+                logger.warning(f"  4. All available FILES keys: {list(request.FILES.keys())}")
+        
+            for f in files:
+                try:
+                    # Validate file before saving
+                    file_name = getattr(f, 'name', None) or 'unnamed_file'
+                    if not file_name or file_name.strip() == '':
+                        file_name = f'file_{uploaded_file_count + 1}'
                 
-                # Validate file has content
-                if not hasattr(f, 'size') or f.size == 0:
-                    error_msg = f"File {file_name} is empty (0 bytes)"
-                    logger.warning(error_msg)
-                    file_errors.append(error_msg)
-                    continue
+                    # Ensure file_name doesn't exceed max length
+                    if len(file_name) > 255:
+                        # Truncate and preserve extension if possible
+                        name, ext = os.path.splitext(file_name)
+                        if ext:
+                            file_name = name[:255-len(ext)] + ext
+                        else:
+                            file_name = file_name[:255]
                 
-                # Log file details before saving
-                logger.info(f"Attempting to save file: {file_name} (Size: {f.size} bytes)")
-                logger.info(f"Assignment ID: {assignment.id}, Assignment Code: {assignment.assignment_code}")
-                logger.info(f"User ID: {request.user.id}, Username: {request.user.username}")
-                logger.info(f"File object type: {type(f)}, File name attribute: {getattr(f, 'name', 'N/A')}")
+                    # Validate file has content
+                    if not hasattr(f, 'size') or f.size == 0:
+                        error_msg = f"File {file_name} is empty (0 bytes)"
+                        logger.warning(error_msg)
+                        file_errors.append(error_msg)
+                        continue
                 
-                # Ensure assignment is saved (should already be, but double-check)
-                if assignment.pk is None:
-                    assignment.save()
-                    logger.info(f"Assignment saved with ID: {assignment.id}")
+                    # Log file details before saving
+                    logger.info(f"Attempting to save file: {file_name} (Size: {f.size} bytes)")
+                    logger.info(f"Assignment ID: {assignment.id}, Assignment Code: {assignment.assignment_code}")
+                    logger.info(f"User ID: {request.user.id}, Username: {request.user.username}")
+                    logger.info(f"File object type: {type(f)}, File name attribute: {getattr(f, 'name', 'N/A')}")
                 
-                # Ensure user exists and has a valid ID
-                if not request.user.pk:
-                    raise ValueError("User must be saved before creating file")
+                    # Ensure assignment is saved (should already be, but double-check)
+                    if assignment.pk is None:
+                        assignment.save()
+                        logger.info(f"Assignment saved with ID: {assignment.id}")
                 
-                # Validate file object
-                if not f:
-                    raise ValueError("File object is None")
+                    # Ensure user exists and has a valid ID
+                    if not request.user.pk:
+                        raise ValueError("User must be saved before creating file")
                 
-                # Use database transaction to ensure atomicity
-                from django.db import transaction
-                from django.core.files.base import ContentFile
+                    # Validate file object
+                    if not f:
+                        raise ValueError("File object is None")
                 
-                with transaction.atomic():
-                    # Read file content to ensure it's accessible
-                    try:
-                        # Reset file pointer to beginning
-                        if hasattr(f, 'seek'):
-                            f.seek(0)
+                    # Savepoint: a failed multipart file is skipped without the rest
+                    with transaction.atomic():
+                        # Read file content to ensure it's accessible
+                        try:
+                            # Reset file pointer to beginning
+                            if hasattr(f, 'seek'):
+                                f.seek(0)
                         
-                        # Create the file object using .create() which properly handles FileField
-                        # Django's FileField will handle the file storage automatically
-                        file_obj = AssignmentFile.objects.create(
-                            assignment=assignment,
-                            uploaded_by=request.user,
-                            file=f,
-                            file_name=file_name,
-                            file_type='support'
-                        )
-                    except Exception as save_error:
-                        # If save fails, log detailed info and re-raise to be caught by outer handler
-                        logger.error(f"Error during file save: {save_error}")
-                        logger.error(f"Assignment: {assignment.id} (type: {type(assignment.id)})")
-                        logger.error(f"User: {request.user.id} (type: {type(request.user.id)})")
-                        logger.error(f"File name: {file_name}")
-                        logger.error(f"File object: {f} (type: {type(f)})")
-                        raise
+                            # Create the file object using .create() which properly handles FileField
+                            # Django's FileField will handle the file storage automatically
+                            file_obj = AssignmentFile.objects.create(
+                                assignment=assignment,
+                                uploaded_by=request.user,
+                                file=f,
+                                file_name=file_name,
+                                file_type='support'
+                            )
+                        except Exception as save_error:
+                            # If save fails, log detailed info and re-raise to be caught by outer handler
+                            logger.error(f"Error during file save: {save_error}")
+                            logger.error(f"Assignment: {assignment.id} (type: {type(assignment.id)})")
+                            logger.error(f"User: {request.user.id} (type: {type(request.user.id)})")
+                            logger.error(f"File name: {file_name}")
+                            logger.error(f"File object: {f} (type: {type(f)})")
+                            raise
                 
-                uploaded_file_count += 1
-                saved_file_ids.append(file_obj.id)
-                logger.info(f"✓ File saved successfully: {file_name} (ID: {file_obj.id}, Size: {f.size} bytes)")
-            except Exception as file_error:
-                # Log file upload error but don't fail the entire request
-                file_name = getattr(f, 'name', 'unknown_file')
-                file_size = getattr(f, 'size', 0)
-                error_type = type(file_error).__name__
-                error_full_msg = str(file_error)
+                    uploaded_file_count += 1
+                    saved_file_ids.append(file_obj.id)
+                    logger.info(f"✓ File saved successfully: {file_name} (ID: {file_obj.id}, Size: {f.size} bytes)")
+                except Exception as file_error:
+                    if isinstance(f, ChunkedUploadFile):
+                        # Its token is already spent: fail the request so the claim
+                        # rolls back and the upload can be sent again.
+                        raise
+                    # Log file upload error but don't fail the entire request
+                    file_name = getattr(f, 'name', 'unknown_file')
+                    file_size = getattr(f, 'size', 0)
+                    error_type = type(file_error).__name__
+                    error_full_msg = str(file_error)
                 
-                # Try to extract more details from database errors
-                if 'null value' in error_full_msg.lower() or 'not null' in error_full_msg.lower():
-                    logger.error("="*60)
-                    logger.error("DATABASE CONSTRAINT ERROR DETECTED")
-                    logger.error("="*60)
-                    logger.error(f"Error type: {error_type}")
-                    logger.error(f"Full error message: {error_full_msg}")
-                    logger.error(f"Assignment ID: {assignment.id}")
-                    logger.error(f"Assignment PK: {assignment.pk}")
-                    logger.error(f"User ID: {request.user.id}")
-                    logger.error(f"User PK: {request.user.pk}")
-                    logger.error(f"File name: {file_name}")
-                    logger.error(f"File size: {file_size}")
-                    logger.error("="*60)
+                    # Try to extract more details from database errors
+                    if 'null value' in error_full_msg.lower() or 'not null' in error_full_msg.lower():
+                        logger.error("="*60)
+                        logger.error("DATABASE CONSTRAINT ERROR DETECTED")
+                        logger.error("="*60)
+                        logger.error(f"Error type: {error_type}")
+                        logger.error(f"Full error message: {error_full_msg}")
+                        logger.error(f"Assignment ID: {assignment.id}")
+                        logger.error(f"Assignment PK: {assignment.pk}")
+                        logger.error(f"User ID: {request.user.id}")
+                        logger.error(f"User PK: {request.user.pk}")
+                        logger.error(f"File name: {file_name}")
+                        logger.error(f"File size: {file_size}")
+                        logger.error("="*60)
                 
-                error_msg = f"Failed to save file {file_name}: {error_type} - {error_full_msg}"
-                logger.error(error_msg)
-                logger.error(f"File details - Name: {file_name}, Size: {file_size}, Type: {getattr(f, 'content_type', 'unknown')}")
-                import traceback
-                logger.error("Full traceback:")
-                logger.error(traceback.format_exc())
+                    error_msg = f"Failed to save file {file_name}: {error_type} - {error_full_msg}"
+                    logger.error(error_msg)
+                    logger.error(f"File details - Name: {file_name}, Size: {file_size}, Type: {getattr(f, 'content_type', 'unknown')}")
+                    import traceback
+                    logger.error("Full traceback:")
+                    logger.error(traceback.format_exc())
                 
-                # Include more details in the error message sent to client (truncate if too long)
-                detailed_error = f"{file_name}: {error_full_msg[:300]}"  # Increased length to see more
-                file_errors.append(detailed_error)
+                    # Include more details in the error message sent to client (truncate if too long)
+                    detailed_error = f"{file_name}: {error_full_msg[:300]}"  # Increased length to see more
+                    file_errors.append(detailed_error)
         
         # Verify files were actually saved to database
         verified_files = AssignmentFile.objects.filter(assignment=assignment, file_type='support')
@@ -294,9 +307,7 @@ def create_assignment(request):
                 "status": assignment.status,
                 "action": "created",
             }
-            publish_to_users(user_ids=[student.user_id], event="assignment.changed", data=payload)
-            publish_to_role(role="ADMIN", event="assignment.changed", data=payload)
-            publish_to_role(role="CS_REP", event="assignment.changed", data=payload)
+            invalidate_sections("assignment", user_ids=[student.user_id], roles=("ADMIN", "CS_REP"), data=payload)
         except Exception:
             pass
 
@@ -387,9 +398,7 @@ def start_assignment_process(request, assignment_id):
                 "status": assignment.status,
                 "action": "updated",
             }
-            publish_to_users(user_ids=recipient_ids, event="assignment.changed", data=payload)
-            publish_to_role(role="ADMIN", event="assignment.changed", data=payload)
-            publish_to_role(role="CS_REP", event="assignment.changed", data=payload)
+            invalidate_sections("assignment", user_ids=recipient_ids, roles=("ADMIN", "CS_REP"), data=payload)
         except Exception:
             pass
         
@@ -468,9 +477,7 @@ def cancel_assignment(request, assignment_id):
                     "status": assignment.status,
                     "action": "updated",
                 }
-                publish_to_users(user_ids=recipient_ids, event="assignment.changed", data=payload)
-                publish_to_role(role="ADMIN", event="assignment.changed", data=payload)
-                publish_to_role(role="CS_REP", event="assignment.changed", data=payload)
+                invalidate_sections("assignment", user_ids=recipient_ids, roles=("ADMIN", "CS_REP"), data=payload)
             except Exception:
                 pass
 
@@ -533,9 +540,7 @@ def cancel_assignment(request, assignment_id):
                     "status": assignment.status,
                     "action": "updated",
                 }
-                publish_to_users(user_ids=recipient_ids, event="assignment.changed", data=payload)
-                publish_to_role(role="ADMIN", event="assignment.changed", data=payload)
-                publish_to_role(role="CS_REP", event="assignment.changed", data=payload)
+                invalidate_sections("assignment", user_ids=recipient_ids, roles=("ADMIN", "CS_REP"), data=payload)
             except Exception:
                 pass
             
@@ -663,9 +668,7 @@ def assign_teacher(request):
                 "status": assignment.status,
                 "action": "updated",
             }
-            publish_to_users(user_ids=recipient_ids, event="assignment.changed", data=payload)
-            publish_to_role(role="ADMIN", event="assignment.changed", data=payload)
-            publish_to_role(role="CS_REP", event="assignment.changed", data=payload)
+            invalidate_sections("assignment", user_ids=recipient_ids, roles=("ADMIN", "CS_REP"), data=payload)
         except Exception:
             pass
         
@@ -771,9 +774,7 @@ def mark_assignment_complete(request):
                 "status": assignment.status,
                 "action": "updated",
             }
-            publish_to_users(user_ids=recipient_ids, event="assignment.changed", data=payload)
-            publish_to_role(role="ADMIN", event="assignment.changed", data=payload)
-            publish_to_role(role="CS_REP", event="assignment.changed", data=payload)
+            invalidate_sections("assignment", user_ids=recipient_ids, roles=("ADMIN", "CS_REP"), data=payload)
         except Exception:
             pass
         
@@ -834,6 +835,10 @@ def submit_student_feedback(request):
             to_teacher=teacher,
             message=message
         )
+        try:
+            invalidate_sections("feedback", user_ids=[teacher.user_id])
+        except Exception:
+            pass
         
         return JsonResponse({'success': True, 'message': 'Feedback submitted successfully!'})
         
@@ -949,6 +954,10 @@ def submit_admin_feedback(request):
             message=message,
             priority=priority
         )
+        try:
+            invalidate_sections("feedback", user_ids=[primary_ta.teacher.user_id])
+        except Exception:
+            pass
 
         # --- Notifications ---
         try:
@@ -1023,18 +1032,23 @@ def get_assignment_details(request, assignment_id):
         for f in files:
             try:
                 file_url = f.file.url if f.file else None
+                file_thumb_url = thumb_url(f.file) if f.file else None
                 if user.role == 'TEACHER' and file_url:
                     file_url = generate_masked_link(user, file_url, 'assignment_file')
+                    if file_thumb_url:
+                        file_thumb_url = generate_masked_link(user, file_thumb_url, 'assignment_file')
                 logger.info(f"  File: {f.file_name} (ID: {f.id}, Type: {f.file_type}, URL: {file_url})")
             except (ValueError, AttributeError) as e:
                 # File might not exist or path issue
                 logger.warning(f"File URL error for {f.file_name}: {str(e)}")
                 file_url = None
+                file_thumb_url = None
             
             file_list.append({
                 'id': f.id,
                 'name': f.file_name,
                 'url': file_url,
+                'thumb_url': file_thumb_url,
                 'type': f.file_type
             })
         
@@ -11,7 +11,7 @@ from .models import Exam, Question, Option, ExamAttempt, Answer
 from account.models import Student, Teacher, User
 from assingment.models import Assignment, TeacherAssignment
 from account.decorators import student_required, teacher_required, admin_required
-from realtime.services import publish_to_users
+from realtime.sections import invalidate_sections
 
 # --- Teacher Views ---
 
@@ -101,7 +101,7 @@ def create_exam_api(request):
                 "status": exam.status,
                 "action": "created",
             }
-            publish_to_users(user_ids=[str(student.user_id), str(teacher.user_id)], event="exam.changed", data=payload)
+            invalidate_sections("exam", user_ids=[str(student.user_id), str(teacher.user_id)], data=payload)
         except Exception:
             pass
 
@@ -166,9 +166,9 @@ def delete_exam_api(request, exam_id):
     teacher_user_id = str(exam.teacher.user_id)
     exam.delete()
     try:
-        publish_to_users(
+        invalidate_sections(
+            "exam",
             user_ids=[student_user_id, teacher_user_id],
-            event="exam.changed",
             data={"exam_id": str(exam_id), "status": "deleted", "action": "deleted"},
         )
     except Exception:
@@ -269,9 +269,9 @@ def update_exam_api(request, exam_id):
                     )
 
         try:
-            publish_to_users(
+            invalidate_sections(
+                "exam",
                 user_ids=[str(exam.student.user_id), str(exam.teacher.user_id)],
-                event="exam.changed",
                 data={"exam_id": str(exam.id), "status": exam.status, "action": "updated"},
             )
         except Exception:
@@ -337,9 +337,10 @@ def grade_exam_api(request, attempt_id):
 
         # --- Real-time UI sync (ws/dashboard/) ---
         try:
-            publish_to_users(
+            invalidate_sections(
+                "exam",
                 user_ids=[str(attempt.student.user_id), str(exam.teacher.user_id)],
-                event="exam.changed",
+                roles=("ADMIN",),
                 data={"exam_id": str(exam.id), "attempt_id": str(attempt.id), "status": exam.status, "action": "graded"},
             )
         except Exception:
@@ -408,9 +409,9 @@ def start_exam_api(request, exam_id):
             status='in-progress'
         )
         try:
-            publish_to_users(
+            invalidate_sections(
+                "exam",
                 user_ids=[str(exam.student.user_id), str(exam.teacher.user_id)],
-                event="exam.changed",
                 data={"exam_id": str(exam.id), "attempt_id": str(attempt.id), "status": exam.status, "action": "attempt_started"},
             )
         except Exception:
@@ -504,11 +505,11 @@ def submit_exam_api(request, attempt_id):
 
         # --- Real-time UI sync (ws/dashboard/) ---
         try:
-            publish_to_users(
+            invalidate_sections(
+                "exam",
                 user_ids=[str(attempt.student.user_id), str(attempt.exam.teacher.user_id)],
-                event="exam.changed",
                 data={"exam_id": str(attempt.exam.id), "attempt_id": str(attempt.id), "status": attempt.exam.status, "action": "attempt_submitted"},
-                )
+            )
         except Exception:
             pass
         
@@ -5,12 +5,15 @@ from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.utils import timezone
+from django.db import transaction
 from .models import Homework, HomeworkSubmission, HomeworkFile
 from account.models import Student, Teacher
 from assingment.models import Assignment, TeacherAssignment
 from account.decorators import student_required, teacher_required
 from account.utils import generate_masked_link
-from realtime.services import publish_to_users
+from realtime.sections import invalidate_sections
+from uploads.services import UploadError, files_from_request
+from uploads.thumbnails import thumb_url
 
 @login_required
 @teacher_required
@@ -115,7 +118,7 @@ def create_homework(request):
                 "status": homework.status,
                 "action": "created",
             }
-            publish_to_users(user_ids=[str(student.user_id), str(teacher.user_id)], event="homework.changed", data=payload)
+            invalidate_sections("homework", user_ids=[str(student.user_id), str(teacher.user_id)], data=payload)
         except Exception:
             pass
         
@@ -143,9 +146,12 @@ def list_teacher_homeworks(request):
             attachments = []
             for f in hw.submission.attachments.all():
                 url = f.file.url
+                file_thumb_url = thumb_url(f.file)
                 if request.user.role == 'TEACHER':
                     url = generate_masked_link(request.user, url, 'homework_file')
-                attachments.append({'name': f.file_name, 'size': format_file_size(f.file.size), 'url': url})
+                    if file_thumb_url:
+                        file_thumb_url = generate_masked_link(request.user, file_thumb_url, 'homework_file')
+                attachments.append({'name': f.file_name, 'size': format_file_size(f.file.size), 'url': url, 'thumb_url': file_thumb_url})
                 
             submission = {
                 'notes': hw.submission.notes,
@@ -201,7 +207,6 @@ def submit_homework(request):
     try:
         homework_id = request.POST.get('homework_id')
         notes = request.POST.get('notes', '').strip()
-        files = request.FILES.getlist('files')
         
         print(f"[DEBUG] Submitting homework. ID: {homework_id}")
         print(f"[DEBUG] User: {request.user.email}, Role: {request.user.role}")
@@ -237,33 +242,42 @@ def submit_homework(request):
         if homework.status != 'pending':
             return JsonResponse({'success': False, 'error': 'Homework is already submitted or graded.'}, status=400)
         
-        # Check if submission already exists
-        try:
-            submission = HomeworkSubmission.objects.get(homework=homework)
-            # Update existing submission
-            submission.notes = notes
-            submission.save()
-            # Delete existing files to replace with new ones
-            submission.attachments.all().delete()
-        except HomeworkSubmission.DoesNotExist:
-            # Create new submission
-            submission = HomeworkSubmission.objects.create(
-                homework=homework,
-                notes=notes
-            )
+        # The claim, the files and the status change commit together, so a failure
+        # part-way leaves the upload tokens usable again.
+        with transaction.atomic():
+            # Multipart `files` plus finalized chunked uploads (`upload_tokens`)
+            try:
+                files = files_from_request(request, 'files')
+            except UploadError as e:
+                return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
         
-        # Add new files
-        for f in files:
-            HomeworkFile.objects.create(
-                submission=submission,
-                uploaded_by=request.user,
-                file=f,
-                file_name=f.name,
-                file_type='submission'
-            )
+            # Check if submission already exists
+            try:
+                submission = HomeworkSubmission.objects.get(homework=homework)
+                # Update existing submission
+                submission.notes = notes
+                submission.save()
+                # Delete existing files to replace with new ones
+                submission.attachments.all().delete()
+            except HomeworkSubmission.DoesNotExist:
+                # Create new submission
+                submission = HomeworkSubmission.objects.create(
+                    homework=homework,
+                    notes=notes
+                )
+        
+            # Add new files
+            for f in files:
+                HomeworkFile.objects.create(
+                    submission=submission,
+                    uploaded_by=request.user,
+                    file=f,
+                    file_name=f.name,
+                    file_type='submission'
+                )
             
-        homework.status = 'submitted'
-        homework.save()
+            homework.status = 'submitted'
+            homework.save()
 
         # --- Notifications ---
         try:
@@ -288,7 +302,7 @@ def submit_homework(request):
                 "status": homework.status,
                 "action": "updated",
             }
-            publish_to_users(user_ids=[str(homework.student.user_id), str(homework.teacher.user_id)], event="homework.changed", data=payload)
+            invalidate_sections("homework", user_ids=[str(homework.student.user_id), str(homework.teacher.user_id)], data=payload)
         except Exception:
             pass
         
@@ -346,7 +360,7 @@ def grade_homework(request):
                 "status": homework.status,
                 "action": "updated",
             }
-            publish_to_users(user_ids=[str(homework.student.user_id), str(homework.teacher.user_id)], event="homework.changed", data=payload)
+            invalidate_sections("homework", user_ids=[str(homework.student.user_id), str(homework.teacher.user_id)], roles=("ADMIN",), data=payload)
         except Exception:
             pass
         
@@ -383,9 +397,12 @@ def get_homework_details(request, homework_id):
             attachments = []
             for f in homework.submission.attachments.all():
                 url = f.file.url
+                file_thumb_url = thumb_url(f.file)
                 if user.role == 'TEACHER':
                     url = generate_masked_link(user, url, 'homework_file')
-                attachments.append({'name': f.file_name, 'size': format_file_size(f.file.size), 'url': url})
+                    if file_thumb_url:
+                        file_thumb_url = generate_masked_link(user, file_thumb_url, 'homework_file')
+                attachments.append({'name': f.file_name, 'size': format_file_size(f.file.size), 'url': url, 'thumb_url': file_thumb_url})
                 
             submission = {
                 'notes': homework.submission.notes,
@@ -10,6 +10,7 @@ from account.utils import generate_masked_link
 from account.decorators import admin_required, student_required, staff_required
 from assingment.models import Assignment
 from notifications.services import create_notification
+from realtime.sections import invalidate_sections
 from realtime.services import publish_to_user, publish_to_role
 import json
 from decimal import Decimal
@@ -144,6 +145,7 @@ def create_invoice(request):
             
             publish_to_user(user_id=student.user.id, event='invoice.changed', data={'id': str(invoice.id), 'action': 'created'})
             publish_to_role(role='ADMIN', event='invoice.changed', data={'id': str(invoice.id), 'action': 'created'})
+            invalidate_sections('invoice', roles=('ADMIN', 'CS_REP'), data={'id': str(invoice.id), 'action': 'created'})
             
         elif request.user.role == 'CS_REP':
             invoice.cs_rep = request.user.csrep_profile
@@ -166,6 +168,7 @@ def create_invoice(request):
             
             publish_to_role(role='ADMIN', event='invoice.changed', data={'id': str(invoice.id), 'action': 'request_created'})
             publish_to_user(user_id=request.user.id, event='invoice.changed', data={'id': str(invoice.id), 'action': 'request_created'})
+            invalidate_sections('invoice', roles=('ADMIN', 'CS_REP'), data={'id': str(invoice.id), 'action': 'request_created'})
         else:
             return JsonResponse({'success': False, 'message': 'Unauthorized.'}, status=403)
 
@@ -233,6 +236,7 @@ def admin_mark_paid(request, invoice_id):
     
     publish_to_user(user_id=invoice.student.user.id, event='invoice.changed', data={'id': str(invoice.id), 'action': 'marked_paid'})
     publish_to_role(role='ADMIN', event='invoice.changed', data={'id': str(invoice.id), 'action': 'marked_paid'})
+    invalidate_sections('invoice', roles=('ADMIN', 'CS_REP'), data={'id': str(invoice.id), 'action': 'marked_paid'})
     
     return JsonResponse({'success': True, 'message': 'Invoice marked as paid.'})
 
@@ -269,6 +273,7 @@ def admin_delete_invoice(request, invoice_id):
     invoice.delete()
     
     publish_to_role(role='ADMIN', event='invoice.changed', data={'action': 'deleted'})
+    invalidate_sections('invoice', roles=('ADMIN', 'CS_REP'), data={'action': 'deleted'})
     
     return JsonResponse({'success': True, 'message': 'Invoice/Request deleted.'})
 
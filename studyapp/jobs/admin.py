@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "progress_done", "progress_total", "attempts", "available_at", "updated_at")
+    list_filter = ("kind", "status")
+    ordering = ("-id",)
+    readonly_fields = ("payload", "state", "last_error", "created_at", "updated_at", "finished_at")
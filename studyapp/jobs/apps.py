@@ -0,0 +1,40 @@
+import os
+import sys
+
+from django.apps import AppConfig
+
+
+def _serves_requests() -> bool:
+    """
+    True in a web server process (ASGI/WSGI server, or `runserver` in its serving
+    child); False for migrate, tests and other management commands.
+    """
+    argv = sys.argv or [""]
+    prog = os.path.basename(argv[0])
+    is_manage = prog in ("manage.py", "django-admin", "django-admin.py") or (
+        prog == "__main__.py" and os.path.basename(os.path.dirname(argv[0])) == "django"
+    )
+    if not is_manage:
+        return True
+    if len(argv) < 2 or argv[1] != "runserver":
+        return False
+    # With autoreload the parent process only watches files; the child (RUN_MAIN) serves.
+    return os.environ.get("RUN_MAIN") == "true" or "--noreload" in argv
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "jobs"
+
+    def ready(self):
+        # Each app registers its handlers in its own `jobs.py`.
+        from django.utils.module_loading import autodiscover_modules
+
+        autodiscover_modules("jobs")
+
+        from .queue import job_runner
+
+        if _serves_requests():
+            # Start at boot: jobs already queued (scheduled announcements, retries)
+            # must not wait for the next enqueue to wake the runner.
+            job_runner.kick()
@@ -0,0 +1,45 @@
+"""
+Management command that runs queued and scheduled background jobs.
+Usage: python manage.py run_workers [--workers 2] [--kind notifications.fanout] [--once] [--max-idle 60]
+
+Run it as a long-lived worker when JOBS_RUNNER=command, and wherever jobs are
+scheduled ahead (e.g. announcements with a future `scheduled_at`). Idle
+workers sleep until the next job is due or a new one is enqueued (see
+jobs.scheduler); jobs are claimed with SKIP LOCKED, so several processes can
+run side by side.
+"""
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.queue import run_until_idle
+from jobs.scheduler import serve
+
+
+class Command(BaseCommand):
+    help = 'Runs queued and scheduled background jobs (notification fanouts, scheduled announcements, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--kind', action='append', dest='kinds', help='Only run jobs of this kind (repeatable)')
+        parser.add_argument('--once', action='store_true', help='Run what is due and exit')
+        parser.add_argument('--max-idle', type=float, default=60.0, help='Longest sleep between queue checks (seconds)')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        kinds = options['kinds']
+
+        if options['once']:
+            ran = run_until_idle(kinds=kinds)
+            self.stdout.write(self.style.SUCCESS(f'✓ Ran {ran} job chunk(s)'))
+            return
+
+        def progress(n, ran):
+            self.stdout.write(f'[worker {n}] ran {ran} chunk(s)')
+
+        self.stdout.write(f"Running {options['workers']} job worker(s) (Ctrl+C to stop)...")
+        try:
+            asyncio.run(serve(workers=options['workers'], kinds=kinds, max_idle=options['max_idle'], on_progress=progress))
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
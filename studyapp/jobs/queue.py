@@ -0,0 +1,207 @@
+"""
+DB-backed job queue: no broker, workers claim rows with
+`SELECT ... FOR UPDATE SKIP LOCKED`.
+
+Handlers are registered per kind in an app's `jobs.py`:
+
+    @register("notifications.fanout")
+    def fanout(job): ...
+
+A handler is called with the locked Job inside the chunk's transaction and
+returns True once the job is finished, False to be called again. Between
+calls it checkpoints by updating `job.state`, `job.progress_done` and
+`job.progress_total`; those are saved with the chunk's own writes, so a chunk
+is applied exactly once even if the worker dies. A failing chunk is retried
+with backoff, and the job is marked failed after MAX_ATTEMPTS.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+IDLE_POLL_SECONDS = 5.0
+# Shortest wait after a worker found nothing it could claim.
+BUSY_RETRY_SECONDS = 0.5
+NOTIFY_CHANNEL = "jobs_enqueued"
+
+_handlers: Dict[str, Callable[[Job], bool]] = {}
+
+
+def register(kind: str):
+    def decorator(func: Callable[[Job], bool]):
+        _handlers[kind] = func
+        return func
+
+    return decorator
+
+
+def runner_mode() -> str:
+    """
+    "inprocess" (default): a background thread in each web process runs jobs
+    right after they commit. "command": only `manage.py run_workers` does.
+    """
+    return str(getattr(settings, "JOBS_RUNNER", "inprocess") or "inprocess").lower()
+
+
+def enqueue(kind: str, payload: Optional[dict] = None, *, run_at=None, total: Optional[int] = None) -> Job:
+    """
+    Queue a job in the current transaction; workers see it once that commits.
+    """
+    job = Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        available_at=run_at or timezone.now(),
+        progress_total=total,
+    )
+    if connection.vendor == "postgresql":
+        # Delivered at commit: wakes `run_workers` schedulers sleeping past this job's time.
+        with connection.cursor() as cursor:
+            cursor.execute(f"NOTIFY {NOTIFY_CHANNEL}")
+    transaction.on_commit(job_runner.kick)
+    return job
+
+
+def seconds_until_next_due(
+    *, kinds: Optional[Iterable[str]] = None, cap: float = IDLE_POLL_SECONDS, floor: float = BUSY_RETRY_SECONDS
+) -> float:
+    """
+    How long a worker that just found nothing to claim should wait for the
+    earliest queued job to fall due, between `floor` and `cap`. One probe of the
+    partial (available_at) index of queued jobs.
+
+    Jobs whose chunk another worker is running are skipped like in `run_one`:
+    that worker keeps them, and counting them as due would have every idle
+    worker spin on rows it cannot claim. The floor covers what slips in between
+    (a chunk committing right after the failed claim).
+    """
+    with transaction.atomic():
+        qs = Job.objects.select_for_update(skip_locked=True).filter(status=Job.STATUS_QUEUED)
+        if kinds:
+            qs = qs.filter(kind__in=list(kinds))
+        next_at = qs.order_by("available_at", "id").values_list("available_at", flat=True).first()
+    if next_at is None:
+        return cap
+    return max(floor, min(cap, (next_at - timezone.now()).total_seconds()))
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(5 * 2 ** attempts, 600))
+
+
+def _record_failure(job_id: int, exc: Exception) -> None:
+    job = Job.objects.filter(id=job_id).only("attempts", "kind").first()
+    if job is None:
+        return
+    now = timezone.now()
+    attempts = job.attempts + 1
+    error = (str(exc) or exc.__class__.__name__)[:1000]
+    if attempts >= MAX_ATTEMPTS:
+        logger.error("Job %s (%s) failed after %s attempts: %s", job_id, job.kind, attempts, error)
+        Job.objects.filter(id=job_id).update(
+            status=Job.STATUS_FAILED, attempts=attempts, last_error=error, finished_at=now, updated_at=now
+        )
+        return
+    logger.warning("Job %s (%s) chunk failed (attempt %s): %s", job_id, job.kind, attempts, error)
+    Job.objects.filter(id=job_id).update(
+        attempts=attempts, available_at=now + _backoff(attempts), last_error=error, updated_at=now
+    )
+
+
+def run_one(*, kinds: Optional[Iterable[str]] = None) -> bool:
+    """
+    Claim one due job and run one chunk of it. Returns False when nothing was due.
+    """
+    job = None
+    try:
+        with transaction.atomic():
+            qs = Job.objects.select_for_update(skip_locked=True).filter(
+                status=Job.STATUS_QUEUED, available_at__lte=timezone.now()
+            )
+            if kinds:
+                qs = qs.filter(kind__in=list(kinds))
+            job = qs.order_by("available_at", "id").first()
+            if job is None:
+                return False
+            handler = _handlers.get(job.kind)
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {job.kind!r}")
+
+            finished = handler(job)
+            job.attempts = 0
+            job.last_error = ""
+            if finished:
+                job.status = Job.STATUS_DONE
+                job.finished_at = timezone.now()
+            job.save(
+                update_fields=[
+                    "state", "progress_done", "progress_total", "status",
+                    "attempts", "last_error", "finished_at", "updated_at",
+                ]
+            )
+    except Exception as exc:
+        if job is None:
+            raise
+        _record_failure(job.id, exc)
+    return True
+
+
+def run_until_idle(*, kinds: Optional[Iterable[str]] = None, max_chunks: Optional[int] = None) -> int:
+    """
+    Run chunks until nothing is due; returns how many ran.
+    """
+    ran = 0
+    while max_chunks is None or ran < max_chunks:
+        if not run_one(kinds=kinds):
+            break
+        ran += 1
+    return ran
+
+
+class JobRunner:
+    """
+    In-process runner: a daemon thread started when a web process boots (see
+    JobsConfig.ready), woken on commit, and otherwise when the next queued job
+    (a retry, a scheduled run) falls due.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def kick(self) -> None:
+        if runner_mode() != "inprocess":
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="jobs-runner", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        timeout = IDLE_POLL_SECONDS
+        while True:
+            self._wake.wait(timeout=timeout)
+            self._wake.clear()
+            timeout = IDLE_POLL_SECONDS
+            try:
+                run_until_idle()
+                timeout = seconds_until_next_due(cap=IDLE_POLL_SECONDS)
+            except Exception:
+                logger.exception("Job runner failed")
+            finally:
+                connection.close()
+
+
+job_runner = JobRunner()
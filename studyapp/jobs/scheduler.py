@@ -0,0 +1,124 @@
+"""
+Asyncio scheduler behind `manage.py run_workers`.
+
+Workers do not poll on a fixed interval: when nothing is due they sleep until
+the earliest queued job's `available_at` (one index probe that skips jobs
+another worker is running; at least BUSY_RETRY_SECONDS), and a Postgres
+`LISTEN` on `NOTIFY_CHANNEL` wakes them as soon as a job is enqueued. Anything
+time-based (scheduled announcements, retries with backoff) is just a job with
+a future `available_at`.
+
+Job chunks run in worker threads, each with its own DB connection.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable, Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection
+
+from .queue import NOTIFY_CHANNEL, run_until_idle, seconds_until_next_due
+
+logger = logging.getLogger(__name__)
+
+
+class _Wakeup:
+    """
+    Wakes every sleeping worker. Workers take `current` before checking for
+    work, so a notification arriving in between is never lost.
+    """
+
+    def __init__(self):
+        self.current = asyncio.Event()
+
+    def fire(self) -> None:
+        event, self.current = self.current, asyncio.Event()
+        event.set()
+
+
+def _run_chunks(kinds, max_chunks: int) -> int:
+    close_old_connections()
+    try:
+        return run_until_idle(kinds=kinds, max_chunks=max_chunks)
+    finally:
+        connection.close()
+
+
+def _next_due(kinds, cap: float) -> float:
+    close_old_connections()
+    try:
+        return seconds_until_next_due(kinds=kinds, cap=cap)
+    finally:
+        connection.close()
+
+
+def _listen(wakeup: _Wakeup):
+    """
+    LISTEN for enqueued jobs on a dedicated connection (Postgres only); it is
+    read from the event loop, outside Django's connection handling.
+    Returns the raw connection to close, or None.
+    """
+    if connection.vendor != "postgresql":
+        return None
+    import psycopg2
+
+    raw = psycopg2.connect(**connection.get_connection_params())
+    raw.autocommit = True
+    with raw.cursor() as cursor:
+        cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+    def on_readable():
+        raw.poll()
+        if raw.notifies:
+            raw.notifies.clear()
+            wakeup.fire()
+
+    asyncio.get_running_loop().add_reader(raw.fileno(), on_readable)
+    return raw
+
+
+async def serve(
+    *,
+    workers: int = 2,
+    kinds: Optional[Iterable[str]] = None,
+    max_idle: float = 60.0,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> None:
+    """
+    Run jobs until cancelled. `max_idle` bounds each sleep (a safety net for
+    missed notifications and clock skew).
+    """
+    kinds = list(kinds) if kinds else None
+    wakeup = _Wakeup()
+    listener = _listen(wakeup)
+
+    async def worker(n: int) -> None:
+        while True:
+            event = wakeup.current
+            try:
+                ran = await sync_to_async(_run_chunks, thread_sensitive=False)(kinds, 100)
+            except Exception:
+                logger.exception("Job worker %s failed", n)
+                ran = 0
+            if ran:
+                if on_progress:
+                    on_progress(n, ran)
+                continue
+            try:
+                delay = await sync_to_async(_next_due, thread_sensitive=False)(kinds, max_idle)
+            except Exception:
+                logger.exception("Job worker %s could not read the queue", n)
+                delay = max_idle
+            try:
+                await asyncio.wait_for(event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    try:
+        await asyncio.gather(*(worker(n) for n in range(workers)))
+    finally:
+        if listener is not None:
+            asyncio.get_running_loop().remove_reader(listener.fileno())
+            listener.close()
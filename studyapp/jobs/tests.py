@@ -0,0 +1,114 @@
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from account.models import User
+from notifications.models import Notification
+from notifications.services import FANOUT_JOB, notify_users
+
+from . import queue
+from .models import Job
+
+
+class JobQueueTests(TestCase):
+    def _register(self, kind, handler):
+        queue.register(kind)(handler)
+        self.addCleanup(queue._handlers.pop, kind, None)
+
+    def _make_due(self, job):
+        # Skip the retry backoff.
+        Job.objects.filter(id=job.id).update(available_at=timezone.now())
+
+    @override_settings(NOTIFICATIONS_ASYNC_THRESHOLD=2, NOTIFICATIONS_FANOUT_CHUNK=2)
+    def test_fanout_runs_in_chunks_until_done(self):
+        for i in range(5):
+            User.objects.create_user(f'student{i}@example.com', f'student{i}', 'pw', role='STUDENT')
+        notify_users(recipients=User.objects.filter(role='STUDENT'), notification_type='system', title='Hello')
+
+        job = Job.objects.get(kind=FANOUT_JOB)
+        self.assertEqual(job.progress_total, 5)
+        self.assertEqual(Notification.objects.count(), 0)
+
+        self.assertEqual(queue.run_until_idle(kinds=[FANOUT_JOB]), 3)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(job.progress_done, job.progress_total)
+        self.assertEqual(job.state, {'offset': 5})
+        self.assertEqual(Notification.objects.filter(title='Hello').count(), 5)
+
+    def test_failing_handler_is_retried_then_marked_failed(self):
+        calls = []
+
+        def boom(job):
+            calls.append(job.id)
+            raise RuntimeError('boom')
+
+        self._register('tests.boom', boom)
+        job = queue.enqueue('tests.boom')
+
+        for attempt in range(1, queue.MAX_ATTEMPTS + 1):
+            self._make_due(job)
+            with self.assertLogs('jobs.queue', 'WARNING'):
+                self.assertTrue(queue.run_one(kinds=['tests.boom']))
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            self.assertEqual(job.last_error, 'boom')
+            expected = Job.STATUS_FAILED if attempt == queue.MAX_ATTEMPTS else Job.STATUS_QUEUED
+            self.assertEqual(job.status, expected)
+
+        self._make_due(job)
+        self.assertFalse(queue.run_one(kinds=['tests.boom']))
+        self.assertEqual(len(calls), queue.MAX_ATTEMPTS)
+
+    def test_failed_chunk_rolls_back_its_checkpoint(self):
+        def half_done(job):
+            job.state = {'offset': 1}
+            job.progress_done = 1
+            job.save(update_fields=['state', 'progress_done'])
+            raise RuntimeError('crashed mid-chunk')
+
+        self._register('tests.half', half_done)
+        job = queue.enqueue('tests.half', total=2)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            queue.run_one(kinds=['tests.half'])
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, {})
+        self.assertEqual(job.progress_done, 0)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.available_at, timezone.now())
+
+    def test_unknown_kind_is_recorded_as_failure(self):
+        job = queue.enqueue('tests.unregistered')
+
+        with self.assertLogs('jobs.queue', 'WARNING') as logs:
+            self.assertTrue(queue.run_one(kinds=['tests.unregistered']))
+        self.assertIn('No handler registered', logs.output[0])
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('tests.unregistered', job.last_error)
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        # Not due again until its backoff: the runner moves on instead of spinning.
+        self.assertFalse(queue.run_one(kinds=['tests.unregistered']))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs row locks held by a second connection')
+class HeldJobTests(TransactionTestCase):
+    def test_job_held_by_another_worker_is_not_due(self):
+        # Created directly: `enqueue` would kick the in-process runner on commit.
+        job = Job.objects.create(kind='tests.held')
+        other = connections.create_connection('default')
+        try:
+            other.set_autocommit(False)
+            with other.cursor() as cursor:
+                cursor.execute('SELECT id FROM jobs WHERE id = %s FOR UPDATE', [job.id])
+            self.assertFalse(queue.run_one(kinds=['tests.held']))
+            # Not "due now": idle workers would spin until the other chunk commits.
+            self.assertEqual(queue.seconds_until_next_due(kinds=['tests.held'], cap=5.0), 5.0)
+        finally:
+            other.rollback()
+            other.close()
+        # Due and free again, but never less than the busy floor.
+        self.assertEqual(queue.seconds_until_next_due(kinds=['tests.held'], cap=5.0), queue.BUSY_RETRY_SECONDS)
@@ -14,10 +14,20 @@ from .serializers import MeetingSerializer
 from notifications.services import create_notification
 from account.models import User
 from account.utils import generate_masked_link
-from realtime.services import publish_badges
+from realtime.sections import invalidate_sections
+from realtime.services import adjust_badges, publish_badges
 import os
 import uuid
 
+def _meeting_user_ids(meeting):
+    """Distinct users whose `meetings_active` badge includes this meeting."""
+    user_ids = {str(meeting.host_id)}
+    if meeting.student_id:
+        user_ids.add(str(meeting.student_id))
+    if meeting.teacher_id:
+        user_ids.add(str(meeting.teacher_id))
+    return user_ids
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def list_meetings(request):
@@ -90,13 +100,11 @@ def schedule_meeting(request):
 
         # Badge counts: meeting becomes active (scheduled) for relevant users
         try:
-            user_ids = {str(meeting.host_id)}
-            if meeting.student_id:
-                user_ids.add(str(meeting.student_id))
-            if meeting.teacher_id:
-                user_ids.add(str(meeting.teacher_id))
+            user_ids = _meeting_user_ids(meeting)
+            adjust_badges(user_ids=user_ids, meetings_active=1)
             for uid in user_ids:
                 publish_badges(user_id=uid)
+            invalidate_sections("meeting", user_ids=user_ids, roles=("ADMIN",), data={"meeting_id": str(meeting.id), "action": "scheduled"})
         except Exception:
             pass
             
@@ -130,13 +138,10 @@ def start_meeting(request, meeting_id):
         meeting.actual_start = timezone.now()
         meeting.save()
         try:
-            user_ids = {str(meeting.host_id)}
-            if meeting.student_id:
-                user_ids.add(str(meeting.student_id))
-            if meeting.teacher_id:
-                user_ids.add(str(meeting.teacher_id))
+            user_ids = _meeting_user_ids(meeting)
             for uid in user_ids:
                 publish_badges(user_id=uid)
+            invalidate_sections("meeting", user_ids=user_ids, roles=("ADMIN",), data={"meeting_id": str(meeting.id), "action": "started"})
         except Exception:
             pass
         
@@ -189,13 +194,11 @@ def end_meeting(request, meeting_id):
 
         # Badge counts: meeting no longer active for relevant users
         try:
-            user_ids = {str(meeting.host_id)}
-            if meeting.student_id:
-                user_ids.add(str(meeting.student_id))
-            if meeting.teacher_id:
-                user_ids.add(str(meeting.teacher_id))
+            user_ids = _meeting_user_ids(meeting)
+            adjust_badges(user_ids=user_ids, meetings_active=-1)
             for uid in user_ids:
                 publish_badges(user_id=uid)
+            invalidate_sections("meeting", user_ids=user_ids, roles=("ADMIN",), data={"meeting_id": str(meeting.id), "action": "ended"})
         except Exception:
             pass
         
@@ -306,7 +309,20 @@ def delete_meeting(request, meeting_id):
         return Response({"error": "Unauthorized. Only admins can delete meeting records."}, status=status.HTTP_403_FORBIDDEN)
 
     meeting = get_object_or_404(Meeting, id=meeting_id)
+    was_active = meeting.status in (Meeting.STATUS_SCHEDULED, Meeting.STATUS_IN_PROGRESS)
+    user_ids = _meeting_user_ids(meeting)
     meeting.delete()
+    if was_active:
+        adjust_badges(user_ids=user_ids, meetings_active=-1)
+        try:
+            for uid in user_ids:
+                publish_badges(user_id=uid)
+        except Exception:
+            pass
+    try:
+        invalidate_sections("meeting", user_ids=user_ids, roles=("ADMIN",), data={"meeting_id": str(meeting_id), "action": "deleted"})
+    except Exception:
+        pass
     return Response({"success": True, "message": "Meeting record deleted successfully."})
 
 
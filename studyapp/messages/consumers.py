@@ -1,76 +1,83 @@
 from __future__ import annotations
 
+import asyncio
+
+from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
-from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
-from .models import ThreadParticipant
-from .presence import refresh_online, set_offline, set_online
+from realtime.multiplex import StreamConsumer, StreamHandler
+from realtime.services import send_to_groups
 
+from .presence import get_many_online, refresh_online, set_offline, set_online
+from .services import peer_user_ids, send_to_thread, thread_participant_ids, user_group_name
+from .writer import message_writer
 
-class MessagesConsumer(AsyncJsonWebsocketConsumer):
-    """
-    WebSocket consumer for real-time direct messages.
 
-    We do NOT accept message sends over WS for now (attachments require multipart);
-    messages are persisted via HTTP and broadcast over WS.
-    """
+MAX_WS_MESSAGE_CHARS = 10000
 
-    async def connect(self):
-        user = self.scope.get("user")
-        if not user or user.is_anonymous:
-            await self.close(code=4401)  # unauthorized
-            return
 
-        self.user = user
-        self.user_group = f"user_{user.id}"
+class DirectMessagesStream(StreamHandler):
+    """
+    Real-time direct messages stream ("dm").
 
-        # Presence: mark online
-        try:
-            set_online(user.id)
-        except Exception:
-            pass
+    Text messages can be sent with a `send` frame (`thread_id`, `content`,
+    client-generated `client_key`); they're persisted by the batched writer and
+    acknowledged with `ack` (or `nack`). Attachments still go through HTTP.
 
-        await self.channel_layer.group_add(self.user_group, self.channel_name)
+    Every DM event is addressed to the participants' `user_<id>` groups, so the
+    socket joins a single group no matter how many threads the user has.
+    """
 
-        # Subscribe to all thread groups the user participates in.
-        thread_ids = await self._get_user_thread_ids()
-        self.thread_groups = [f"thread_{tid}" for tid in thread_ids]
-        for g in self.thread_groups:
-            await self.channel_layer.group_add(g, self.channel_name)
+    event_types = frozenset(
+        {"chat.message", "chat.thread_created", "chat.thread_deleted", "chat.typing", "chat.read", "chat.presence"}
+    )
 
-        await self.accept()
+    async def open(self):
+        user = self.user
+        if not user or user.is_anonymous:
+            self.close_code = 4401  # unauthorized
+            return False
 
-        await self.send_json({"type": "connected", "thread_ids": [str(tid) for tid in thread_ids]})
+        self.user_group = user_group_name(user.id)
 
-        # Broadcast presence to all threads (best-effort)
-        await self._broadcast_presence(is_online=True)
+        await self.group_add(self.user_group)
+        return True
 
-    async def disconnect(self, code):
-        # Best-effort cleanup
-        try:
-            # Presence: mark offline
-            try:
-                set_offline(self.user.id)
-            except Exception:
-                pass
+    async def opened(self):
+        await self.send_json({"type": "connected"})
 
-            await self._broadcast_presence(is_online=False)
+        # Presence: mark this socket online; peers hear about it only when the
+        # user's first socket connects (best-effort)
+        self.presence_tracked = True
+        try:
+            came_online = await sync_to_async(set_online)(self.user.id, self.channel_name)
+        except Exception:
+            came_online = False
+        if came_online:
+            await self._broadcast_presence(is_online=True)
 
-            if getattr(self, "user_group", None):
-                await self.channel_layer.group_discard(self.user_group, self.channel_name)
-            for g in getattr(self, "thread_groups", []) or []:
-                await self.channel_layer.group_discard(g, self.channel_name)
+    async def close_stream(self):
+        # Best-effort cleanup (groups are left by the host)
+        if not getattr(self, "presence_tracked", False):
+            return
+        try:
+            went_offline = await sync_to_async(set_offline)(self.user.id, self.channel_name)
         except Exception:
             return
+        if went_offline:
+            await self._broadcast_presence(is_online=False)
 
-    async def receive_json(self, content, **kwargs):
+    async def receive_json(self, content):
         """
-        Client -> server events (typing/presence).
+        Client -> server events (send/typing/presence).
         """
         event_type = content.get("type")
+        if event_type == "send":
+            await self._send_message(content)
+            return
         if event_type == "presence_ping":
             try:
-                refresh_online(self.user.id)
+                await sync_to_async(refresh_online)(self.user.id, self.channel_name)
             except Exception:
                 pass
             return
@@ -79,33 +86,13 @@ class MessagesConsumer(AsyncJsonWebsocketConsumer):
             is_typing = bool(content.get("is_typing"))
             if not thread_id:
                 return
-            # Only broadcast within that thread group
-            await self.channel_layer.group_send(
-                f"thread_{thread_id}",
-                {
-                    "type": "chat.typing",
-                    "thread_id": str(thread_id),
-                    "user_id": str(self.user.id),
-                    "is_typing": is_typing,
-                },
-            )
+            await self._send_typing(str(thread_id), is_typing)
 
     async def chat_message(self, event):
         await self.send_json({"type": "message", "message": event.get("message")})
 
     async def chat_thread_created(self, event):
-        thread_id = event.get("thread_id")
-        if thread_id:
-            group = f"thread_{thread_id}"
-            # Subscribe this socket to the new thread group immediately.
-            try:
-                await self.channel_layer.group_add(group, self.channel_name)
-                self.thread_groups = getattr(self, "thread_groups", []) or []
-                if group not in self.thread_groups:
-                    self.thread_groups.append(group)
-            except Exception:
-                pass
-        await self.send_json({"type": "thread_created", "thread_id": thread_id})
+        await self.send_json({"type": "thread_created", "thread_id": event.get("thread_id")})
 
     async def chat_thread_deleted(self, event):
         await self.send_json(
@@ -154,27 +141,93 @@ class MessagesConsumer(AsyncJsonWebsocketConsumer):
             }
         )
 
-    async def _get_user_thread_ids(self):
-        return await self._get_user_thread_ids_sync()
+    async def _send_message(self, content):
+        client_key = str(content.get("client_key") or "")
+        thread_id = str(content.get("thread_id") or "")
+        text = content.get("content")
+        text = text.strip() if isinstance(text, str) else ""
+
+        error = None
+        if not client_key or len(client_key) > 64:
+            error = "client_key is required (max 64 characters)."
+        elif not text:
+            error = "Message content is required."
+        elif len(text) > MAX_WS_MESSAGE_CHARS:
+            error = "Message is too long."
+        elif not await self._is_participant(thread_id):
+            error = "You do not have access to this conversation."
+        if error:
+            await self.send_json({"type": "nack", "client_key": client_key, "error": error})
+            return
+
+        try:
+            future = message_writer.submit(
+                thread_id=thread_id, sender_id=self.user.id, content=text, client_key=client_key
+            )
+            message = await asyncio.wrap_future(future)
+        except Exception:
+            await self.send_json({"type": "nack", "client_key": client_key, "error": "Failed to send message."})
+            return
+        await self.send_json({"type": "ack", "client_key": client_key, "message": message})
+
+    @database_sync_to_async
+    def _is_participant(self, thread_id: str) -> bool:
+        try:
+            return str(self.user.id) in thread_participant_ids(thread_id)
+        except Exception:
+            return False
 
     @database_sync_to_async
-    def _get_user_thread_ids_sync(self):
-        return list(
-            ThreadParticipant.objects.filter(user=self.user).values_list("thread_id", flat=True)
+    def _send_typing(self, thread_id: str, is_typing: bool):
+        try:
+            participant_ids = thread_participant_ids(thread_id)
+        except Exception:
+            return
+        # Only participants may signal typing in a thread.
+        if str(self.user.id) not in participant_ids:
+            return
+        send_to_thread(
+            thread_id,
+            {
+                "type": "chat.typing",
+                "thread_id": thread_id,
+                "user_id": str(self.user.id),
+                "is_typing": is_typing,
+            },
+            participant_ids=participant_ids,
         )
 
-    async def _broadcast_presence(self, *, is_online: bool):
+    @database_sync_to_async
+    def _broadcast_presence(self, *, is_online: bool):
+        """
+        Tell the user's online peers, in one batched send. Only runs on a
+        transition (first socket connects / last one goes), and offline peers
+        are skipped: they get presence from the thread list when they load it.
+
+        Deliberately not a per-user presence group that peers subscribe to:
+        every socket (every tab) would then join and leave one group per peer
+        on each open/close, which costs more than these occasional sends.
+        """
         try:
-            for group in getattr(self, "thread_groups", []) or []:
-                await self.channel_layer.group_send(
-                    group,
-                    {
-                        "type": "chat.presence",
-                        "user_id": str(self.user.id),
-                        "is_online": bool(is_online),
-                    },
-                )
+            peers = peer_user_ids(self.user.id)
+            online = [uid for uid, is_on in get_many_online(peers).items() if is_on]
+            send_to_groups(
+                [
+                    (
+                        user_group_name(uid),
+                        {"type": "chat.presence", "user_id": str(self.user.id), "is_online": bool(is_online)},
+                    )
+                    for uid in online
+                ]
+            )
         except Exception:
             return
 
 
+class MessagesConsumer(StreamConsumer):
+    """
+    Dedicated `/ws/messages/` socket for the "dm" stream.
+    """
+
+    handler_class = DirectMessagesStream
+    stream_name = "dm"
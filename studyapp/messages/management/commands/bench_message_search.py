@@ -0,0 +1,181 @@
+"""
+Benchmark: full-text message search latency on a large seeded corpus.
+Usage: python manage.py bench_message_search [--messages 1000000] [--users 40] [--threads 400] [--queries 200] [--keep]
+
+Seeds bench users, direct threads between them and N messages of random
+words (one INSERT ... SELECT generate_series in Postgres, so the generated
+search_vector and its GIN index are maintained exactly as in production),
+then times `search_messages` as a thread participant and as an ADMIN (whole
+table) and reports p50/p95. Seeded rows are removed afterwards unless --keep.
+"""
+import random
+import time
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from account.models import User
+from messages.models import Message, Thread, ThreadParticipant
+from messages.search import KIND_DIRECT, search_messages
+
+WORDS = (
+    'assignment homework exam invoice payment deadline extension meeting tutor student teacher '
+    'schedule report feedback grade essay draft review calculus algebra physics chemistry biology '
+    'history literature thesis chapter reference citation upload download portal refund receipt '
+    'quarterly monthly urgent reminder question answer problem solution lecture recording session '
+    'online offline weekend tomorrow morning evening revision submission plagiarism rubric'
+).split()
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Seeds a large message corpus and reports full-text search latency (p50/p95)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=40)
+        parser.add_argument('--threads', type=int, default=400)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--words', type=int, default=14, help='Words per seeded message')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        tag = uuid.uuid4().hex[:8]
+        try:
+            users, threads = self._seed_threads(tag, max(2, options['users']), max(1, options['threads']), rng)
+            self.stdout.write(
+                f'Seeded {len(users)} users and {len(threads)} threads; inserting {options["messages"]} messages...'
+            )
+
+            start = time.perf_counter()
+            self._seed_messages(threads, options['messages'], options['words'])
+            self.stdout.write(f'  inserted in {time.perf_counter() - start:.1f}s')
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE messages')
+
+            admin = users[0]
+            members = users[1:]
+            queries = self._queries(rng, options['queries'])
+            for label, pick_user in (
+                ('participant', lambda: rng.choice(members)),
+                ('admin (all threads)', lambda: admin),
+            ):
+                timings = []
+                for q in queries:
+                    user = pick_user()
+                    t0 = time.perf_counter()
+                    hits, _ = search_messages(user, q, kinds=(KIND_DIRECT,), limit=20)
+                    timings.append((time.perf_counter() - t0) * 1000)
+                self.stdout.write(
+                    f'  {label:<20} p50 {_percentile(timings, 50):7.1f} ms   '
+                    f'p95 {_percentile(timings, 95):7.1f} ms   max {max(timings):7.1f} ms   ({len(timings)} queries)'
+                )
+        finally:
+            if options['keep']:
+                self.stdout.write(f'Kept seeded data (bench users: bench-search-{tag}-*)')
+            else:
+                self._cleanup(tag)
+
+        self.stdout.write(self.style.SUCCESS('✓ Search benchmark finished'))
+
+    def _seed_threads(self, tag, n_users, n_threads, rng):
+        password = make_password(None)
+        users = User.objects.bulk_create(
+            [
+                User(
+                    email=f'bench-search-{tag}-{i}@example.invalid',
+                    username=f'bench-search-{tag}-{i}',
+                    role='ADMIN' if i == 0 else rng.choice(['STUDENT', 'TEACHER', 'CS_REP']),
+                    password=password,
+                    is_active=False,
+                )
+                for i in range(n_users)
+            ]
+        )
+        members = users[1:]
+        pairs = set()
+        max_pairs = len(members) * (len(members) - 1) // 2
+        while len(pairs) < min(n_threads, max_pairs):
+            a, b = rng.sample(members, 2)
+            pairs.add((a, b) if str(a.id) < str(b.id) else (b, a))
+
+        threads, parts = [], []
+        for a, b in pairs:
+            thread = Thread(direct_key=Thread.make_direct_key(a.id, b.id), created_by=a)
+            threads.append((thread, a, b))
+            parts += [ThreadParticipant(thread=thread, user=a), ThreadParticipant(thread=thread, user=b)]
+        with transaction.atomic():
+            Thread.objects.bulk_create([t for t, _, _ in threads])
+            ThreadParticipant.objects.bulk_create(parts)
+        return users, threads
+
+    def _seed_messages(self, threads, n_messages, n_words):
+        thread_ids = [str(t.id) for t, _, _ in threads]
+        a_ids = [str(a.id) for _, a, _ in threads]
+        b_ids = [str(b.id) for _, _, b in threads]
+        qn = connection.ops.quote_name
+        batch = 200_000
+        with connection.cursor() as cursor:
+            for offset in range(0, n_messages, batch):
+                count = min(batch, n_messages - offset)
+                # Word list is indexed per row (g in the subquery) so every message differs.
+                cursor.execute(
+                    f'INSERT INTO {qn(Message._meta.db_table)} (id, thread_id, sender_id, content, created_at) '
+                    'SELECT gen_random_uuid(), '
+                    '       (%(threads)s::uuid[])[1 + g %% %(n)s], '
+                    '       CASE WHEN (g / %(n)s) %% 2 = 0 THEN (%(a)s::uuid[])[1 + g %% %(n)s] '
+                    '            ELSE (%(b)s::uuid[])[1 + g %% %(n)s] END, '
+                    '       (SELECT string_agg((%(words)s::text[])[1 + floor(random() * %(nw)s)::int], \' \') '
+                    '          FROM generate_series(1, %(len)s + 0 * g)), '
+                    '       now() - make_interval(secs => (%(total)s - g) * 5) '
+                    'FROM generate_series(%(start)s, %(stop)s) AS g',
+                    {
+                        'threads': thread_ids,
+                        'a': a_ids,
+                        'b': b_ids,
+                        'n': len(thread_ids),
+                        'words': list(WORDS),
+                        'nw': len(WORDS),
+                        'len': n_words,
+                        'total': n_messages,
+                        'start': offset,
+                        'stop': offset + count - 1,
+                    },
+                )
+                self.stdout.write(f'  {offset + count}/{n_messages}')
+
+    def _queries(self, rng, n):
+        queries = []
+        for i in range(max(1, n)):
+            shape = i % 4
+            if shape == 0:
+                queries.append(rng.choice(WORDS))
+            elif shape == 1:
+                queries.append(' '.join(rng.sample(WORDS, 2)))
+            elif shape == 2:
+                queries.append('"{} {}"'.format(*rng.sample(WORDS, 2)))
+            else:
+                queries.append('{} -{}'.format(*rng.sample(WORDS, 2)))
+        return queries
+
+    def _cleanup(self, tag):
+        # Found by tag, so a seed that failed halfway is removed too.
+        users = list(User.objects.filter(username__startswith=f'bench-search-{tag}-').values_list('id', flat=True))
+        thread_ids = [
+            str(t) for t in ThreadParticipant.objects.filter(user_id__in=users).values_list('thread_id', flat=True).distinct()
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connection.ops.quote_name(Message._meta.db_table)} WHERE thread_id = ANY(%s::uuid[])',
+                [thread_ids],
+            )
+        Thread.objects.filter(id__in=thread_ids).delete()
+        User.objects.filter(id__in=users).delete()
+        self.stdout.write('Removed seeded data.')
@@ -0,0 +1,37 @@
+"""
+Management command that backfills / repairs the DM inbox summaries.
+Usage: python manage.py rebuild_thread_summaries [--thread <uuid>] [--batch-size 500]
+
+Existing threads are backfilled by the migration that adds the summaries; run
+this any time the denormalized last-message / unread columns are suspected to drift.
+Each batch of threads is recomputed from the messages table in two UPDATEs.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from messages.models import Thread
+from messages.services import rebuild_thread_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recomputes DM thread summaries (last message, unread counters) from messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--thread', dest='thread_id', help='Only rebuild this thread id')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        ids = Thread.objects.order_by('id').values_list('id', flat=True)
+        if options['thread_id']:
+            ids = ids.filter(id=options['thread_id'])
+        ids = list(ids)
+
+        batch_size = max(1, options['batch_size'])
+        done = 0
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
+            with transaction.atomic():
+                done += rebuild_thread_summaries(batch)
+            self.stdout.write(f'  {done}/{len(ids)} threads')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt summaries for {done} threads'))
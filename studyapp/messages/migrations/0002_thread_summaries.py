@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Left
+
+BATCH_SIZE = 500
+
+
+def backfill_summaries(apps, schema_editor):
+    """
+    Same recompute as `rebuild_thread_summaries`, so existing threads have
+    their last message and unread counters (which mark-read subtracts from
+    the badge) as soon as the migration finishes.
+    """
+    Thread = apps.get_model('study_messages', 'Thread')
+    ThreadParticipant = apps.get_model('study_messages', 'ThreadParticipant')
+    Message = apps.get_model('study_messages', 'Message')
+
+    latest = Message.objects.filter(thread_id=OuterRef('pk')).order_by('-created_at', '-id')
+    unread = (
+        Message.objects.filter(
+            thread_id=OuterRef('thread_id'),
+            created_at__gt=Coalesce(OuterRef('last_read_at'), OuterRef('joined_at')),
+        )
+        .exclude(sender_id=OuterRef('user_id'))
+        .order_by()
+        .values('thread_id')
+        .annotate(n=Count('id'))
+        .values('n')
+    )
+    ids = list(Thread.objects.order_by('id').values_list('id', flat=True))
+    for i in range(0, len(ids), BATCH_SIZE):
+        batch = ids[i:i + BATCH_SIZE]
+        Thread.objects.filter(id__in=batch).update(
+            last_message_id=Subquery(latest.values('id')[:1]),
+            last_message_preview=Coalesce(Left(Subquery(latest.values('content')[:1]), 200), Value('')),
+            last_message_sender_id=Subquery(latest.values('sender_id')[:1]),
+            last_message_at=Subquery(latest.values('created_at')[:1]),
+        )
+        ThreadParticipant.objects.filter(thread_id__in=batch).update(unread_count=Coalesce(Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_messages', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='study_messages.message'),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 import uuid
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
@@ -33,6 +35,23 @@ class Thread(models.Model):
     updated_at = models.DateTimeField(auto_now=True, db_index=True)
     last_message_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
+    # Inbox summary, kept in step with new messages (see messages.services.summarize_new_messages)
+    last_message = models.ForeignKey(
+        "Message",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    last_message_preview = models.CharField(max_length=200, blank=True, default="")
+    last_message_sender = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
     class Meta:
         db_table = "threads"
         ordering = ["-last_message_at", "-updated_at"]
@@ -67,6 +86,8 @@ class ThreadParticipant(models.Model):
     joined_at = models.DateTimeField(default=timezone.now, db_index=True)
     # Read cursor for unread counts (per-thread, per-user)
     last_read_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Messages from others after the read cursor (denormalized; `rebuild_thread_summaries` recomputes it)
+    unread_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         db_table = "thread_participants"
@@ -92,12 +113,28 @@ class Message(models.Model):
 
     content = models.TextField(blank=True)
     created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # Client-generated idempotency key for websocket sends (a retried frame maps to the same message)
+    client_key = models.CharField(max_length=64, null=True, blank=True)
+    # Full-text search document, computed by Postgres on every insert/update (see messages.search)
+    search_vector = models.GeneratedField(
+        expression=SearchVector("content", config="english"),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
         db_table = "messages"
         ordering = ["created_at"]
         indexes = [
             models.Index(fields=["thread", "created_at"]),
+            GinIndex(fields=["search_vector"], name="messages_search_gin"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sender", "client_key"],
+                condition=models.Q(client_key__isnull=False),
+                name="uniq_message_sender_client_key",
+            ),
         ]
 
     def __str__(self) -> str:
@@ -1,30 +1,263 @@
+"""
+Who is connected to the DM socket.
+
+Presence is tracked per socket: a user with two tabs stays online until both
+close, and each socket entry expires unless refreshed by `presence_ping`, so a
+worker that dies without running disconnect can't leave users online forever.
+
+The store is picked with MESSAGES_PRESENCE_BACKEND (dotted path). It must be
+shared by every worker process, otherwise each worker answers differently:
+- `RedisPresenceBackend` (default when REDIS_URL is set): one sorted set per user.
+- `SQLitePresenceBackend` (default otherwise): a local SQLite file, shared by the
+  worker processes of a single node.
+- `CachePresenceBackend`: Django's cache; only cross-process when CACHES points
+  at a shared cache.
+"""
 from __future__ import annotations
 
-from django.core.cache import cache
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterable
 
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
 
 _PREFIX = "messages:online:"
-_TTL_SECONDS = 90  # keep short; refreshed by pings while connected
 
 
-def _key(user_id) -> str:
-    return f"{_PREFIX}{user_id}"
+def _ttl() -> int:
+    # Keep short; refreshed by pings (every 30s) while connected.
+    return int(getattr(settings, "MESSAGES_PRESENCE_TTL", 90))
 
 
-def set_online(user_id) -> None:
-    cache.set(_key(user_id), True, timeout=_TTL_SECONDS)
+class PresenceBackend(ABC):
+    """
+    `connect`/`disconnect` report transitions: True when the user just came
+    online (first live socket) / just went offline (no live socket left).
+    """
 
+    def __init__(self):
+        self.ttl = _ttl()
 
-def refresh_online(user_id) -> None:
-    # Touch TTL without changing semantics
-    cache.set(_key(user_id), True, timeout=_TTL_SECONDS)
+    @abstractmethod
+    def connect(self, user_id: str, conn_id: str) -> bool:
+        ...
 
+    def refresh(self, user_id: str, conn_id: str) -> None:
+        self.connect(user_id, conn_id)
 
-def set_offline(user_id) -> None:
-    cache.delete(_key(user_id))
+    @abstractmethod
+    def disconnect(self, user_id: str, conn_id: str) -> bool:
+        ...
 
+    @abstractmethod
+    def get_many_online(self, user_ids: Iterable[str]) -> Dict[str, bool]:
+        ...
 
-def is_online(user_id) -> bool:
-    return bool(cache.get(_key(user_id), False))
 
+class RedisPresenceBackend(PresenceBackend):
+    """
+    `messages:online:<user_id>` is a sorted set of socket ids scored by expiry time.
+    """
+
+    def __init__(self):
+        super().__init__()
+        import redis
+
+        self.client = redis.Redis.from_url(getattr(settings, "MESSAGES_PRESENCE_REDIS_URL", None) or settings.REDIS_URL)
+
+    def _key(self, user_id: str) -> str:
+        return f"{_PREFIX}{user_id}"
+
+    def connect(self, user_id, conn_id):
+        now, key = time.time(), self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(key, "-inf", now)
+        pipe.zcard(key)
+        pipe.zadd(key, {conn_id: now + self.ttl})
+        pipe.expire(key, self.ttl)
+        _, before, _, _ = pipe.execute()
+        return before == 0
+
+    def refresh(self, user_id, conn_id):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.zadd(key, {conn_id: time.time() + self.ttl})
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def disconnect(self, user_id, conn_id):
+        now, key = time.time(), self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.zrem(key, conn_id)
+        pipe.zremrangebyscore(key, "-inf", now)
+        pipe.zcard(key)
+        _, _, left = pipe.execute()
+        return left == 0
+
+    def get_many_online(self, user_ids):
+        ids = [str(uid) for uid in user_ids]
+        if not ids:
+            return {}
+        now = time.time()
+        pipe = self.client.pipeline()
+        for uid in ids:
+            pipe.zcount(self._key(uid), f"({now}", "+inf")
+        return {uid: bool(n) for uid, n in zip(ids, pipe.execute())}
+
+
+class SQLitePresenceBackend(PresenceBackend):
+    """
+    Single-node stand-in: a WAL-mode SQLite file every worker process opens.
+    """
+
+    _BATCH = 500
+
+    def __init__(self):
+        super().__init__()
+        self.path = str(getattr(settings, "MESSAGES_PRESENCE_PATH", settings.BASE_DIR / "presence.sqlite3"))
+        self._local = threading.local()
+        with self._tx() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS presence ("
+                "user_id TEXT NOT NULL, conn_id TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (user_id, conn_id))"
+            )
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _tx(self):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def connect(self, user_id, conn_id):
+        now = time.time()
+        with self._tx() as db:
+            db.execute("DELETE FROM presence WHERE expires_at <= ?", (now,))
+            (before,) = db.execute("SELECT COUNT(*) FROM presence WHERE user_id = ?", (str(user_id),)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO presence (user_id, conn_id, expires_at) VALUES (?, ?, ?)",
+                (str(user_id), conn_id, now + self.ttl),
+            )
+        return before == 0
+
+    def refresh(self, user_id, conn_id):
+        with self._tx() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO presence (user_id, conn_id, expires_at) VALUES (?, ?, ?)",
+                (str(user_id), conn_id, time.time() + self.ttl),
+            )
+
+    def disconnect(self, user_id, conn_id):
+        with self._tx() as db:
+            db.execute("DELETE FROM presence WHERE user_id = ? AND conn_id = ?", (str(user_id), conn_id))
+            (left,) = db.execute(
+                "SELECT COUNT(*) FROM presence WHERE user_id = ? AND expires_at > ?", (str(user_id), time.time())
+            ).fetchone()
+        return left == 0
 
+    def get_many_online(self, user_ids):
+        ids = list(dict.fromkeys(str(uid) for uid in user_ids))
+        online = set()
+        now = time.time()
+        for i in range(0, len(ids), self._BATCH):
+            chunk = ids[i : i + self._BATCH]
+            marks = ",".join("?" * len(chunk))
+            rows = self._db().execute(
+                f"SELECT DISTINCT user_id FROM presence WHERE expires_at > ? AND user_id IN ({marks})", [now, *chunk]
+            )
+            online.update(uid for (uid,) in rows)
+        return {uid: uid in online for uid in ids}
+
+
+class CachePresenceBackend(PresenceBackend):
+    """
+    `messages:online:<user_id>` holds {socket id: expiry}. Updates are
+    read-modify-write, so a socket lost to a race comes back on its next ping.
+    """
+
+    def _key(self, user_id) -> str:
+        return f"{_PREFIX}{user_id}"
+
+    def _live(self, user_id) -> Dict[str, float]:
+        now = time.time()
+        return {conn: exp for conn, exp in (cache.get(self._key(user_id)) or {}).items() if exp > now}
+
+    def connect(self, user_id, conn_id):
+        sockets = self._live(user_id)
+        before = len(sockets)
+        sockets[conn_id] = time.time() + self.ttl
+        cache.set(self._key(user_id), sockets, timeout=self.ttl)
+        return before == 0
+
+    def disconnect(self, user_id, conn_id):
+        sockets = self._live(user_id)
+        sockets.pop(conn_id, None)
+        if sockets:
+            cache.set(self._key(user_id), sockets, timeout=self.ttl)
+        else:
+            cache.delete(self._key(user_id))
+        return not sockets
+
+    def get_many_online(self, user_ids):
+        ids = [str(uid) for uid in user_ids]
+        found = cache.get_many([self._key(uid) for uid in ids])
+        now = time.time()
+        return {
+            uid: any(exp > now for exp in (found.get(self._key(uid)) or {}).values())
+            for uid in ids
+        }
+
+
+@lru_cache(maxsize=1)
+def get_backend() -> PresenceBackend:
+    path = getattr(settings, "MESSAGES_PRESENCE_BACKEND", None)
+    if not path:
+        path = (
+            "messages.presence.RedisPresenceBackend"
+            if getattr(settings, "REDIS_URL", None)
+            else "messages.presence.SQLitePresenceBackend"
+        )
+    return import_string(path)()
+
+
+def set_online(user_id, conn_id: str = "") -> bool:
+    return get_backend().connect(str(user_id), conn_id)
+
+
+def refresh_online(user_id, conn_id: str = "") -> None:
+    get_backend().refresh(str(user_id), conn_id)
+
+
+def set_offline(user_id, conn_id: str = "") -> bool:
+    return get_backend().disconnect(str(user_id), conn_id)
+
+
+def get_many_online(user_ids) -> Dict[str, bool]:
+    """
+    Online flag per user id (as str), in one backend round-trip.
+    """
+    return get_backend().get_many_online(user_ids)
+
+
+def is_online(user_id) -> bool:
+    return get_many_online([user_id]).get(str(user_id), False)
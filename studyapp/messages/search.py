@@ -0,0 +1,96 @@
+"""
+Full-text search over direct messages and discussion thread messages.
+
+Both tables carry a generated `search_vector` (to_tsvector('english', content))
+with a GIN index, so Postgres keeps it current on every insert, including
+bulk inserts. Results are newest first and keyset-paginated on
+(created_at, id); ranking by relevance would need to score every match,
+which is what the GIN index lets us avoid.
+"""
+from __future__ import annotations
+
+import heapq
+from typing import List, Optional, Tuple
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery
+from django.db.models import Q
+from django.utils.html import escape
+
+from thread.models import ThreadMessage
+
+from .models import Message
+
+KIND_DIRECT = "direct"
+KIND_DISCUSSION = "discussion"
+KINDS = (KIND_DIRECT, KIND_DISCUSSION)
+
+# Control characters can't come out of user text through the headline, so they
+# can mark hits safely; the rest of the snippet is escaped.
+_START, _STOP = "\x02", "\x03"
+
+
+def _before(qs, cursor):
+    if cursor is None:
+        return qs
+    created_at, message_id = cursor
+    return qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id))
+
+
+def _scoped(model, user):
+    qs = model.objects.all()
+    if user.role != "ADMIN":
+        qs = qs.filter(thread__participants__user=user)
+    return qs
+
+
+def _page(model, kind, user, query, cursor, limit) -> List[dict]:
+    qs = (
+        _before(_scoped(model, user).filter(search_vector=query), cursor)
+        .select_related("sender", "thread")
+        .annotate(
+            snippet=SearchHeadline(
+                "content",
+                query,
+                config="english",
+                start_sel=_START,
+                stop_sel=_STOP,
+                max_words=30,
+                min_words=12,
+                max_fragments=2,
+            )
+        )
+        .order_by("-created_at", "-id")[:limit]
+    )
+    return [
+        {
+            "kind": kind,
+            "message": m,
+            "snippet": escape(m.snippet).replace(_START, "<mark>").replace(_STOP, "</mark>"),
+        }
+        for m in qs
+    ]
+
+
+def search_messages(
+    user,
+    q: str,
+    *,
+    kinds=KINDS,
+    cursor: Optional[Tuple] = None,
+    limit: int = 20,
+) -> Tuple[List[dict], bool]:
+    """
+    Messages matching `q` (web-search syntax: words, "phrases", -exclusions, OR)
+    in threads `user` participates in (every thread for ADMIN), strictly older
+    than `cursor`. Returns (hits, has_more); each hit has kind, message, snippet.
+    """
+    query = SearchQuery(q, search_type="websearch", config="english")
+    pages = []
+    if KIND_DIRECT in kinds:
+        pages.append(_page(Message, KIND_DIRECT, user, query, cursor, limit + 1))
+    if KIND_DISCUSSION in kinds:
+        pages.append(_page(ThreadMessage, KIND_DISCUSSION, user, query, cursor, limit + 1))
+    merged = list(
+        heapq.merge(*pages, key=lambda hit: (hit["message"].created_at, str(hit["message"].id)), reverse=True)
+    )
+    return merged[:limit], len(merged) > limit
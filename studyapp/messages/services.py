@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+from collections import defaultdict
 from dataclasses import dataclass
 
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Left
+from django.utils import timezone
 
 from account.models import User, Student, Teacher
 from assingment.models import TeacherAssignment
+from realtime.services import send_to_groups
 
-from .models import Thread, ThreadParticipant
+from .models import Message, Thread, ThreadParticipant
 
 
 @dataclass(frozen=True)
@@ -67,6 +73,149 @@ def can_initiate_direct_thread(initiator: User, target: User) -> ChatEligibility
     return ChatEligibility(False, "Not allowed.")
 
 
+def unread_count_for(participant: ThreadParticipant) -> int:
+    """
+    Unread messages in one thread for one participant (based on its read cursor).
+    """
+    cursor = participant.last_read_at or participant.joined_at
+    return (
+        Message.objects.filter(thread_id=participant.thread_id, created_at__gt=cursor)
+        .exclude(sender_id=participant.user_id)
+        .count()
+    )
+
+
+_PARTICIPANTS_PREFIX = "messages:participants:"
+_PARTICIPANTS_TTL_SECONDS = 600
+
+
+def user_group_name(user_id) -> str:
+    """
+    Channel group of one user's DM sockets. DM events are routed here rather than
+    to per-thread groups, so a socket joins one group however many threads it has.
+    """
+    return f"user_{user_id}"
+
+
+def thread_participant_ids(thread_id) -> list[str]:
+    """
+    User ids of a thread's participants (cached; DM participants don't change).
+    """
+    key = f"{_PARTICIPANTS_PREFIX}{thread_id}"
+    ids = cache.get(key)
+    if ids is None:
+        ids = [str(uid) for uid in ThreadParticipant.objects.filter(thread_id=thread_id).values_list("user_id", flat=True)]
+        if ids:
+            cache.set(key, ids, timeout=_PARTICIPANTS_TTL_SECONDS)
+    return ids
+
+
+def forget_thread_participants(thread_id) -> None:
+    cache.delete(f"{_PARTICIPANTS_PREFIX}{thread_id}")
+
+
+def peer_user_ids(user_id) -> list[str]:
+    """
+    Everyone sharing a DM thread with `user_id` (one query).
+    """
+    return [
+        str(uid)
+        for uid in ThreadParticipant.objects.filter(thread__participants__user_id=user_id)
+        .exclude(user_id=user_id)
+        .values_list("user_id", flat=True)
+        .distinct()
+    ]
+
+
+def send_to_thread(thread_id, message: dict, *, participant_ids=None) -> None:
+    """
+    Deliver a DM event to every participant's user group.
+    """
+    ids = participant_ids if participant_ids is not None else thread_participant_ids(thread_id)
+    send_to_groups([(user_group_name(uid), message) for uid in ids])
+
+
+PREVIEW_CHARS = 200
+
+
+def message_preview(content: str) -> str:
+    return (content or "")[:PREVIEW_CHARS]
+
+
+def summarize_new_messages(messages) -> dict:
+    """
+    Fold just-saved messages into the inbox summaries: each thread's last
+    message and every participant's unread counter. Sending marks the thread
+    read for the sender up to their own last message.
+
+    Returns the unread change per user id, for the badge counters.
+    """
+    by_thread = defaultdict(list)
+    for m in messages:
+        by_thread[m.thread_id].append(m)
+
+    deltas = defaultdict(int)
+    for thread_id, msgs in by_thread.items():
+        msgs.sort(key=lambda m: (m.created_at, str(m.id)))
+        last = msgs[-1]
+        Thread.objects.filter(id=thread_id).filter(
+            Q(last_message_at__isnull=True) | Q(last_message_at__lte=last.created_at)
+        ).update(
+            last_message=last,
+            last_message_preview=message_preview(last.content),
+            last_message_sender_id=last.sender_id,
+            last_message_at=last.created_at,
+            updated_at=timezone.now(),
+        )
+
+        for part in ThreadParticipant.objects.filter(thread_id=thread_id).only("id", "user_id", "unread_count"):
+            own = [i for i, m in enumerate(msgs) if m.sender_id == part.user_id]
+            if own:
+                # Read up to their own last message; only later ones from others count.
+                unread = sum(1 for m in msgs[own[-1] + 1 :] if m.sender_id != part.user_id)
+                ThreadParticipant.objects.filter(id=part.id).update(
+                    unread_count=unread, last_read_at=msgs[own[-1]].created_at
+                )
+                deltas[part.user_id] += unread - part.unread_count
+            else:
+                ThreadParticipant.objects.filter(id=part.id).update(unread_count=F("unread_count") + len(msgs))
+                deltas[part.user_id] += len(msgs)
+    return {uid: d for uid, d in deltas.items() if d}
+
+
+def rebuild_thread_summaries(thread_ids=None) -> int:
+    """
+    Recompute summaries from the messages table (backfill / drift repair).
+    Returns the number of threads updated.
+    """
+    threads = Thread.objects.all()
+    parts = ThreadParticipant.objects.all()
+    if thread_ids is not None:
+        threads = threads.filter(id__in=thread_ids)
+        parts = parts.filter(thread_id__in=thread_ids)
+
+    latest = Message.objects.filter(thread_id=OuterRef("pk")).order_by("-created_at", "-id")
+    updated = threads.update(
+        last_message_id=Subquery(latest.values("id")[:1]),
+        last_message_preview=Coalesce(Left(Subquery(latest.values("content")[:1]), PREVIEW_CHARS), Value("")),
+        last_message_sender_id=Subquery(latest.values("sender_id")[:1]),
+        last_message_at=Subquery(latest.values("created_at")[:1]),
+    )
+    unread = (
+        Message.objects.filter(
+            thread_id=OuterRef("thread_id"),
+            created_at__gt=Coalesce(OuterRef("last_read_at"), OuterRef("joined_at")),
+        )
+        .exclude(sender_id=OuterRef("user_id"))
+        .order_by()
+        .values("thread_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    parts.update(unread_count=Coalesce(Subquery(unread), 0))
+    return updated
+
+
 def can_participate(user: User, thread: Thread) -> bool:
     return ThreadParticipant.objects.filter(thread=thread, user=user).exists()
 
@@ -90,6 +239,8 @@ def get_or_create_direct_thread(*, initiator: User, target: User) -> tuple[Threa
     # Ensure participants exist
     ThreadParticipant.objects.get_or_create(thread=thread, user=initiator)
     ThreadParticipant.objects.get_or_create(thread=thread, user=target)
+    if created:
+        forget_thread_participants(thread.id)
 
     return thread, created
 
@@ -1,3 +1,73 @@
-from django.test import TestCase
+import os
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from account.models import User
+from uploads.models import ChunkedUpload
+from uploads.tests import MediaRootMixin, finished_upload
+
+from .models import Message, MessageAttachment, Thread, ThreadParticipant
+from .presence import PresenceBackend
+
+
+class SendMessageTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user('admin@example.com', 'admin', 'pw', role='ADMIN')
+        self.teacher = User.objects.create_user('teacher@example.com', 'teacher', 'pw', role='TEACHER')
+        self.rep = User.objects.create_user('rep@example.com', 'rep', 'pw', role='CS_REP')
+        self.client.force_login(self.admin)
+
+    def _thread(self, other):
+        key = ':'.join(sorted([str(self.admin.id), str(other.id)]))
+        thread = Thread.objects.create(direct_key=key, created_by=self.admin)
+        ThreadParticipant.objects.create(thread=thread, user=self.admin)
+        ThreadParticipant.objects.create(thread=thread, user=other)
+        return thread
+
+    def _send(self, thread, **data):
+        return self.client.post(reverse('messages:send_message', args=[thread.id]), data)
+
+    def test_retry_with_client_key_returns_stored_message(self):
+        thread = self._thread(self.teacher)
+        first = self._send(thread, content='hello', client_key='k1')
+        retry = self._send(thread, content='hello', client_key='k1')
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()['message']['id'], first.json()['message']['id'])
+        self.assertEqual(Message.objects.filter(client_key='k1').count(), 1)
+
+    def test_client_key_of_another_conversation_is_rejected(self):
+        self._send(self._thread(self.teacher), content='hello', client_key='k1')
+        response = self._send(self._thread(self.rep), content='hi', client_key='k1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Message.objects.filter(client_key='k1').count(), 1)
+
+    def test_chunked_upload_is_stored_and_its_partial_removed(self):
+        upload = finished_upload(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._send(self._thread(self.teacher), upload_tokens=upload.token)
+        self.assertEqual(response.status_code, 200)
+        attachment = MessageAttachment.objects.get()
+        self.assertEqual(attachment.file.read(), b'hello world')
+        self.assertFalse(os.path.exists(upload.partial_path()))
+
+    def test_chunked_upload_over_the_limit_is_rejected(self):
+        upload = finished_upload(self.admin)
+        with mock.patch('messages.views.MAX_UPLOAD_BYTES', 4):
+            response = self._send(self._thread(self.teacher), content='hi', upload_tokens=upload.token)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Message.objects.exists())
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, ChunkedUpload.STATUS_COMPLETE)
+
+
+class PresenceBackendTests(SimpleTestCase):
+    def test_backend_missing_a_method_fails_when_created(self):
+        class ConnectOnly(PresenceBackend):
+            def connect(self, user_id, conn_id):
+                return True
+
+        with self.assertRaises(TypeError):
+            ConnectOnly()
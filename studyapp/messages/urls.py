@@ -15,6 +15,8 @@ urlpatterns = [
     path("api/threads/<uuid:thread_id>/send/", views.send_message_api, name="send_message"),
     path("api/threads/<uuid:thread_id>/mark-read/", views.mark_thread_read_api, name="mark_thread_read"),
     path("api/threads/<uuid:thread_id>/delete/", views.delete_thread_api, name="delete_thread"),
+    # Full-text search over direct + discussion messages
+    path("api/search/", views.search_api, name="search"),
 ]
 
 
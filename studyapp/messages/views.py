@@ -1,19 +1,34 @@
 from __future__ import annotations
 
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.db.models import Q
-from django.db.models import Prefetch
+from django.db.models import OuterRef, Subquery
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
+from account.cards import get_user_card, get_user_cards
 from account.models import User, Student, Teacher
 
 from .models import Message, MessageAttachment, Thread, ThreadParticipant
-from .presence import is_online
-from .services import can_initiate_direct_thread, get_or_create_direct_thread
-from realtime.services import publish_badges
+from .presence import get_many_online
+from .search import KINDS, search_messages
+from .services import (
+    can_initiate_direct_thread,
+    forget_thread_participants,
+    get_or_create_direct_thread,
+    send_to_thread,
+    summarize_new_messages,
+    thread_participant_ids,
+    user_group_name,
+)
+from realtime.services import adjust_badges, publish_badges, send_to_group
+from uploads.services import UploadError, claim_uploads
+from uploads.thumbnails import preview_url, thumb_url
 
 
 def _json_error(message: str, status: int = 400, **extra):
@@ -28,35 +43,31 @@ def _json_ok(**data):
     return JsonResponse(payload)
 
 
-def _user_avatar_url(request, user: User) -> str | None:
-    if getattr(user, "profile_picture", None) and getattr(user.profile_picture, "url", None):
-        return request.build_absolute_uri(user.profile_picture.url)
-    return None
+def _absolute_url(request, url: str) -> str:
+    # Without a request (websocket sends) URLs stay site-relative.
+    return request.build_absolute_uri(url) if request is not None else url
 
 
-def _serialize_user(request, user: User) -> dict:
-    name = user.get_full_name() or user.email
-    display_id = None
-    try:
-        if user.role == "STUDENT" and hasattr(user, "student_profile"):
-            display_id = str(user.student_profile.student_id).zfill(4)
-        elif user.role == "TEACHER" and hasattr(user, "teacher_profile") and user.teacher_profile.teacher_id:
-            display_id = str(user.teacher_profile.teacher_id).zfill(4)
-    except Exception:
-        display_id = None
-    if not display_id:
-        # Fallback: short UUID
-        display_id = str(user.id).split("-")[0]
+def _optional_url(request, url: str | None) -> str | None:
+    return _absolute_url(request, url) if url else None
+
+
+def _render_card(request, card: dict) -> dict:
     return {
-        "id": str(user.id),
-        "name": name,
-        "email": user.email,
-        "role": user.role,
-        "display_id": display_id,
-        "avatar_url": _user_avatar_url(request, user),
+        "id": card["id"],
+        "name": card["name"],
+        "email": card["email"],
+        "role": card["role"],
+        "display_id": card["display_id"],
+        # Chat avatars are small: the card points at the WebP thumbnail once derived.
+        "avatar_url": _optional_url(request, card["avatar_url"]),
     }
 
 
+def _serialize_user(request, user: User) -> dict:
+    return _render_card(request, get_user_card(user))
+
+
 def _assigned_teacher_user_ids_for_student(student_user: User):
     try:
         sp = student_user.student_profile
@@ -111,75 +122,56 @@ def allowed_users_api(request):
     if q:
         qs = qs.filter(Q(first_name__icontains=q) | Q(last_name__icontains=q) | Q(email__icontains=q))
 
-    users = [_serialize_user(request, u) for u in qs.order_by("role", "first_name", "last_name")[:200]]
+    ids = list(qs.order_by("role", "first_name", "last_name").values_list("id", flat=True)[:200])
+    cards = get_user_cards(ids)
+    users = [_render_card(request, cards[str(uid)]) for uid in ids if str(uid) in cards]
     return _json_ok(users=users)
 
 
 @login_required
 def list_threads_api(request):
+    """
+    Inbox: rendered from the thread summaries in one query (the counterpart's
+    participant row joined to its thread and user, with my unread counter).
+    """
     user: User = request.user
 
-    participants_qs = ThreadParticipant.objects.filter(user=user).select_related("thread")
-    thread_ids = participants_qs.values_list("thread_id", flat=True)
-
-    threads = (
-        Thread.objects.filter(id__in=thread_ids)
-        .prefetch_related(
-            Prefetch(
-                "participants",
-                queryset=ThreadParticipant.objects.select_related("user"),
-            ),
-        )
-        .order_by("-last_message_at", "-updated_at")[:200]
+    mine = ThreadParticipant.objects.filter(thread_id=OuterRef("thread_id"), user=user)
+    rows = list(
+        ThreadParticipant.objects.filter(thread__participants__user=user)
+        .exclude(user=user)
+        .select_related("thread")
+        .annotate(my_unread=Subquery(mine.values("unread_count")[:1]))
+        .order_by("-thread__last_message_at", "-thread__updated_at")[:200]
     )
 
+    # Presence and user cards of every counterpart in one backend round-trip each
+    online = get_many_online(other_part.user_id for other_part in rows)
+    cards = get_user_cards(other_part.user_id for other_part in rows)
+
     data = []
-    for thread in threads:
-        other = None
-        my_part = None
-        other_part = None
-        for p in thread.participants.all():
-            if p.user_id == user.id:
-                my_part = p
-            else:
-                other = p.user
-                other_part = p
-
-        if not other or not my_part:
+    for other_part in rows:
+        thread = other_part.thread
+        other_id = str(other_part.user_id)
+        if other_id not in cards:
             continue
-
-        last_msg = (
-            Message.objects.filter(thread=thread)
-            .select_related("sender")
-            .order_by("-created_at")
-            .first()
-        )
-
-        # Unread count based on last_read_at cursor
-        cursor = my_part.last_read_at or my_part.joined_at
-        unread_count = (
-            Message.objects.filter(thread=thread, created_at__gt=cursor)
-            .exclude(sender=user)
-            .count()
-        )
-
         data.append(
             {
                 "id": str(thread.id),
-                "other_user": _serialize_user(request, other),
-                "other_last_read_at": other_part.last_read_at.isoformat() if other_part and other_part.last_read_at else None,
-                "other_user_online": is_online(other.id),
+                "other_user": _render_card(request, cards[other_id]),
+                "other_last_read_at": other_part.last_read_at.isoformat() if other_part.last_read_at else None,
+                "other_user_online": online.get(other_id, False),
                 "last_message": (
                     {
-                        "id": str(last_msg.id),
-                        "sender_id": str(last_msg.sender_id),
-                        "content": last_msg.content,
-                        "created_at": last_msg.created_at.isoformat(),
+                        "id": str(thread.last_message_id),
+                        "sender_id": str(thread.last_message_sender_id),
+                        "content": thread.last_message_preview,
+                        "created_at": thread.last_message_at.isoformat() if thread.last_message_at else None,
                     }
-                    if last_msg
+                    if thread.last_message_id
                     else None
                 ),
-                "unread_count": unread_count,
+                "unread_count": other_part.my_unread or 0,
                 "last_message_at": thread.last_message_at.isoformat() if thread.last_message_at else None,
             }
         )
@@ -187,47 +179,154 @@ def list_threads_api(request):
     return _json_ok(threads=data)
 
 
+def _message_cursor(m) -> str:
+    """
+    Opaque position of a message in its thread: "<created_at ISO>,<id>".
+    """
+    return f"{m.created_at.isoformat()},{m.id}"
+
+
+def _parse_cursor(raw: str):
+    created_at, sep, message_id = (raw or "").rpartition(",")
+    if not sep:
+        raise ValueError("bad cursor")
+    created = datetime.fromisoformat(created_at)
+    if timezone.is_naive(created):
+        created = timezone.make_aware(created, dt_timezone.utc)
+    return created, uuid.UUID(message_id)
+
+
+def _serialize_message(request, m: Message, attachments=None, cards=None) -> dict:
+    """
+    `cards`: user cards prefetched for a page (get_user_cards); otherwise the
+    sender's card is looked up on its own.
+    """
+    card = (cards or {}).get(str(m.sender_id)) or get_user_card(m.sender)
+    return {
+        "id": str(m.id),
+        "thread_id": str(m.thread_id),
+        "sender": _render_card(request, card),
+        "content": m.content,
+        "created_at": m.created_at.isoformat(),
+        "cursor": _message_cursor(m),
+        "attachments": [
+            {
+                "id": str(a.id),
+                "url": _absolute_url(request, a.file.url),
+                "thumb_url": _optional_url(request, thumb_url(a.file)),
+                "preview_url": _optional_url(request, preview_url(a.file)),
+                "name": a.original_name,
+                "content_type": a.content_type,
+                "size_bytes": a.size_bytes,
+                "duration_ms": a.duration_ms,
+            }
+            for a in (m.attachments.all() if attachments is None else attachments)
+        ],
+    }
+
+
 @login_required
 def thread_messages_api(request, thread_id):
+    """
+    One page of a thread's history, oldest first, in (created_at, id) order.
+
+    - no cursor: the latest `limit` messages
+    - `before=<cursor>`: the `limit` messages right before it (scrolling back)
+    - `after=<cursor>`: the `limit` messages right after it (gap-fill after a reconnect)
+
+    `prev_cursor` (pass as `before=`) is null once the start of the thread is
+    reached; `next_cursor` (pass as `after=`) is null once the page reaches the
+    newest message. Each page is an index range scan on (thread, created_at).
+    """
     user: User = request.user
     thread = get_object_or_404(Thread, id=thread_id)
     if not ThreadParticipant.objects.filter(thread=thread, user=user).exists():
         return _json_error("You do not have access to this conversation.", status=403)
 
-    limit = int(request.GET.get("limit") or 50)
+    try:
+        limit = int(request.GET.get("limit") or 50)
+    except ValueError:
+        return _json_error("Invalid limit.", status=400)
     limit = max(1, min(limit, 200))
 
-    qs = (
-        Message.objects.filter(thread=thread)
-        .select_related("sender")
-        .prefetch_related("attachments")
-        .order_by("-created_at")[:limit]
+    before, after = request.GET.get("before"), request.GET.get("after")
+    if before and after:
+        return _json_error("Use either before or after, not both.", status=400)
+    try:
+        cursor = _parse_cursor(before or after) if (before or after) else None
+    except ValueError:
+        return _json_error("Invalid cursor.", status=400)
+
+    qs = Message.objects.filter(thread=thread).prefetch_related("attachments")
+    if after:
+        created, message_id = cursor
+        qs = qs.filter(Q(created_at__gt=created) | Q(created_at=created, id__gt=message_id))
+        page = list(qs.order_by("created_at", "id")[: limit + 1])
+        has_newer, page = len(page) > limit, page[:limit]
+        has_older = True
+    else:
+        if before:
+            created, message_id = cursor
+            qs = qs.filter(Q(created_at__lt=created) | Q(created_at=created, id__lt=message_id))
+        page = list(qs.order_by("-created_at", "-id")[: limit + 1])
+        has_older, page = len(page) > limit, page[:limit]
+        page.reverse()
+        has_newer = bool(before)
+
+    if page:
+        prev_cursor = _message_cursor(page[0]) if has_older else None
+        next_cursor = _message_cursor(page[-1]) if has_newer else None
+    else:
+        # Nothing on this side: hand the caller's cursor back for the other direction.
+        prev_cursor = after if after else None
+        next_cursor = before if before else None
+
+    # Senders render from cached cards: cost grows with distinct senders, not messages.
+    cards = get_user_cards(m.sender_id for m in page)
+    return _json_ok(
+        messages=[_serialize_message(request, m, cards=cards) for m in page],
+        prev_cursor=prev_cursor,
+        next_cursor=next_cursor,
     )
 
-    messages = []
-    for m in reversed(list(qs)):
-        messages.append(
+
+@login_required
+def search_api(request):
+    """
+    Full-text search over the caller's direct and discussion messages (all of
+    them for ADMIN), newest first. `kind=direct|discussion` narrows it; pass
+    `next_cursor` back as `before=` for the next page.
+    """
+    user: User = request.user
+    q = (request.GET.get("q") or "").strip()
+    if len(q) < 2:
+        return _json_error("Search query must be at least 2 characters.", status=400)
+    kind = request.GET.get("kind") or ""
+    if kind and kind not in KINDS:
+        return _json_error("Invalid kind.", status=400)
+    try:
+        limit = max(1, min(int(request.GET.get("limit") or 20), 100))
+        cursor = _parse_cursor(request.GET["before"]) if request.GET.get("before") else None
+    except ValueError:
+        return _json_error("Invalid limit or cursor.", status=400)
+
+    hits, has_more = search_messages(user, q, kinds=(kind,) if kind else KINDS, cursor=cursor, limit=limit)
+    results = []
+    for hit in hits:
+        m = hit["message"]
+        results.append(
             {
+                "kind": hit["kind"],
                 "id": str(m.id),
-                "thread_id": str(thread.id),
-                "sender": _serialize_user(request, m.sender),
-                "content": m.content,
+                "thread_id": str(m.thread_id),
+                "thread_subject": getattr(m.thread, "subject", None),
+                "sender": {"id": str(m.sender_id), "name": m.sender.get_full_name() or m.sender.email},
                 "created_at": m.created_at.isoformat(),
-                "attachments": [
-                    {
-                        "id": str(a.id),
-                        "url": request.build_absolute_uri(a.file.url),
-                        "name": a.original_name,
-                        "content_type": a.content_type,
-                        "size_bytes": a.size_bytes,
-                        "duration_ms": a.duration_ms,
-                    }
-                    for a in m.attachments.all()
-                ],
+                "snippet": hit["snippet"],
             }
         )
-
-    return _json_ok(messages=messages)
+    next_cursor = _message_cursor(hits[-1]["message"]) if hits and has_more else None
+    return _json_ok(results=results, next_cursor=next_cursor)
 
 
 @login_required
@@ -273,13 +372,28 @@ def create_direct_thread_api(request):
     return _json_ok(thread={"id": str(thread.id), "other_user": _serialize_user(request, target)}, created=created)
 
 
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024  # 25MB, multipart and chunked alike
+
+
 def _validate_upload(f) -> tuple[bool, str | None]:
-    max_size = 25 * 1024 * 1024  # 25MB
-    if f.size > max_size:
+    if f.size > MAX_UPLOAD_BYTES:
         return False, "File too large (max 25MB)."
     return True, None
 
 
+def _stored_send(request, thread: Thread, user: User, client_key: str):
+    """
+    Response for a retried send: the message already stored under `client_key`,
+    or a 409 if the key was used in another conversation. None if not stored.
+    """
+    existing = Message.objects.filter(sender=user, client_key=client_key).select_related("sender").first()
+    if existing is None:
+        return None
+    if existing.thread_id != thread.id:
+        return _json_error("client_key was already used in another conversation.", status=409)
+    return _json_ok(message=_serialize_message(request, existing))
+
+
 @login_required
 @transaction.atomic
 def send_message_api(request, thread_id):
@@ -293,8 +407,10 @@ def send_message_api(request, thread_id):
 
     text = (request.POST.get("content") or "").strip()
     files = request.FILES.getlist("files")
+    # Finalized chunked uploads (see the uploads app), sent instead of multipart files.
+    upload_tokens = request.POST.getlist("upload_tokens")
 
-    if not text and not files:
+    if not text and not files and not upload_tokens:
         return _json_error("Message content or attachments are required.", status=400)
 
     for f in files:
@@ -302,11 +418,34 @@ def send_message_api(request, thread_id):
         if not ok:
             return _json_error(err or "Invalid upload.", status=400)
 
-    msg = Message(thread=thread, sender=user, content=text)
+    # Optional idempotency key (shared with websocket sends): a retry returns the stored message.
+    client_key = (request.POST.get("client_key") or "").strip()[:64] or None
+    if client_key:
+        stored = _stored_send(request, thread, user, client_key)
+        if stored:
+            return stored
+
+    try:
+        files += claim_uploads(user, upload_tokens, max_bytes=MAX_UPLOAD_BYTES)
+    except UploadError as exc:
+        return _json_error(str(exc), status=exc.status)
+
+    msg = Message(thread=thread, sender=user, content=text, client_key=client_key)
     if files:
         msg._has_attachments = True  # for model validation
-    msg.full_clean()
-    msg.save()
+    # The (sender, client_key) constraint is left to the insert: two concurrent
+    # retries can both pass the lookup above.
+    msg.full_clean(validate_constraints=False)
+    try:
+        with transaction.atomic():
+            msg.save()
+    except IntegrityError:
+        stored = _stored_send(request, thread, user, client_key) if client_key else None
+        if stored is None:
+            raise
+        # The other request's message wins; give back the uploads claimed here.
+        transaction.set_rollback(True)
+        return stored
 
     attachments = []
     for f in files:
@@ -319,37 +458,18 @@ def send_message_api(request, thread_id):
         )
         attachments.append(att)
 
-    # Update thread cursors
-    now = msg.created_at
-    Thread.objects.filter(id=thread.id).update(last_message_at=now, updated_at=timezone.now())
-    ThreadParticipant.objects.filter(thread=thread, user=user).update(last_read_at=now)
-
-    payload = {
-        "id": str(msg.id),
-        "thread_id": str(thread.id),
-        "sender": _serialize_user(request, user),
-        "content": msg.content,
-        "created_at": msg.created_at.isoformat(),
-        "attachments": [
-            {
-                "id": str(a.id),
-                "url": request.build_absolute_uri(a.file.url),
-                "name": a.original_name,
-                "content_type": a.content_type,
-                "size_bytes": a.size_bytes,
-                "duration_ms": a.duration_ms,
-            }
-            for a in attachments
-        ],
-    }
+    # Inbox summaries + badge counters: one more unread for everyone else; sending
+    # marks the thread read for the sender.
+    participant_ids = thread_participant_ids(thread.id)
+    for uid, delta in summarize_new_messages([msg]).items():
+        adjust_badges(user_ids=[uid], messages_unread=delta)
+
+    payload = _serialize_message(request, msg, attachments)
 
     _broadcast_message(thread_id=thread.id, message=payload, actor=user)
 
     # Badge counts: recipient(s) now have new unread messages; sender might also change in edge cases.
     try:
-        participant_ids = list(
-            ThreadParticipant.objects.filter(thread=thread).values_list("user_id", flat=True)
-        )
         for uid in participant_ids:
             publish_badges(user_id=uid)
     except Exception:
@@ -366,26 +486,27 @@ def mark_thread_read_api(request, thread_id):
     user: User = request.user
     thread = get_object_or_404(Thread, id=thread_id)
     now = timezone.now()
-    updated = ThreadParticipant.objects.filter(thread=thread, user=user).update(last_read_at=now)
-    if not updated:
-        return _json_error("You do not have access to this conversation.", status=403)
+    with transaction.atomic():
+        # Row lock: a concurrent send's unread increment lands before or after the reset, never lost.
+        my_part = ThreadParticipant.objects.select_for_update().filter(thread=thread, user=user).first()
+        if not my_part:
+            return _json_error("You do not have access to this conversation.", status=403)
+        unread = my_part.unread_count
+        ThreadParticipant.objects.filter(id=my_part.id).update(last_read_at=now, unread_count=0)
+        if unread:
+            adjust_badges(user_ids=[user.id], messages_unread=-unread)
 
     # Broadcast read receipt to the thread (best-effort)
     try:
-        from asgiref.sync import async_to_sync
-        from channels.layers import get_channel_layer
-
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                f"thread_{thread.id}",
-                {
-                    "type": "chat.read",
-                    "thread_id": str(thread.id),
-                    "reader_id": str(user.id),
-                    "read_at": now.isoformat(),
-                },
-            )
+        send_to_thread(
+            thread.id,
+            {
+                "type": "chat.read",
+                "thread_id": str(thread.id),
+                "reader_id": str(user.id),
+                "read_at": now.isoformat(),
+            },
+        )
     except Exception:
         pass
 
@@ -417,29 +538,25 @@ def delete_thread_api(request, thread_id):
     if not ThreadParticipant.objects.filter(thread=thread, user=user).exists():
         return _json_error("You do not have access to this conversation.", status=403)
 
-    # Capture participant IDs before deletion (for best-effort broadcasts)
-    participant_ids = list(ThreadParticipant.objects.filter(thread=thread).values_list("user_id", flat=True))
+    # Capture participant IDs (and their unread counts) before deletion
+    participants = list(ThreadParticipant.objects.filter(thread=thread))
+    participant_ids = [p.user_id for p in participants]
+    unread_by_user = {p.user_id: p.unread_count for p in participants}
 
     thread.delete()
+    for uid, unread in unread_by_user.items():
+        if unread:
+            adjust_badges(user_ids=[uid], messages_unread=-unread)
 
-    # Broadcast deletion (best-effort)
+    forget_thread_participants(thread_id)
+
+    # Broadcast deletion to both participants (best-effort)
     try:
-        from asgiref.sync import async_to_sync
-        from channels.layers import get_channel_layer
-
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            # Thread group (connected participants)
-            async_to_sync(channel_layer.group_send)(
-                f"thread_{thread_id}",
-                {"type": "chat.thread_deleted", "thread_id": str(thread_id), "actor_id": str(user.id)},
-            )
-            # User groups (so clients can drop it even if not currently subscribed)
-            for uid in participant_ids:
-                async_to_sync(channel_layer.group_send)(
-                    f"user_{uid}",
-                    {"type": "chat.thread_deleted", "thread_id": str(thread_id), "actor_id": str(user.id)},
-                )
+        send_to_thread(
+            thread_id,
+            {"type": "chat.thread_deleted", "thread_id": str(thread_id), "actor_id": str(user.id)},
+            participant_ids=participant_ids,
+        )
     except Exception:
         pass
 
@@ -455,17 +572,11 @@ def delete_thread_api(request, thread_id):
 
 def _broadcast_message(*, thread_id, message: dict, actor: User):
     """
-    Best-effort: broadcast message to websocket group for the thread.
+    Best-effort: broadcast message to the participants' websocket groups.
     """
     try:
-        from asgiref.sync import async_to_sync
-        from channels.layers import get_channel_layer
-
-        channel_layer = get_channel_layer()
-        if not channel_layer:
-            return
-        async_to_sync(channel_layer.group_send)(
-            f"thread_{thread_id}",
+        send_to_thread(
+            thread_id,
             {"type": "chat.message", "message": message, "actor_id": str(actor.id)},
         )
     except Exception:
@@ -475,14 +586,8 @@ def _broadcast_message(*, thread_id, message: dict, actor: User):
 
 def _broadcast_conversation_created(*, thread_id, target_user_id, actor: User):
     try:
-        from asgiref.sync import async_to_sync
-        from channels.layers import get_channel_layer
-
-        channel_layer = get_channel_layer()
-        if not channel_layer:
-            return
-        async_to_sync(channel_layer.group_send)(
-            f"user_{target_user_id}",
+        send_to_group(
+            user_group_name(target_user_id),
             {"type": "chat.thread_created", "thread_id": str(thread_id), "actor_id": str(actor.id)},
         )
     except Exception:
@@ -0,0 +1,155 @@
+"""
+Batched persistence for text messages sent over the DM websocket.
+
+`message_writer.submit(...)` queues a message and returns a Future. A daemon
+thread collects whatever arrives within MESSAGES_WRITER_FLUSH_MS (up to
+MESSAGES_WRITER_MAX_BATCH) and writes it in one transaction: one bulk INSERT,
+the inbox summaries, badge counters and the realtime fanout (through the
+outbox). Each Future resolves to the serialized message.
+
+Sends are idempotent per (sender, client_key): a retried frame resolves to
+the message stored the first time.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from account.cards import get_user_cards
+from realtime.services import adjust_badges, publish_badges, send_to_groups
+
+from .models import Message
+from .services import summarize_new_messages, thread_participant_ids, user_group_name
+
+logger = logging.getLogger(__name__)
+
+
+def _flush_seconds() -> float:
+    return max(0, int(getattr(settings, "MESSAGES_WRITER_FLUSH_MS", 5))) / 1000.0
+
+
+def _max_batch() -> int:
+    return max(1, int(getattr(settings, "MESSAGES_WRITER_MAX_BATCH", 200)))
+
+
+@dataclass
+class PendingMessage:
+    thread_id: str
+    sender_id: str
+    content: str
+    client_key: str
+    created_at: datetime = field(default_factory=timezone.now)
+    future: Future = field(default_factory=Future)
+
+
+class MessageWriter:
+    def __init__(self):
+        self._queue: "queue.Queue[PendingMessage]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, *, thread_id, sender_id, content: str, client_key: str) -> Future:
+        # Timestamped on arrival, so a socket's messages keep their send order.
+        item = PendingMessage(str(thread_id), str(sender_id), content, client_key)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="messages-writer", daemon=True)
+                self._thread.start()
+        self._queue.put(item)
+        return item.future
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + _flush_seconds()
+            limit = _max_batch()
+            while len(batch) < limit:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            close_old_connections()
+            try:
+                results = write_batch(batch)
+            except Exception:
+                # One bad row (e.g. its thread was just deleted) must not fail the others.
+                for item in batch:
+                    self._write_one(item)
+                continue
+            for item, payload in zip(batch, results):
+                item.future.set_result(payload)
+
+    def _write_one(self, item: PendingMessage) -> None:
+        try:
+            item.future.set_result(write_batch([item])[0])
+        except Exception as exc:
+            logger.warning("Writing websocket message %s failed: %s", item.client_key, exc)
+            item.future.set_exception(exc)
+
+
+def write_batch(batch):
+    """
+    Persist a batch of pending messages; returns the serialized message for each.
+    """
+    from .views import _serialize_message
+
+    with transaction.atomic():
+        rows = [
+            Message(
+                id=uuid.uuid4(),
+                thread_id=item.thread_id,
+                sender_id=item.sender_id,
+                content=item.content,
+                client_key=item.client_key,
+                created_at=item.created_at,
+            )
+            for item in batch
+        ]
+        # Keys already stored (retries) are skipped, then everything is read back by key.
+        Message.objects.bulk_create(rows, ignore_conflicts=True, batch_size=500)
+        stored = {
+            (str(m.sender_id), m.client_key): m
+            for m in Message.objects.filter(
+                sender_id__in={item.sender_id for item in batch},
+                client_key__in={item.client_key for item in batch},
+            ).select_related("sender", "sender__student_profile", "sender__teacher_profile")
+        }
+        inserted_ids = {row.id for row in rows}
+        messages = [stored[(item.sender_id, item.client_key)] for item in batch]
+        for item, m in zip(batch, messages):
+            if str(m.thread_id) != item.thread_id:
+                # The key names a message of another conversation: not a retry of this one.
+                raise ValueError(f"client_key {item.client_key!r} was already used in another conversation")
+        created = list({m.id: m for m in messages if m.id in inserted_ids}.values())
+
+        for uid, delta in summarize_new_messages(created).items():
+            adjust_badges(user_ids=[uid], messages_unread=delta)
+
+        cards = get_user_cards({m.sender_id for m in messages}, users=[m.sender for m in messages])
+        payloads = {
+            m.id: _serialize_message(None, m, attachments=[] if m.id in inserted_ids else None, cards=cards)
+            for m in messages
+        }
+        fanout = []
+        for m in created:
+            event = {"type": "chat.message", "message": payloads[m.id], "actor_id": str(m.sender_id)}
+            fanout.extend((user_group_name(uid), event) for uid in thread_participant_ids(m.thread_id))
+        send_to_groups(fanout)
+
+    for uid in {uid for m in created for uid in thread_participant_ids(m.thread_id)}:
+        publish_badges(user_id=uid)
+    return [payloads[m.id] for m in messages]
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,263 @@
+"""
+Role-wide notifications stored once and merged into each user's feed on read.
+
+Publishing writes one `BroadcastNotification` per role and one role-group
+realtime event, whatever the audience size. Reads go through
+`visible_broadcasts(user)`, which applies the user's join date, watermarks,
+receipts and notification preferences in SQL.
+
+Badges need each user's unread count on every push, so it is cached in the
+"shared" cache under two version tokens: one replaced whenever broadcasts are
+created or deleted, one per user replaced when that user's receipts, cursor,
+preferences or role change (always after commit). Between changes a badge
+read costs two cache round-trips and no query.
+"""
+from __future__ import annotations
+
+import uuid
+from typing import Iterable, List, Optional
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, QuerySet
+from django.utils import timezone
+from django.utils.connection import ConnectionProxy
+
+from account.models import User
+
+from .models import BroadcastCursor, BroadcastNotification, BroadcastReceipt, Notification
+from .services import should_send_notification
+
+try:
+    from realtime.services import publish_to_role
+except Exception:  # pragma: no cover
+    publish_to_role = None
+
+BROADCAST_ROLES = ("STUDENT", "TEACHER", "CS_REP", "ADMIN")
+
+UNREAD_TTL_SECONDS = 3600
+
+cache = ConnectionProxy(caches, "shared")
+_GENERATION_KEY = "notifications:broadcasts:gen"
+_USER_GENERATION_PREFIX = "notifications:broadcasts:usergen:"
+_UNREAD_PREFIX = "notifications:broadcasts:unread:"
+
+
+def _user_generation_key(user_id) -> str:
+    return f"{_USER_GENERATION_PREFIX}{user_id}"
+
+
+def broadcasts_changed() -> None:
+    """
+    Retire every cached unread count (broadcasts were created or deleted).
+    """
+    transaction.on_commit(lambda: cache.set(_GENERATION_KEY, uuid.uuid4().hex, timeout=None))
+
+
+def user_state_changed(user_id) -> None:
+    """
+    Retire `user_id`'s cached unread count (receipts, cursor, preferences or role changed).
+    """
+    transaction.on_commit(lambda: cache.set(_user_generation_key(user_id), uuid.uuid4().hex, timeout=None))
+
+
+def serialize_broadcast(b: BroadcastNotification, *, is_read: bool = False, read_at=None) -> dict:
+    # Same shape as a personal notification, flagged so clients can tell them apart.
+    return {
+        "notification_id": str(b.id),
+        "title": b.title,
+        "message": b.message,
+        "notification_type": b.notification_type,
+        "created_at": b.created_at.isoformat(),
+        "is_read": bool(is_read),
+        "read_at": read_at.isoformat() if read_at else None,
+        "action_url": b.action_url,
+        "related_entity_type": b.related_entity_type,
+        "related_entity_id": b.related_entity_id,
+        "actor": {
+            "id": str(b.actor_id) if b.actor_id else None,
+            "name": b.actor.get_full_name() if b.actor_id else None,
+        },
+        "broadcast": True,
+    }
+
+
+def broadcast(
+    *,
+    roles: Iterable[str],
+    notification_type: str,
+    title: str = "",
+    message: str = "",
+    actor: Optional[User] = None,
+    action_url: str = "",
+    related_entity_type: str = "",
+    related_entity_id: str = "",
+) -> List[BroadcastNotification]:
+    """
+    Notify every user of `roles`: one row and one realtime event per role.
+    """
+    rows = [
+        BroadcastNotification(
+            audience_role=role,
+            actor=actor,
+            notification_type=notification_type,
+            title=title or "",
+            message=message or "",
+            action_url=action_url or "",
+            related_entity_type=related_entity_type or "",
+            related_entity_id=str(related_entity_id) if related_entity_id else "",
+        )
+        for role in dict.fromkeys(roles)
+        if role in BROADCAST_ROLES
+    ]
+    BroadcastNotification.objects.bulk_create(rows)
+    if rows:
+        broadcasts_changed()
+    if publish_to_role:
+        for b in rows:
+            try:
+                # Every socket of the role gets it: clients skip their own and muted
+                # types (see live_filter), then add it and bump the badge locally.
+                publish_to_role(role=b.audience_role, event="notification.created", data=serialize_broadcast(b))
+            except Exception:
+                pass
+    return rows
+
+
+def _cursor(user: User) -> Optional[BroadcastCursor]:
+    try:
+        return user.broadcast_cursor
+    except BroadcastCursor.DoesNotExist:
+        return None
+
+
+def muted_types(user: User) -> List[str]:
+    return [t for t, _ in Notification.NOTIFICATION_TYPE_CHOICES if not should_send_notification(user, t)]
+
+
+def live_filter(user_id) -> dict:
+    """
+    What a dashboard needs to drop role events that are not in its user's feed
+    (own broadcasts, muted types); sent with `bootstrap`/`resync` and again when
+    preferences change.
+    """
+    user = User.objects.filter(id=user_id).select_related("notification_settings").first()
+    return {
+        "user_id": str(user_id),
+        "muted_notification_types": muted_types(user) if user else [],
+    }
+
+
+def visible_broadcasts(user: User) -> QuerySet:
+    """
+    Broadcasts in `user`'s feed, annotated with `read_receipt` (read one by one).
+    Read state: `read_receipt` or created before the cursor's `read_until`.
+    """
+    muted = muted_types(user)
+    qs = BroadcastNotification.objects.filter(audience_role=user.role, created_at__gte=user.created_at).exclude(
+        actor_id=user.id
+    )
+    if muted:
+        qs = qs.exclude(notification_type__in=muted)
+    cursor = _cursor(user)
+    if cursor and cursor.cleared_until:
+        qs = qs.filter(created_at__gt=cursor.cleared_until)
+    receipts = BroadcastReceipt.objects.filter(broadcast=OuterRef("pk"), user=user)
+    return qs.exclude(Exists(receipts.filter(deleted=True))).annotate(
+        read_receipt=Exists(receipts.filter(read_at__isnull=False))
+    )
+
+
+def unread_broadcasts(user: User) -> QuerySet:
+    qs = visible_broadcasts(user).filter(read_receipt=False)
+    cursor = _cursor(user)
+    if cursor and cursor.read_until:
+        qs = qs.filter(created_at__gt=cursor.read_until)
+    return qs
+
+
+def unread_broadcast_count(user_id) -> int:
+    """
+    Unread broadcasts of one user (two queries; added on top of the personal
+    `BadgeCounter.notifications_unread`).
+    """
+    user = (
+        User.objects.filter(id=user_id)
+        .select_related("notification_settings", "broadcast_cursor")
+        .first()
+    )
+    if user is None or user.role not in BROADCAST_ROLES:
+        return 0
+    return unread_broadcasts(user).count()
+
+
+def cached_unread_broadcast_count(user_id) -> int:
+    """
+    `unread_broadcast_count`, recounted only after a broadcast or this user's
+    broadcast state changed.
+    """
+    keys = [_GENERATION_KEY, _user_generation_key(user_id)]
+    generations = cache.get_many(keys)
+    if len(generations) < len(keys):
+        # First read or evicted: start fresh tokens, so counts cached under older ones stay unreachable.
+        for key in keys:
+            if key not in generations:
+                cache.add(key, uuid.uuid4().hex, timeout=None)
+        generations = cache.get_many(keys)
+    count_key = f"{_UNREAD_PREFIX}{user_id}:{generations.get(keys[0], '')}:{generations.get(keys[1], '')}"
+    count = cache.get(count_key)
+    if count is None:
+        count = unread_broadcast_count(user_id)
+        cache.set(count_key, count, timeout=UNREAD_TTL_SECONDS)
+    return count
+
+
+def feed(user: User, *, limit: int, notification_type: Optional[str] = None, unread_only: bool = False) -> List[dict]:
+    """
+    The newest `limit` broadcasts of `user`'s feed, serialized.
+    """
+    qs = unread_broadcasts(user) if unread_only else visible_broadcasts(user)
+    if notification_type:
+        qs = qs.filter(notification_type=notification_type)
+    cursor = _cursor(user)
+    read_until = cursor.read_until if cursor else None
+    return [
+        serialize_broadcast(b, is_read=b.read_receipt or (read_until is not None and b.created_at <= read_until))
+        for b in qs.select_related("actor").order_by("-created_at")[:limit]
+    ]
+
+
+def find_visible(user: User, broadcast_id) -> Optional[BroadcastNotification]:
+    return visible_broadcasts(user).filter(id=broadcast_id).first()
+
+
+def mark_read(user: User, b: BroadcastNotification) -> bool:
+    """
+    Record that `user` read `b`; returns False if it was already read.
+    """
+    cursor = _cursor(user)
+    if b.read_receipt or (cursor and cursor.read_until and b.created_at <= cursor.read_until):
+        return False
+    BroadcastReceipt.objects.update_or_create(broadcast=b, user=user, defaults={"read_at": timezone.now()})
+    user_state_changed(user.id)
+    return True
+
+
+def delete_for(user: User, b: BroadcastNotification) -> None:
+    BroadcastReceipt.objects.update_or_create(broadcast=b, user=user, defaults={"deleted": True})
+    user_state_changed(user.id)
+
+
+def mark_all_read(user: User, now=None) -> None:
+    BroadcastCursor.objects.update_or_create(user=user, defaults={"read_until": now or timezone.now()})
+    user_state_changed(user.id)
+
+
+def clear_all(user: User, now=None) -> None:
+    """
+    Hide every broadcast created so far; the receipts they had are no longer needed.
+    """
+    now = now or timezone.now()
+    BroadcastCursor.objects.update_or_create(user=user, defaults={"cleared_until": now})
+    BroadcastReceipt.objects.filter(user=user, broadcast__created_at__lte=now).delete()
+    user_state_changed(user.id)
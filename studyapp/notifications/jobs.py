@@ -0,0 +1,28 @@
+"""
+Background handlers for notifications (see jobs.queue).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from jobs.queue import register
+
+from .services import FANOUT_JOB, deliver_notifications
+
+
+@register(FANOUT_JOB)
+def fanout(job) -> bool:
+    """
+    Deliver the next chunk of a queued `notify_users` fanout; the offset into
+    the recipient list is the job's checkpoint.
+    """
+    recipient_ids = job.payload["recipient_ids"]
+    start = job.state.get("offset", 0)
+    chunk = recipient_ids[start:start + max(1, int(getattr(settings, "NOTIFICATIONS_FANOUT_CHUNK", 1000)))]
+
+    actor_id = job.payload.get("actor_id")
+    actor = get_user_model().objects.filter(pk=actor_id).first() if actor_id else None
+    deliver_notifications(chunk, actor=actor, **job.payload["fields"])
+
+    job.state = {"offset": start + len(chunk)}
+    job.progress_done = start + len(chunk)
+    return job.progress_done >= len(recipient_ids)
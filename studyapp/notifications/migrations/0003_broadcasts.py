@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:27
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0010_visitor'),
+        ('notifications', '0002_notification_updated_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastCursor',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='broadcast_cursor', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('read_until', models.DateTimeField(blank=True, null=True)),
+                ('cleared_until', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'notification_broadcast_cursors',
+            },
+        ),
+        migrations.CreateModel(
+            name='BroadcastNotification',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('audience_role', models.CharField(max_length=20)),
+                ('title', models.CharField(blank=True, default='', max_length=200)),
+                ('message', models.TextField(blank=True, default='')),
+                ('notification_type', models.CharField(choices=[('assignment', 'Assignment'), ('homework', 'Homework'), ('exam', 'Exam'), ('announcement', 'Announcement'), ('invoice', 'Invoice'), ('message', 'Message'), ('meeting', 'Meeting'), ('content', 'Content'), ('system', 'System')], default='system', max_length=30)),
+                ('action_url', models.CharField(blank=True, default='', max_length=500)),
+                ('related_entity_type', models.CharField(blank=True, default='', max_length=80)),
+                ('related_entity_id', models.CharField(blank=True, default='', max_length=80)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='broadcasts_sent', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notification_broadcasts',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BroadcastReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='notifications.broadcastnotification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_receipts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notification_broadcast_receipts',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='broadcastnotification',
+            index=models.Index(fields=['audience_role', '-created_at'], name='notif_bcast_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='broadcastnotification',
+            index=models.Index(fields=['related_entity_type', 'related_entity_id'], name='notif_bcast_entity_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='broadcastreceipt',
+            constraint=models.UniqueConstraint(fields=('user', 'broadcast'), name='notif_bcast_receipt_uniq'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:44
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built concurrently: the notifications table is large and must stay writable.
+    atomic = False
+
+    dependencies = [
+        ('notifications', '0003_broadcasts'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(fields=['notification_type', 'created_at'], name='notif_type_created_idx'),
+        ),
+    ]
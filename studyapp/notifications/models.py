@@ -10,8 +10,8 @@ class Notification(models.Model):
     Per-user notification row.
 
     We intentionally store one row per recipient for simplicity and fast reads
-    (unread counts, latest feed). For broadcast notifications, create rows for
-    each recipient.
+    (unread counts, latest feed). Role-wide broadcasts are stored once instead,
+    see `BroadcastNotification`.
     """
 
     TYPE_ASSIGNMENT = "assignment"
@@ -73,6 +73,8 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=["recipient", "is_read", "-created_at"]),
             models.Index(fields=["recipient", "-created_at"]),
+            # Retention purges one type at a time, oldest first.
+            models.Index(fields=["notification_type", "created_at"], name="notif_type_created_idx"),
         ]
 
     def __str__(self) -> str:
@@ -82,3 +84,82 @@ class Notification(models.Model):
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
+
+
+class BroadcastNotification(models.Model):
+    """
+    A notification for every user of a role, stored once (fan-out on read).
+
+    Role-wide announcements would otherwise write one `Notification` per user.
+    Readers merge these with their own rows; per-user state is sparse: a
+    `BroadcastReceipt` only once a user reads or deletes one broadcast, and a
+    `BroadcastCursor` for "mark all read" / "delete all".
+    Users only see broadcasts created after they joined.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    audience_role = models.CharField(max_length=20)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="broadcasts_sent",
+    )
+
+    title = models.CharField(max_length=200, blank=True, default="")
+    message = models.TextField(blank=True, default="")
+    notification_type = models.CharField(
+        max_length=30, choices=Notification.NOTIFICATION_TYPE_CHOICES, default=Notification.TYPE_SYSTEM
+    )
+    action_url = models.CharField(max_length=500, blank=True, default="")
+    related_entity_type = models.CharField(max_length=80, blank=True, default="")
+    related_entity_id = models.CharField(max_length=80, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "notification_broadcasts"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["audience_role", "-created_at"], name="notif_bcast_role_idx"),
+            models.Index(fields=["related_entity_type", "related_entity_id"], name="notif_bcast_entity_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Broadcast({self.notification_type}) to {self.audience_role}"
+
+
+class BroadcastReceipt(models.Model):
+    """
+    One user's read/deleted state for one broadcast (only written on change).
+    """
+
+    broadcast = models.ForeignKey(BroadcastNotification, on_delete=models.CASCADE, related_name="receipts")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="broadcast_receipts")
+    read_at = models.DateTimeField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = "notification_broadcast_receipts"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "broadcast"], name="notif_bcast_receipt_uniq"),
+        ]
+
+
+class BroadcastCursor(models.Model):
+    """
+    Per-user watermarks: broadcasts created before `read_until` count as read,
+    before `cleared_until` as deleted.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="broadcast_cursor",
+    )
+    read_until = models.DateTimeField(null=True, blank=True)
+    cleared_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "notification_broadcast_cursors"
@@ -0,0 +1,142 @@
+"""
+Notification retention: rows older than their type's TTL are purged in small
+batches (see `manage.py purge_notifications`).
+
+TTLs come from NOTIFICATIONS_RETENTION_DAYS (default for every type) and
+NOTIFICATIONS_RETENTION_DAYS_BY_TYPE (per `notification_type` overrides;
+0 or None keeps that type forever). Each batch is its own short transaction
+that claims rows with SKIP LOCKED, so a purge never holds long locks or
+blocks users marking notifications read.
+"""
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import IntegerField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .broadcasts import broadcasts_changed
+from .models import BroadcastNotification, Notification
+
+try:
+    from realtime.services import adjust_badges
+except Exception:  # pragma: no cover
+    adjust_badges = None
+
+
+@dataclass
+class PurgeStats:
+    rows: Dict[str, int] = field(default_factory=Counter)
+    bytes: int = 0
+    broadcasts: int = 0
+    batches: int = 0
+
+
+def retention_days() -> Tuple[Optional[int], Dict[str, Optional[int]]]:
+    default = getattr(settings, "NOTIFICATIONS_RETENTION_DAYS", 180)
+    by_type = dict(getattr(settings, "NOTIFICATIONS_RETENTION_DAYS_BY_TYPE", {}) or {})
+    return default, by_type
+
+
+def expiry_filters(now=None) -> Iterator[Tuple[str, Q]]:
+    """
+    (label, filter) per retention rule, one per notification type so every
+    batch is a range scan of the (notification_type, created_at) index; then
+    "other" for types outside NOTIFICATION_TYPE_CHOICES, under the default TTL.
+    """
+    now = now or timezone.now()
+    default, by_type = retention_days()
+    known = [t for t, _ in Notification.NOTIFICATION_TYPE_CHOICES]
+    for notification_type in dict.fromkeys([*known, *by_type]):
+        days = by_type.get(notification_type, default)
+        if days:
+            yield notification_type, Q(notification_type=notification_type, created_at__lt=now - timedelta(days=days))
+    if default:
+        yield "other", Q(created_at__lt=now - timedelta(days=default)) & ~Q(
+            notification_type__in=[*known, *by_type]
+        )
+
+
+def _row_bytes():
+    # On-disk size of each row (Postgres); elsewhere bytes are not reported.
+    if connection.vendor == "postgresql":
+        return RawSQL(f"pg_column_size({Notification._meta.db_table}.*)", [], output_field=IntegerField())
+    return Value(0, output_field=IntegerField())
+
+
+def _purge_batch(rule: Q, batch_size: int, after=None) -> Tuple[int, int, object]:
+    """
+    Delete up to `batch_size` expired rows (oldest first, from `after` on) and
+    take their unread ones off the recipients' badge counters.
+    Returns (rows, bytes, created_at of the newest row deleted).
+    """
+    with transaction.atomic():
+        qs = Notification.objects.select_for_update(skip_locked=True).filter(rule)
+        if after is not None:
+            qs = qs.filter(created_at__gte=after)
+        rows = list(
+            qs.order_by("created_at")
+            .annotate(row_bytes=_row_bytes())
+            .values_list("id", "recipient_id", "is_read", "row_bytes", "created_at")[:batch_size]
+        )
+        if not rows:
+            return 0, 0, after
+        Notification.objects.filter(id__in=[r[0] for r in rows]).delete()
+
+        unread = Counter(str(r[1]) for r in rows if not r[2])
+        if adjust_badges and unread:
+            # One UPDATE per distinct count, not per recipient.
+            by_count = defaultdict(list)
+            for user_id, n in unread.items():
+                by_count[n].append(user_id)
+            for n, user_ids in by_count.items():
+                adjust_badges(user_ids=user_ids, notifications_unread=-n)
+    return len(rows), sum(r[3] or 0 for r in rows), rows[-1][4]
+
+
+def purge_expired(*, batch_size: int = 2000, now=None, on_batch=None) -> PurgeStats:
+    """
+    Delete every expired notification, `batch_size` rows per transaction.
+
+    Each batch starts at the newest `created_at` the previous one deleted, so
+    whichever index the planner picks, a purge walks the expired range once
+    instead of re-reading the rows of other types on every batch.
+    Broadcasts expire under the same rules (there are few of them, one per role
+    and event, so they go in one statement per rule; receipts cascade).
+    """
+    stats = PurgeStats()
+    for label, rule in expiry_filters(now):
+        after = None
+        while True:
+            deleted, size, after = _purge_batch(rule, batch_size, after)
+            if deleted:
+                stats.rows[label] += deleted
+                stats.bytes += size
+                stats.batches += 1
+                if on_batch:
+                    on_batch(label, deleted)
+            if deleted < batch_size:
+                break
+        stats.broadcasts += BroadcastNotification.objects.filter(rule).delete()[1].get(
+            BroadcastNotification._meta.label, 0
+        )
+    if stats.broadcasts:
+        broadcasts_changed()
+    return stats
+
+
+def count_expired(now=None) -> Tuple[Dict[str, int], int]:
+    """
+    What `purge_expired` would delete: notifications per rule, and broadcasts.
+    """
+    rows, broadcasts = {}, 0
+    for label, rule in expiry_filters(now):
+        rows[label] = Notification.objects.filter(rule).count()
+        broadcasts += BroadcastNotification.objects.filter(rule).count()
+    return rows, broadcasts
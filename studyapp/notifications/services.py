@@ -2,22 +2,56 @@ from __future__ import annotations
 
 from typing import Iterable, Optional
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Q, QuerySet
 
 from .models import Notification
 from account.models import UserNotificationSettings
 
 # Centralized real-time publishing (best-effort)
 try:
-    from realtime.services import publish_badges, publish_to_user
+    from realtime.services import adjust_badges, publish_badges, publish_many, publish_to_user
 except Exception:  # pragma: no cover
+    adjust_badges = None
     publish_badges = None
+    publish_many = None
     publish_to_user = None
 
 User = get_user_model()
 
 
+# Per-role preference field gating each notification type (types not listed
+# are always sent). CS-Reps have one switch for everything.
+TYPE_SETTINGS = {
+    'STUDENT': {
+        'message': 'student_messages',
+        'announcement': 'announcements',
+        'assignment': 'assignment_updates',
+        'meeting': 'meeting_reminders',
+        'exam': 'exam_reminders',
+    },
+    'TEACHER': {
+        'message': 'teacher_messages',
+        'announcement': 'new_announcements',
+        'assignment': 'assignment_submissions',
+        'meeting': 'meeting_reminders_teacher',
+    },
+    'ADMIN': {
+        'assignment': 'assignment_requests',
+        'invoice': 'invoice_notifications',
+        'content': 'content_review_alerts',
+        'system': 'system_alerts',
+    },
+}
+ROLE_SWITCHES = {'CS_REP': 'csrep_notifications_enabled'}
+
+
+def _setting_for(role: str, notification_type: str) -> Optional[str]:
+    return ROLE_SWITCHES.get(role) or TYPE_SETTINGS.get(role, {}).get(notification_type)
+
+
 def should_send_notification(recipient: User, notification_type: str) -> bool:
     """
     Check if a user should receive a notification based on their settings.
@@ -34,44 +68,38 @@ def should_send_notification(recipient: User, notification_type: str) -> bool:
         return False
 
     # Check role-specific and type-specific preferences
-    if recipient.role == 'STUDENT':
-        if notification_type == 'message' and not settings.student_messages:
-            return False
-        elif notification_type == 'announcement' and not settings.announcements:
-            return False
-        elif notification_type == 'assignment' and not settings.assignment_updates:
-            return False
-        elif notification_type == 'meeting' and not settings.meeting_reminders:
-            return False
-        elif notification_type == 'exam' and not settings.exam_reminders:
-            return False
-
-    elif recipient.role == 'TEACHER':
-        if notification_type == 'message' and not settings.teacher_messages:
-            return False
-        elif notification_type == 'announcement' and not settings.new_announcements:
-            return False
-        elif notification_type == 'assignment' and not settings.assignment_submissions:
-            return False
-        elif notification_type == 'meeting' and not settings.meeting_reminders_teacher:
-            return False
-
-    elif recipient.role == 'ADMIN':
-        if notification_type == 'assignment' and not settings.assignment_requests:
-            return False
-        elif notification_type == 'invoice' and not settings.invoice_notifications:
-            return False
-        elif notification_type == 'content' and not settings.content_review_alerts:
-            return False
-        elif notification_type == 'system' and not settings.system_alerts:
-            return False
-
-    elif recipient.role == 'CS_REP':
-        # CS-Reps have a simple all-or-nothing setting
-        if not settings.csrep_notifications_enabled:
-            return False
-
-    return True
+    field = _setting_for(recipient.role, notification_type)
+    return getattr(settings, field) if field else True
+
+
+def preference_filter(notification_type: str) -> Q:
+    """
+    `should_send_notification` as a User filter: one LEFT JOIN on the settings
+    table, so a whole audience is checked in the query that selects it.
+    """
+    prefix = 'notification_settings__'
+    gated = [(role, _setting_for(role, notification_type)) for role in (*TYPE_SETTINGS, *ROLE_SWITCHES)]
+    gated = [(role, field) for role, field in gated if field]
+    by_role = ~Q(role__in=[role for role, _ in gated]) if gated else Q()
+    for role, field in gated:
+        by_role |= Q(role=role, **{prefix + field: True})
+    enabled = Q(**{prefix + 'email_notifications': True}) | Q(**{prefix + 'push_notifications': True})
+    return Q(notification_settings__isnull=True) | (enabled & by_role)
+
+
+def allowed_recipient_ids(recipients: Iterable[User] | QuerySet, notification_type: str) -> list:
+    """
+    Ids of the recipients whose preferences allow `notification_type`, in one
+    query however many there are (a User queryset is filtered in place).
+    """
+    if isinstance(recipients, QuerySet):
+        audience = recipients
+    else:
+        ids = {u.pk for u in recipients if u}
+        if not ids:
+            return []
+        audience = User.objects.filter(pk__in=ids)
+    return list(audience.filter(preference_filter(notification_type)).order_by().values_list('pk', flat=True).distinct())
 
 
 def _serialize_notification(n: Notification) -> dict:
@@ -128,10 +156,16 @@ def create_notification(
         related_entity_type=related_entity_type or "",
         related_entity_id=str(related_entity_id) if related_entity_id else "",
     )
+    if adjust_badges:
+        adjust_badges(user_ids=[n.recipient_id], notifications_unread=1)
     _broadcast_created(n)
     return n
 
 
+# Job kind of queued fanouts (handler in notifications/jobs.py).
+FANOUT_JOB = "notifications.fanout"
+
+
 @transaction.atomic
 def notify_users(
     *,
@@ -144,39 +178,71 @@ def notify_users(
     related_entity_type: str = "",
     related_entity_id: str = "",
 ) -> int:
-    recipients_list = [u for u in recipients if u]
-    if not recipients_list:
-        return 0
+    """
+    Notify many users at once. `recipients` may be a User queryset (e.g. a whole
+    role), which is never loaded: preferences are applied in SQL.
 
+    Audiences above NOTIFICATIONS_ASYNC_THRESHOLD are handed to the job queue
+    (see notifications/jobs.py) and delivered in chunks after commit, so the
+    calling request does not grow with the audience. Returns the number of
+    recipients notified or queued.
+    """
     # Filter recipients based on their notification preferences
-    filtered_recipients = [u for u in recipients_list if should_send_notification(u, notification_type)]
-    if not filtered_recipients:
+    recipient_ids = allowed_recipient_ids(recipients, notification_type)
+    if not recipient_ids:
         return 0
 
-    rows = [
-        Notification(
-            recipient=u,
-            actor=actor,
-            notification_type=notification_type,
-            title=title or "",
-            message=message or "",
-            action_url=action_url or "",
-            related_entity_type=related_entity_type or "",
-            related_entity_id=str(related_entity_id) if related_entity_id else "",
+    fields = {
+        "notification_type": notification_type,
+        "title": title or "",
+        "message": message or "",
+        "action_url": action_url or "",
+        "related_entity_type": related_entity_type or "",
+        "related_entity_id": str(related_entity_id) if related_entity_id else "",
+    }
+    if len(recipient_ids) > getattr(settings, "NOTIFICATIONS_ASYNC_THRESHOLD", 500):
+        from jobs.queue import enqueue
+
+        enqueue(
+            FANOUT_JOB,
+            {
+                "recipient_ids": [str(uid) for uid in recipient_ids],
+                "actor_id": str(actor.pk) if actor else None,
+                "fields": fields,
+            },
+            total=len(recipient_ids),
         )
-        for u in filtered_recipients
-    ]
+        return len(recipient_ids)
+
+    return deliver_notifications(recipient_ids, actor=actor, **fields)
+
+
+def deliver_notifications(recipient_ids: Iterable, *, actor: Optional[User] = None, **fields) -> int:
+    """
+    Create one notification per recipient (already filtered by preference),
+    bump their badge counters and publish the realtime events.
+    """
+    rows = [Notification(recipient_id=uid, actor=actor, **fields) for uid in recipient_ids]
+    if not rows:
+        return 0
     Notification.objects.bulk_create(rows, batch_size=500)
+    if adjust_badges:
+        adjust_badges(user_ids=[n.recipient_id for n in rows], notifications_unread=1)
 
     # Broadcast events per created notification (best-effort).
     # Django/Postgres returns IDs for bulk_create in modern versions; if not, clients will still
     # get correct badge counts via the follow-up badge event.
-    if publish_to_user and publish_badges:
+    # Inside a transaction these land in the realtime outbox (one insert)
+    # and reach clients only after commit.
+    if publish_many and publish_badges:
         try:
+            publish_many(
+                (n.recipient_id, "notification.created", _serialize_notification(n))
+                for n in rows
+                if getattr(n, "id", None)
+            )
             for n in rows:
-                if getattr(n, "id", None):
-                    publish_to_user(user_id=n.recipient_id, event="notification.created", data=_serialize_notification(n))
-                    publish_badges(user_id=n.recipient_id)
+                publish_badges(user_id=n.recipient_id)
         except Exception:
             pass
     return len(rows)
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from account.models import User, UserNotificationSettings
+
+from .broadcasts import live_filter, user_state_changed
+
+
+@receiver(post_save, sender=UserNotificationSettings)
+def preferences_changed(sender, instance, **kwargs):
+    """
+    Open dashboards filter role broadcasts by muted type; send them the new list
+    (and new badges: muting a type hides its unread broadcasts).
+    """
+    user_state_changed(instance.user_id)
+    try:
+        from realtime.services import publish_badges, publish_to_user
+
+        publish_to_user(user_id=instance.user_id, event="notifications.preferences", data=live_filter(instance.user_id))
+        publish_badges(user_id=instance.user_id)
+    except Exception:
+        pass
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # The role decides which broadcasts the user sees; a login only saves last_login.
+    if kwargs.get('update_fields') == {'last_login'}:
+        return
+    user_state_changed(instance.id)
@@ -1,3 +1,126 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from account.models import User
+from realtime.models import BadgeCounter
+from realtime.services import get_badge_counts_for_user_id
+
+from . import broadcasts
+from .models import BroadcastNotification, Notification
+from .retention import purge_expired
+
+# A fresh in-memory "shared" cache instead of the on-disk one other processes use.
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'notifications-tests'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BroadcastBadgeTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.admin = User.objects.create_user('admin@example.com', 'admin', 'pw', role='ADMIN')
+        self.teacher = User.objects.create_user('teacher@example.com', 'teacher', 'pw', role='TEACHER')
+
+    def _unread(self):
+        return get_badge_counts_for_user_id(self.teacher.id)['notifications_unread']
+
+    def _announce(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            (b,) = broadcasts.broadcast(roles=['TEACHER'], notification_type='announcement', actor=self.admin)
+        return b
+
+    def test_badge_read_is_one_query_when_warm(self):
+        self._announce()
+        self._unread()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._unread(), 1)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_login_keeps_the_cached_count(self):
+        self._announce()
+        self._unread()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.teacher)  # saves last_login
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._unread(), 1)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_count_follows_broadcasts_receipts_and_preferences(self):
+        self.assertEqual(self._unread(), 0)
+        b = self._announce()
+        self._announce()
+        self.assertEqual(self._unread(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            broadcasts.mark_read(self.teacher, broadcasts.find_visible(self.teacher, b.id))
+        self.assertEqual(self._unread(), 1)
+
+        settings = self.teacher.notification_settings
+        settings.new_announcements = False
+        with self.captureOnCommitCallbacks(execute=True):
+            settings.save()
+        self.assertEqual(self._unread(), 0)
+
+    def test_author_does_not_count_own_broadcast(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            broadcasts.broadcast(roles=['TEACHER'], notification_type='announcement', actor=self.teacher)
+        self.assertEqual(self._unread(), 0)
+
+
+@override_settings(CACHES=TEST_CACHES, NOTIFICATIONS_RETENTION_DAYS=180, NOTIFICATIONS_RETENTION_DAYS_BY_TYPE={'message': 30})
+class RetentionTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = User.objects.create_user('student@example.com', 'student', 'pw', role='STUDENT')
+
+    def _notify(self, notification_type, days_old, n=1, is_read=False):
+        rows = Notification.objects.bulk_create(
+            Notification(recipient=self.user, notification_type=notification_type, title='x', is_read=is_read)
+            for _ in range(n)
+        )
+        ids = [r.id for r in rows]
+        Notification.objects.filter(id__in=ids).update(created_at=timezone.now() - timedelta(days=days_old))
+        return ids
+
+    def test_purges_per_type_in_batches_and_decrements_badges(self):
+        expired_messages = self._notify('message', 40, n=5)
+        recent_message = self._notify('message', 5)
+        expired_other = self._notify('assignment', 200, n=2, is_read=True)
+        kept_other = self._notify('assignment', 40)
+        self.assertEqual(get_badge_counts_for_user_id(self.user.id)['notifications_unread'], 7)
+
+        stats = purge_expired(batch_size=2)
+
+        self.assertEqual(dict(stats.rows), {'message': 5, 'assignment': 2})
+        self.assertEqual(stats.batches, 4)
+        self.assertFalse(Notification.objects.filter(id__in=expired_messages + expired_other).exists())
+        self.assertEqual(Notification.objects.filter(id__in=recent_message + kept_other).count(), 2)
+        # Only the 5 unread expired messages came off the stored counter.
+        self.assertEqual(BadgeCounter.objects.get(user=self.user).notifications_unread, 2)
+
+    def test_purges_old_broadcasts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            old, recent = broadcasts.broadcast(roles=['STUDENT', 'TEACHER'], notification_type='announcement')
+        BroadcastNotification.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=200))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = purge_expired()
+
+        self.assertEqual(stats.broadcasts, 1)
+        self.assertEqual(list(BroadcastNotification.objects.values_list('id', flat=True)), [recent.id])
+
+    def test_dry_run_deletes_nothing(self):
+        self._notify('message', 40, n=3)
+        out = StringIO()
+        call_command('purge_notifications', '--dry-run', stdout=out)
+        self.assertIn('Would remove 3 notification(s)', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 3)
@@ -6,8 +6,9 @@ from django.http import JsonResponse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 
+from . import broadcasts
 from .models import Notification
-from realtime.services import publish_badges, publish_to_user
+from realtime.services import adjust_badges, publish_badges, publish_to_user, reset_badges
 
 
 def _normalize_role(role: Optional[str]) -> Optional[str]:
@@ -74,6 +75,18 @@ def _push_notification_updated(n: Notification) -> None:
         return
 
 
+def _push_broadcast_updated(user, b) -> None:
+    try:
+        publish_to_user(
+            user_id=user.id,
+            event="notification.updated",
+            data={"notification_id": str(b.id), "is_read": True, "read_at": timezone.now().isoformat()},
+        )
+        publish_badges(user_id=user.id)
+    except Exception:
+        return
+
+
 def _push_notification_deleted(*, user_id: str, notification_id: str) -> None:
     try:
         publish_to_user(
@@ -117,14 +130,17 @@ def notifications_list(request):
     notif_type = request.GET.get("type") or request.GET.get("notification_type")
     unread_only = request.GET.get("unread") in ("1", "true", "True", "yes")
 
-    qs = Notification.objects.filter(recipient=request.user)
+    qs = Notification.objects.filter(recipient=request.user).select_related("actor")
     if notif_type:
         qs = qs.filter(notification_type=notif_type)
     if unread_only:
         qs = qs.filter(is_read=False)
 
-    notifs = list(qs.order_by("-created_at")[:limit])
-    return JsonResponse([_serialize_notification(n) for n in notifs], safe=False)
+    # Personal rows and role broadcasts (stored once), merged newest first.
+    items = [_serialize_notification(n) for n in qs.order_by("-created_at")[:limit]]
+    items += broadcasts.feed(request.user, limit=limit, notification_type=notif_type, unread_only=unread_only)
+    items.sort(key=lambda item: item["created_at"], reverse=True)
+    return JsonResponse(items[:limit], safe=False)
 
 
 @require_http_methods(["POST"])
@@ -136,12 +152,18 @@ def mark_notification_read(request, notification_id):
     try:
         n = Notification.objects.get(id=notification_id, recipient=request.user)
     except Notification.DoesNotExist:
-        return JsonResponse({"success": False, "error": "Notification not found"}, status=404)
+        b = broadcasts.find_visible(request.user, notification_id)
+        if b is None:
+            return JsonResponse({"success": False, "error": "Notification not found"}, status=404)
+        if broadcasts.mark_read(request.user, b):
+            _push_broadcast_updated(request.user, b)
+        return JsonResponse({"success": True})
 
     if not n.is_read:
         n.is_read = True
         n.read_at = timezone.now()
         n.save(update_fields=["is_read", "read_at"])
+        adjust_badges(user_ids=[n.recipient_id], notifications_unread=-1)
         _push_notification_updated(n)
 
     return JsonResponse({"success": True})
@@ -154,8 +176,11 @@ def mark_all_notifications_read(request):
         return auth
 
     now = timezone.now()
+    had_broadcasts = broadcasts.unread_broadcasts(request.user).exists()
+    broadcasts.mark_all_read(request.user, now)
     updated = Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True, read_at=now)
-    if updated:
+    if updated or had_broadcasts:
+        reset_badges(user_ids=[request.user.id], notifications_unread=0)
         try:
             publish_to_user(user_id=request.user.id, event="notifications.all_read", data={"read_at": now.isoformat()})
         except Exception:
@@ -173,10 +198,18 @@ def delete_notification(request, notification_id):
     try:
         n = Notification.objects.get(id=notification_id, recipient=request.user)
     except Notification.DoesNotExist:
-        return JsonResponse({"success": False, "error": "Notification not found"}, status=404)
+        b = broadcasts.find_visible(request.user, notification_id)
+        if b is None:
+            return JsonResponse({"success": False, "error": "Notification not found"}, status=404)
+        broadcasts.delete_for(request.user, b)
+        _push_notification_deleted(user_id=str(request.user.id), notification_id=str(b.id))
+        return JsonResponse({"success": True})
 
     n_id = str(n.id)
+    was_unread = not n.is_read
     n.delete()
+    if was_unread:
+        adjust_badges(user_ids=[request.user.id], notifications_unread=-1)
     _push_notification_deleted(user_id=str(request.user.id), notification_id=n_id)
     return JsonResponse({"success": True})
 
@@ -187,9 +220,11 @@ def delete_all_notifications(request):
     if auth:
         return auth
 
-    qs = Notification.objects.filter(recipient=request.user)
-    deleted_count = qs.count()
-    qs.delete()
+    # Nothing references notifications, so this is a single DELETE returning its row count.
+    deleted_count, _ = Notification.objects.filter(recipient=request.user).delete()
+    deleted_count += broadcasts.visible_broadcasts(request.user).count()
+    broadcasts.clear_all(request.user)
+    reset_badges(user_ids=[request.user.id], notifications_unread=0)
     _push_notifications_cleared(user_id=str(request.user.id), deleted_count=deleted_count)
     return JsonResponse({"success": True, "deleted_count": deleted_count})
 
@@ -205,6 +240,7 @@ def unread_count(request):
         return JsonResponse({"success": False, "error": "Forbidden for role"}, status=403)
 
     count = Notification.objects.filter(recipient=request.user, is_read=False).count()
+    count += broadcasts.unread_broadcasts(request.user).count()
     return JsonResponse({"success": True, "count": count})
 
 # Create your views here.
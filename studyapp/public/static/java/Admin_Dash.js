@@ -106,8 +106,8 @@ function initializeAdminDashboard() {
     // Initialize notifications
     initializeAdminNotifications();
 
-    // Initialize automatic background refresh
-    // initializeAdminAutoRefresh();
+    // Section refresh driven by ws/dashboard/ invalidations
+    initializeAdminRealtimeSectionRefresh();
 
     // Check if there's already content loaded (from server-side rendering)
     const dynamicContainer = document.getElementById('dynamicContentContainer');
@@ -7988,90 +7988,15 @@ window.toggleSpecificRecipients = toggleSpecificRecipients;
 window.switchRecipientTab = switchRecipientTab;
 window.filterRecipients = filterRecipients;
 
-// Automatic background refresh for admin dashboard
-function initializeAdminAutoRefresh() {
-    let autoRefreshInterval = null;
-    let lastActiveSection = null;
-    const REFRESH_INTERVAL = 30000; // 30 seconds
-
-    function startAutoRefresh() {
-        // Clear any existing interval
-        if (autoRefreshInterval) {
-            clearInterval(autoRefreshInterval);
-        }
-
-        // Get current active section
-        const activeSection = document.querySelector('.content-section.active');
-        if (!activeSection) return;
-
-        const sectionId = activeSection.id;
-        if (!sectionId) return;
-
-        const sectionName = sectionId.replace('Section', '');
-        if (!sectionName) return;
-
-        lastActiveSection = sectionName;
-
-        // Refresh function
-        const refreshCurrentSection = async () => {
-            // Only refresh if page is visible and section hasn't changed
-            if (document.hidden) return;
-            
-            const currentActive = document.querySelector('.content-section.active');
-            if (!currentActive || currentActive.id !== sectionId) {
-                // Section changed, stop this refresh cycle
-                if (autoRefreshInterval) {
-                    clearInterval(autoRefreshInterval);
-                    autoRefreshInterval = null;
-                }
-                return;
-            }
-
-            try {
-                // Silently refresh without showing loading state
-                console.log(`[Auto-refresh] Refreshing admin ${sectionName} section...`);
-                // Clear cache and reload
-                if (window.loadedSections && window.loadedSections[sectionName]) {
-                    delete window.loadedSections[sectionName];
-                }
-                await window.showSection(sectionName);
-            } catch (error) {
-                console.warn(`[Auto-refresh] Failed to refresh ${sectionName}:`, error);
-            }
-        };
-
-        // Start interval
-        autoRefreshInterval = setInterval(refreshCurrentSection, REFRESH_INTERVAL);
-        console.log(`[Auto-refresh] Started for admin section: ${sectionName} (every ${REFRESH_INTERVAL/1000}s)`);
-    }
-
-    // Start auto-refresh when section changes
-    const originalShowSection = window.showSection;
-    if (originalShowSection) {
-        window.showSection = async function(sectionName) {
-            const result = await originalShowSection.apply(this, arguments);
-            // Start auto-refresh after section loads
-            setTimeout(startAutoRefresh, 1000);
-            return result;
+// Sections are refetched when the server invalidates them (section.invalidated over
+// ws/dashboard/, handled by realtimeDashboard.js); there is no timer-driven refresh.
+function initializeAdminRealtimeSectionRefresh() {
+    if (typeof window.forceReloadSection === 'undefined') {
+        window.forceReloadSection = async function (sectionName) {
+            try { if (window.loadedSections) delete window.loadedSections[sectionName]; } catch (e) {}
+            try { return await window.showSection(sectionName); } catch (e) {}
         };
     }
-
-    // Also start on initial load
-    setTimeout(startAutoRefresh, 2000);
-
-    // Pause when tab is hidden, resume when visible
-    document.addEventListener('visibilitychange', () => {
-        if (document.hidden) {
-            if (autoRefreshInterval) {
-                clearInterval(autoRefreshInterval);
-                autoRefreshInterval = null;
-                console.log('[Auto-refresh] Paused (tab hidden)');
-            }
-        } else {
-            startAutoRefresh();
-            console.log('[Auto-refresh] Resumed (tab visible)');
-        }
-    });
 }
 window.clearRecipientSearch = clearRecipientSearch;
 window.selectAllInList = selectAllInList;
@@ -730,6 +730,8 @@ const teacherSectionUrlMap = {
 
 // Cache for loaded sections
 const teacherLoadedSections = {};
+// Exposed so realtimeDashboard.js can drop sections the server invalidated.
+window.teacherLoadedSections = teacherLoadedSections;
 
 // Header notifications badge (unread count) - always show a number (including 0)
 function setTeacherHeaderNotificationUnreadCount(count) {
@@ -760,109 +762,19 @@ function initializeTeacherRealtimeSectionRefresh() {
     if (window.__teacherRtSectionRefreshBound) return;
     window.__teacherRtSectionRefreshBound = true;
 
-    // Automatic background refresh - refresh current section periodically
-    let autoRefreshInterval = null;
-    let lastActiveSection = null;
-    const REFRESH_INTERVAL = 30000; // 30 seconds
-
-    function startAutoRefresh() {
-        // Clear any existing interval
-        if (autoRefreshInterval) {
-            clearInterval(autoRefreshInterval);
-        }
-
-        // Get current active section
-        const activeSection = document.querySelector('.content-section.active');
-        if (!activeSection) return;
-
-        const sectionId = activeSection.id;
-        if (!sectionId) return;
-
-        const sectionName = sectionId.replace('Section', '');
-        if (!sectionName) return;
-
-        lastActiveSection = sectionName;
-
-        // Refresh function
-        const refreshCurrentSection = async () => {
-            // Only refresh if page is visible and section hasn't changed
-            if (document.hidden) return;
-
-            const currentActive = document.querySelector('.content-section.active');
-            if (!currentActive || currentActive.id !== sectionId) {
-                // Section changed, stop this refresh cycle
-                if (autoRefreshInterval) {
-                    clearInterval(autoRefreshInterval);
-                    autoRefreshInterval = null;
-                }
-                return;
-            }
-
-            try {
-                // Silently refresh without showing loading state
-                console.log(`[Auto-refresh] Refreshing teacher ${sectionName} section...`);
-                await window.forceReloadTeacherSection(sectionName);
-            } catch (error) {
-                console.warn(`[Auto-refresh] Failed to refresh ${sectionName}:`, error);
-            }
-        };
-
-        // Start interval
-        autoRefreshInterval = setInterval(refreshCurrentSection, REFRESH_INTERVAL);
-        console.log(`[Auto-refresh] Started for teacher section: ${sectionName} (every ${REFRESH_INTERVAL / 1000}s)`);
-    }
-
-    // Start auto-refresh when section changes
-    const originalShowTeacherSection = window.showTeacherSection;
-    if (originalShowTeacherSection) {
-        window.showTeacherSection = async function (sectionName) {
-            const result = await originalShowTeacherSection.apply(this, arguments);
-            // Start auto-refresh after section loads
-            setTimeout(startAutoRefresh, 1000);
-            return result;
-        };
-    }
-
-    // Also start on initial load
-    setTimeout(startAutoRefresh, 2000);
-
-    // Pause when tab is hidden, resume when visible
-    document.addEventListener('visibilitychange', () => {
-        if (document.hidden) {
-            if (autoRefreshInterval) {
-                clearInterval(autoRefreshInterval);
-                autoRefreshInterval = null;
-                console.log('[Auto-refresh] Paused (tab hidden)');
-            }
-        } else {
-            startAutoRefresh();
-            console.log('[Auto-refresh] Resumed (tab visible)');
-        }
-    });
-
+    // Sections are refetched when the server invalidates them (section.invalidated over
+    // ws/dashboard/, handled by realtimeDashboard.js); there is no timer-driven refresh.
     window.addEventListener('studyapp:dashboard-event', (ev) => {
         const detail = ev && ev.detail ? ev.detail : {};
-        const eventName = detail.event;
-        if (!eventName) return;
+        if (detail.event !== 'section.invalidated') return;
+        const data = detail.data || {};
 
         const active = document.querySelector('.content-section.active');
         const activeId = active ? active.id : '';
 
-        if (eventName === 'assignment.changed' && activeId === 'my_assignmentsSection') {
-            window.forceReloadTeacherSection('my_assignments');
-        }
-        if (eventName === 'homework.changed' && activeId === 'homeworkSection') {
-            window.forceReloadTeacherSection('homework');
-        }
-        if (eventName === 'exam.changed' && activeId === 'online_examSection') {
-            window.forceReloadTeacherSection('online_exam');
-        }
-        if (eventName === 'announcement.changed') {
-            if (activeId === 'announcementsSection') {
-                window.forceReloadTeacherSection('announcements');
-            } else if (typeof window.loadAnnouncements === 'function') {
-                window.loadAnnouncements();
-            }
+        // Announcements widgets outside the announcements section
+        if (data.entity === 'announcement' && activeId !== 'announcementsSection' && typeof window.loadAnnouncements === 'function') {
+            window.loadAnnouncements();
         }
     });
 }
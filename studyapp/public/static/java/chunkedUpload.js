@@ -0,0 +1,128 @@
+(function () {
+    if (window.ChunkedUpload) return;
+
+    // Resumable uploads against /uploads/api/ (see uploads/views.py).
+    // `ChunkedUpload.upload(file, { onProgress })` sends the file in chunks and
+    // resolves to a token the send/submit APIs accept as `upload_tokens`.
+    // Progress survives a reload: the upload id is kept in localStorage per
+    // file (name, size, mtime) and the next attempt continues at the server's offset.
+    const STORE_PREFIX = 'chunked-upload:';
+    const MAX_RETRIES = 5;
+
+    function csrfToken() {
+        const m = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+        return m ? decodeURIComponent(m[1]) : '';
+    }
+
+    function storeKey(file) {
+        return `${STORE_PREFIX}${file.name}:${file.size}:${file.lastModified || 0}`;
+    }
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    async function request(url, options = {}) {
+        const headers = Object.assign({ 'X-CSRFToken': csrfToken() }, options.headers || {});
+        const resp = await fetch(url, Object.assign({ credentials: 'same-origin' }, options, { headers }));
+        let data = {};
+        try { data = await resp.json(); } catch (e) {}
+        return { status: resp.status, ok: resp.ok, data };
+    }
+
+    async function chunkChecksum(buffer) {
+        if (!window.crypto || !crypto.subtle) return null;
+        const digest = await crypto.subtle.digest('SHA-256', buffer);
+        let binary = '';
+        new Uint8Array(digest).forEach(b => { binary += String.fromCharCode(b); });
+        return `sha256 ${btoa(binary)}`;
+    }
+
+    const ChunkedUpload = {
+        // Files at or below this go in the regular multipart request.
+        THRESHOLD: 4 * 1024 * 1024,
+
+        shouldUse(file) {
+            return !!file && file.size > this.THRESHOLD && typeof fetch === 'function';
+        },
+
+        async upload(file, opts = {}) {
+            const upload = await this._resumeOrCreate(file);
+            let offset = upload.offset;
+            const chunkSize = upload.chunk_size;
+            let retries = 0;
+
+            while (offset < file.size) {
+                const buffer = await file.slice(offset, Math.min(offset + chunkSize, file.size)).arrayBuffer();
+                const headers = { 'Upload-Offset': String(offset), 'Content-Type': 'application/offset+octet-stream' };
+                const checksum = await chunkChecksum(buffer);
+                if (checksum) headers['Upload-Checksum'] = checksum;
+
+                let res;
+                try {
+                    res = await request(`/uploads/api/${upload.id}/`, { method: 'PATCH', headers, body: buffer });
+                } catch (e) {
+                    res = null;
+                }
+                if (res && res.ok) {
+                    offset = res.data.offset;
+                    retries = 0;
+                    if (opts.onProgress) opts.onProgress(offset / file.size);
+                    continue;
+                }
+                if (res && res.status === 409 && typeof res.data.offset === 'number') {
+                    // Another attempt already stored more (or less); continue from the server's offset.
+                    offset = res.data.offset;
+                    continue;
+                }
+                if (res && res.status >= 400 && res.status < 500 && res.status !== 460) {
+                    localStorage.removeItem(storeKey(file));
+                    throw new Error(res.data.error || `Upload failed (${res.status})`);
+                }
+                if (++retries > MAX_RETRIES) throw new Error('Upload failed after several retries');
+                await sleep(500 * 2 ** retries);
+            }
+
+            const done = await request(`/uploads/api/${upload.id}/finalize/`, { method: 'POST' });
+            if (!done.ok) {
+                localStorage.removeItem(storeKey(file));
+                throw new Error(done.data.error || 'Could not finalize upload');
+            }
+            localStorage.removeItem(storeKey(file));
+            return done.data.token;
+        },
+
+        async _resumeOrCreate(file) {
+            const key = storeKey(file);
+            const known = localStorage.getItem(key);
+            if (known) {
+                try {
+                    const res = await request(`/uploads/api/${known}/`);
+                    if (res.ok && res.data.upload && res.data.upload.status === 'uploading') return res.data.upload;
+                } catch (e) {}
+                localStorage.removeItem(key);
+            }
+            const res = await request('/uploads/api/', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ filename: file.name, size: file.size, content_type: file.type || '' }),
+            });
+            if (!res.ok) throw new Error(res.data.error || 'Could not start upload');
+            localStorage.setItem(key, res.data.upload.id);
+            return res.data.upload;
+        },
+
+        // Append `files` to `form`: large ones as upload tokens, the rest as `field`.
+        async appendFiles(form, field, files, opts = {}) {
+            for (const f of files) {
+                if (this.shouldUse(f)) {
+                    form.append('upload_tokens', await this.upload(f, opts));
+                } else {
+                    form.append(field, f);
+                }
+            }
+        },
+    };
+
+    window.ChunkedUpload = ChunkedUpload;
+})();
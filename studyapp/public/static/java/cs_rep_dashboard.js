@@ -365,107 +365,19 @@ function initializeCSRepRealtimeSectionRefresh() {
     if (window.__csrepRtSectionRefreshBound) return;
     window.__csrepRtSectionRefreshBound = true;
 
-    // Automatic background refresh - refresh current section periodically
-    let autoRefreshInterval = null;
-    let lastActiveSection = null;
-    const REFRESH_INTERVAL = 30000; // 30 seconds
-
-    function startAutoRefresh() {
-        // Clear any existing interval
-        if (autoRefreshInterval) {
-            clearInterval(autoRefreshInterval);
-        }
-
-        // Get current active section
-        const activeSection = document.querySelector('.content-section.active');
-        if (!activeSection) return;
-
-        const sectionId = activeSection.id;
-        if (!sectionId) return;
-
-        const sectionKey = sectionId.replace('Section', '');
-        if (!sectionKey) return;
-
-        lastActiveSection = sectionKey;
-
-        // Refresh function
-        const refreshCurrentSection = async () => {
-            // Only refresh if page is visible and section hasn't changed
-            if (document.hidden) return;
-            
-            const currentActive = document.querySelector('.content-section.active');
-            if (!currentActive || currentActive.id !== sectionId) {
-                // Section changed, stop this refresh cycle
-                if (autoRefreshInterval) {
-                    clearInterval(autoRefreshInterval);
-                    autoRefreshInterval = null;
-                }
-                return;
-            }
-
-            try {
-                // Silently refresh without showing loading state
-                console.log(`[Auto-refresh] Refreshing CS rep ${sectionKey} section...`);
-                await window.forceReloadCSRepSection(sectionKey);
-            } catch (error) {
-                console.warn(`[Auto-refresh] Failed to refresh ${sectionKey}:`, error);
-            }
-        };
-
-        // Start interval
-        autoRefreshInterval = setInterval(refreshCurrentSection, REFRESH_INTERVAL);
-        console.log(`[Auto-refresh] Started for CS rep section: ${sectionKey} (every ${REFRESH_INTERVAL/1000}s)`);
-    }
-
-    // Start auto-refresh when section changes
-    const originalOpenSection = window.openSection;
-    if (originalOpenSection) {
-        window.openSection = async function(sectionKey) {
-            const result = await originalOpenSection.apply(this, arguments);
-            // Start auto-refresh after section loads
-            setTimeout(startAutoRefresh, 1000);
-            return result;
-        };
-    }
-
-    // Also start on initial load
-    setTimeout(startAutoRefresh, 2000);
-
-    // Pause when tab is hidden, resume when visible
-    document.addEventListener('visibilitychange', () => {
-        if (document.hidden) {
-            if (autoRefreshInterval) {
-                clearInterval(autoRefreshInterval);
-                autoRefreshInterval = null;
-                console.log('[Auto-refresh] Paused (tab hidden)');
-            }
-        } else {
-            startAutoRefresh();
-            console.log('[Auto-refresh] Resumed (tab visible)');
-        }
-    });
-
+    // Sections are refetched when the server invalidates them (section.invalidated over
+    // ws/dashboard/, handled by realtimeDashboard.js); there is no timer-driven refresh.
     window.addEventListener('studyapp:dashboard-event', (ev) => {
         const detail = ev && ev.detail ? ev.detail : {};
-        const eventName = detail.event;
-        if (!eventName) return;
+        if (detail.event !== 'section.invalidated') return;
+        const data = detail.data || {};
 
         const active = document.querySelector('.content-section.active');
         const activeId = active ? active.id : '';
 
-        // CS-Rep overview contains assignments/invoices widgets; refresh it if visible
-        if (eventName === 'assignment.changed' && activeId === 'overviewSection') {
-            window.forceReloadCSRepSection('overview');
-        }
-        if (eventName === 'announcement.changed') {
-            if (activeId === 'announcementsSection') {
-                window.forceReloadCSRepSection('announcements');
-            } else if (typeof window.loadAnnouncements === 'function') {
-                window.loadAnnouncements();
-            }
-        }
-        if (eventName === 'threads.changed' && activeId === 'threadsSection') {
-            window.forceReloadCSRepSection('threads');
+        // Announcements widgets outside the announcements section
+        if (data.entity === 'announcement' && activeId !== 'announcementsSection' && typeof window.loadAnnouncements === 'function') {
+            window.loadAnnouncements();
         }
     });
 }
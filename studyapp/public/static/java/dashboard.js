@@ -681,136 +681,19 @@ function initializeRealtimeSectionRefresh() {
     if (window.__rtSectionRefreshBound) return;
     window.__rtSectionRefreshBound = true;
 
-    // Automatic background refresh - refresh current section periodically
-    let autoRefreshInterval = null;
-    let lastActiveSection = null;
-    const REFRESH_INTERVAL = 30000; // 30 seconds
-
-    function startAutoRefresh() {
-        // Clear any existing interval
-        if (autoRefreshInterval) {
-            clearInterval(autoRefreshInterval);
-        }
-
-        // Get current active section
-        const activeSection = document.querySelector('.content-section.active');
-        if (!activeSection) return;
-
-        const sectionId = activeSection.id;
-        if (!sectionId) return;
-
-        const sectionName = sectionId.replace('Section', '');
-        if (!sectionName || sectionName === 'assignment-detail') return; // Skip detail views
-
-        lastActiveSection = sectionName;
-
-        // Refresh function
-        const refreshCurrentSection = async () => {
-            // Only refresh if page is visible and section hasn't changed
-            if (document.hidden) return;
-            
-            const currentActive = document.querySelector('.content-section.active');
-            if (!currentActive || currentActive.id !== sectionId) {
-                // Section changed, stop this refresh cycle
-                if (autoRefreshInterval) {
-                    clearInterval(autoRefreshInterval);
-                    autoRefreshInterval = null;
-                }
-                return;
-            }
-
-            try {
-                // Silently refresh without showing loading state
-                // Set a flag to indicate this is an auto-refresh
-                window._isAutoRefresh = true;
-                console.log(`[Auto-refresh] Silently refreshing ${sectionName} section...`);
-                
-                // Clear cache and reload
-                if (window.loadedSections && window.loadedSections[sectionName]) {
-                    delete window.loadedSections[sectionName];
-                }
-                
-                await window.forceReloadSection(sectionName);
-                
-                // Clear flag after refresh
-                window._isAutoRefresh = false;
-            } catch (error) {
-                window._isAutoRefresh = false;
-                console.warn(`[Auto-refresh] Failed to refresh ${sectionName}:`, error);
-            }
-        };
-
-        // Start interval
-        autoRefreshInterval = setInterval(refreshCurrentSection, REFRESH_INTERVAL);
-        console.log(`[Auto-refresh] Started for section: ${sectionName} (every ${REFRESH_INTERVAL/1000}s)`);
-    }
-
-    // Start auto-refresh when section changes
-    const originalShowSection = window.showSection;
-    if (originalShowSection) {
-        window.showSection = async function(sectionName) {
-            const result = await originalShowSection.apply(this, arguments);
-            // Start auto-refresh after section loads
-            setTimeout(startAutoRefresh, 1000);
-            return result;
-        };
-    }
-
-    // Also start on initial load
-    setTimeout(startAutoRefresh, 2000);
-
-    // Pause when tab is hidden, resume when visible
-    document.addEventListener('visibilitychange', () => {
-        if (document.hidden) {
-            if (autoRefreshInterval) {
-                clearInterval(autoRefreshInterval);
-                autoRefreshInterval = null;
-                console.log('[Auto-refresh] Paused (tab hidden)');
-            }
-        } else {
-            startAutoRefresh();
-            console.log('[Auto-refresh] Resumed (tab visible)');
-        }
-    });
-
+    // Sections are refetched when the server invalidates them (section.invalidated over
+    // ws/dashboard/, handled by realtimeDashboard.js); there is no timer-driven refresh.
     window.addEventListener('studyapp:dashboard-event', (ev) => {
         const detail = ev && ev.detail ? ev.detail : {};
-        const eventName = detail.event;
-        if (!eventName) return;
+        if (detail.event !== 'section.invalidated') return;
+        const data = detail.data || {};
 
         const active = document.querySelector('.content-section.active');
         const activeId = active ? active.id : '';
 
-        // Assignments: refresh tracker when visible
-        if (eventName === 'assignment.changed') {
-            if (activeId === 'trackerSection') {
-                window.forceReloadSection('tracker');
-            }
-        }
-
-        // Homework tab
-        if (eventName === 'homework.changed') {
-            if (activeId === 'homeworkSection') {
-                window.forceReloadSection('homework');
-            }
-        }
-
-        // Exams tab
-        if (eventName === 'exam.changed') {
-            if (activeId === 'onlineExamsSection' || activeId === 'online_examSection') {
-                // Student section key is "onlineExams" per mapping
-                window.forceReloadSection('onlineExams');
-            }
-        }
-
-        // Announcements tab (has a data loader function, but easiest is to reload section if visible)
-        if (eventName === 'announcement.changed') {
-            if (activeId === 'announcementsSection') {
-                window.forceReloadSection('announcements');
-            } else if (typeof window.loadAnnouncements === 'function') {
-                // If announcements UI exists on current page, refresh it
-                window.loadAnnouncements();
-            }
+        // Announcements widgets outside the announcements section
+        if (data.entity === 'announcement' && activeId !== 'announcementsSection' && typeof window.loadAnnouncements === 'function') {
+            window.loadAnnouncements();
         }
     });
 }
@@ -12,6 +12,13 @@
         _ws: null,
         _wsReconnectTimer: null,
         _wsReconnectAttempt: 0,
+        _wsConnectedOnce: false,
+        // Keyset cursors of the active thread: `before=` for older history, `after=` for gap-fill.
+        _prevCursor: null,
+        _newestCursor: null,
+        _loadingOlder: false,
+        // client_key -> { resolve, reject, timer } for text sends awaiting a WS ack
+        _pendingAcks: new Map(),
         // No polling: all user-facing updates are WS-driven.
         _sectionEl: null,
         _els: {},
@@ -74,7 +81,7 @@
                     this._connectWebSocket();
                     this.refreshThreads().catch(() => {});
                     if (this._activeThreadId) {
-                        this._pollActiveThread().catch(() => {});
+                        this._gapFillActiveThread().catch(() => {});
                     }
                 }
             });
@@ -121,6 +128,13 @@
             };
             els.threadList.addEventListener('click', this._onThreadClickBound);
 
+            // Scrolling to the top loads the previous page of history
+            els.messagesContainer.removeEventListener('scroll', this._onMessagesScrollBound);
+            this._onMessagesScrollBound = () => {
+                if (els.messagesContainer.scrollTop < 60) this._loadOlderMessages().catch(() => {});
+            };
+            els.messagesContainer.addEventListener('scroll', this._onMessagesScrollBound);
+
             // Delete thread (Admin/Teacher/CS Rep only; student UI doesn't include the button)
             if (els.deleteThreadBtn) {
                 els.deleteThreadBtn.addEventListener('click', async (e) => {
@@ -357,9 +371,13 @@
             }
 
             this._els.messagesContainer.innerHTML = '<div style="padding:16px;color:var(--muted);">Loading...</div>';
-            const resp = await this._apiGet(`/messages/api/threads/${threadId}/messages/?limit=80`);
+            this._prevCursor = null;
+            this._newestCursor = null;
+            const resp = await this._apiGet(`/messages/api/threads/${threadId}/messages/?limit=50`);
+            if (threadId !== this._activeThreadId) return;
             const msgs = (resp && resp.messages) || [];
             this._renderMessages(msgs);
+            this._prevCursor = (resp && resp.prev_cursor) || null;
 
             // Mark read (best-effort)
             this._apiPost(`/messages/api/threads/${threadId}/mark-read/`, {}).catch(() => {});
@@ -389,9 +407,29 @@
             el.scrollTop = el.scrollHeight;
         },
 
-        _appendMessage(m) {
+        async _loadOlderMessages() {
+            const threadId = this._activeThreadId;
+            const el = this._els.messagesContainer;
+            if (!threadId || !el || !this._prevCursor || this._loadingOlder) return;
+            this._loadingOlder = true;
+            try {
+                const resp = await this._apiGet(`/messages/api/threads/${threadId}/messages/?limit=50&before=${encodeURIComponent(this._prevCursor)}`);
+                if (threadId !== this._activeThreadId) return;
+                const msgs = (resp && resp.messages) || [];
+                // Keep the viewport on the message the user was looking at
+                const prevHeight = el.scrollHeight;
+                for (let i = msgs.length - 1; i >= 0; i--) this._appendMessage(msgs[i], { prepend: true });
+                el.scrollTop += el.scrollHeight - prevHeight;
+                this._prevCursor = (resp && resp.prev_cursor) || null;
+            } finally {
+                this._loadingOlder = false;
+            }
+        },
+
+        _appendMessage(m, opts = {}) {
             const el = this._els.messagesContainer;
             if (!el) return;
+            if (!opts.prepend && m.cursor && m.thread_id === this._activeThreadId) this._newestCursor = m.cursor;
             if (el.querySelector(`[data-message-id="${m.id}"]`)) return;
 
             const isMine = (m.sender && m.sender.id) && (window.currentUserId && m.sender.id === window.currentUserId);
@@ -406,7 +444,15 @@
                 ? `<div class="message-attachments">${attachments.map(a => {
                     const name = this._escape(a.name || 'file');
                     const url = a.url;
+                    // Images get an inline WebP thumbnail once the server has derived one.
+                    const thumb = a.thumb_url
+                        ? `<a href="${a.preview_url || url}" target="_blank" rel="noopener noreferrer" class="attachment-thumb" style="display:block;margin-bottom:6px;">
+                               <img src="${a.thumb_url}" alt="${name}" loading="lazy" decoding="async"
+                                    style="max-width:240px;max-height:240px;border-radius:8px;display:block;">
+                           </a>`
+                        : '';
                     return `<div class="attachment-item" title="${name}">
+                                ${thumb}
                                 <div class="attachment-actions" style="display:flex;gap:8px;flex-wrap:wrap;align-items:center;">
                                     <a href="${url}" target="_blank" rel="noopener noreferrer" class="attachment-link attachment-view"
                                        style="color:inherit;text-decoration:none;display:inline-flex;gap:8px;align-items:center;padding:6px 10px;border-radius:999px;background:rgba(0,0,0,0.05);">
@@ -440,7 +486,11 @@
                 </div>
                 ${isMine ? `<div class="avatar">${senderAvatar ? `<img src="${senderAvatar}" alt="">` : `<div class="avatar-fallback"><i class="fas fa-user"></i></div>`}</div>` : ''}
             `;
-            el.appendChild(row);
+            if (opts.prepend) {
+                el.insertBefore(row, el.firstChild);
+            } else {
+                el.appendChild(row);
+            }
 
             if (isMine) this._updateTicksForActiveThread();
         },
@@ -504,14 +554,31 @@
                 return;
             }
 
-            const form = new FormData();
-            form.append('content', content);
-            this._pendingFiles.forEach(f => form.append('files', f));
+            const threadId = this._activeThreadId;
+            // Idempotency key: a retry (WS or HTTP fallback) never creates a second message.
+            const clientKey = (window.crypto && crypto.randomUUID)
+                ? crypto.randomUUID()
+                : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
 
             try {
-                const resp = await this._apiPostForm(`/messages/api/threads/${this._activeThreadId}/send/`, form);
-                const msg = resp?.message;
-                if (msg) this._appendMessage(msg);
+                let msg = null;
+                if (!this._pendingFiles.length && this._ws && this._ws.readyState === WebSocket.OPEN) {
+                    // Text-only: send over the socket; attachments need the multipart endpoint.
+                    msg = await this._sendOverWs(threadId, content, clientKey).catch(() => null);
+                }
+                if (!msg) {
+                    const form = new FormData();
+                    form.append('content', content);
+                    form.append('client_key', clientKey);
+                    if (window.ChunkedUpload) {
+                        await window.ChunkedUpload.appendFiles(form, 'files', this._pendingFiles);
+                    } else {
+                        this._pendingFiles.forEach(f => form.append('files', f));
+                    }
+                    const resp = await this._apiPostForm(`/messages/api/threads/${threadId}/send/`, form);
+                    msg = resp?.message;
+                }
+                if (msg && threadId === this._activeThreadId) this._appendMessage(msg);
                 if (this._els.messageInput) this._els.messageInput.value = '';
                 this._pendingFiles = [];
                 this._renderPendingFiles();
@@ -523,6 +590,32 @@
             }
         },
 
+        _sendOverWs(threadId, content, clientKey) {
+            return new Promise((resolve, reject) => {
+                const timer = setTimeout(() => {
+                    this._pendingAcks.delete(clientKey);
+                    reject(new Error('ack timeout'));
+                }, 8000);
+                this._pendingAcks.set(clientKey, { resolve, reject, timer });
+                try {
+                    this._ws.send(JSON.stringify({ type: 'send', thread_id: threadId, content, client_key: clientKey }));
+                } catch (e) {
+                    clearTimeout(timer);
+                    this._pendingAcks.delete(clientKey);
+                    reject(e);
+                }
+            });
+        },
+
+        _settleAck(data) {
+            const pending = this._pendingAcks.get(data.client_key);
+            if (!pending) return;
+            clearTimeout(pending.timer);
+            this._pendingAcks.delete(data.client_key);
+            if (data.type === 'ack') pending.resolve(data.message);
+            else pending.reject(new Error(data.error || 'Send failed'));
+        },
+
         _connectWebSocket() {
             if (this._ws && (this._ws.readyState === WebSocket.OPEN || this._ws.readyState === WebSocket.CONNECTING)) {
                 return;
@@ -531,7 +624,7 @@
             const wsUrl = `${proto}//${window.location.host}/ws/messages/`;
 
             try {
-                this._ws = new WebSocket(wsUrl);
+                this._ws = window.RealtimeHub ? window.RealtimeHub.open('dm') : new WebSocket(wsUrl);
             } catch (e) {
                 console.warn('WS connection failed:', e);
                 this._scheduleWsReconnect();
@@ -569,6 +662,10 @@
                     }
                 }
 
+                if (data.type === 'ack' || data.type === 'nack') {
+                    this._settleAck(data);
+                }
+
                 if (data.type === 'read') {
                     const threadId = data.thread_id;
                     const readAt = data.read_at;
@@ -603,6 +700,9 @@
             this._ws.onopen = () => {
                 console.log('✅ Messaging WS connected');
                 this._wsReconnectAttempt = 0;
+                // Messages sent while we were disconnected never reached this socket
+                if (this._wsConnectedOnce && this._activeThreadId) this._gapFillActiveThread().catch(() => {});
+                this._wsConnectedOnce = true;
                 if (this._wsReconnectTimer) {
                     clearTimeout(this._wsReconnectTimer);
                     this._wsReconnectTimer = null;
@@ -641,18 +741,33 @@
             }, delay);
         },
 
-        async _pollActiveThread() {
+        async _gapFillActiveThread() {
             const threadId = this._activeThreadId;
             if (!threadId || !this._els.messagesContainer) return;
+            if (!this._newestCursor) {
+                await this.openThread(threadId);
+                return;
+            }
 
-            // Fetch the latest ~30 messages and append any we don't have yet.
-            const resp = await this._apiGet(`/messages/api/threads/${threadId}/messages/?limit=30`);
-            const msgs = (resp && resp.messages) || [];
-            msgs.forEach(m => this._appendMessage(m));
+            // Page forward from the newest message we have until caught up.
+            let cursor = this._newestCursor;
+            for (let page = 0; cursor && page < 10; page++) {
+                const resp = await this._apiGet(`/messages/api/threads/${threadId}/messages/?limit=100&after=${encodeURIComponent(cursor)}`);
+                if (threadId !== this._activeThreadId) return;
+                const msgs = (resp && resp.messages) || [];
+                msgs.forEach(m => this._appendMessage(m));
+                cursor = (resp && resp.next_cursor) || null;
+            }
+            if (cursor) {
+                // Too far behind: start over from the latest page.
+                await this.openThread(threadId);
+                return;
+            }
+            this._els.messagesContainer.scrollTop = this._els.messagesContainer.scrollHeight;
             // If we’re viewing it, mark read (best-effort)
             this._apiPost(`/messages/api/threads/${threadId}/mark-read/`, {}).catch(() => {});
 
-            // Polling also refreshes thread metadata (incl. other_last_read_at)
+            // Also refreshes thread metadata (incl. other_last_read_at)
             this.refreshThreads().catch(() => {});
         },
 
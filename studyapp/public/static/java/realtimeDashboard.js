@@ -6,9 +6,23 @@
         _reconnectTimer: null,
         _reconnectAttempt: 0,
         _lastBadges: {},
+        // Last applied seq per stream ("user", "role"); null until the first bootstrap.
+        _seq: null,
+        _resuming: false,
+        _staleSections: new Set(),
+        _reloadTimer: null,
+        // From bootstrap: role broadcasts by this user or of a muted type are not in its feed.
+        _userId: null,
+        _mutedTypes: new Set(),
 
         init() {
             this.connect();
+            // A section invalidated while the tab was hidden is refetched when it becomes visible.
+            document.addEventListener('visibilitychange', () => {
+                if (!document.hidden && this._staleSections.has(this._activeSectionName())) {
+                    this._scheduleSectionReload();
+                }
+            });
             // Bind notification list actions (delete, view/mark read) using delegation where possible.
             this._bindNotificationDelegation();
         },
@@ -20,9 +34,14 @@
                 }
             } catch (e) {}
 
-            const proto = window.location.protocol === 'https:' ? 'wss' : 'ws';
-            const url = `${proto}://${window.location.host}/ws/dashboard/`;
-            const ws = new WebSocket(url);
+            // Shares the tab's /ws/hub/ socket when realtimeHub.js is loaded.
+            let ws;
+            if (window.RealtimeHub) {
+                ws = window.RealtimeHub.open('dashboard');
+            } else {
+                const proto = window.location.protocol === 'https:' ? 'wss' : 'ws';
+                ws = new WebSocket(`${proto}://${window.location.host}/ws/dashboard/`);
+            }
             this._ws = ws;
 
             ws.onopen = () => {
@@ -39,6 +58,7 @@
             };
 
             ws.onclose = () => {
+                this._resuming = false;
                 this._scheduleReconnect();
             };
 
@@ -63,15 +83,84 @@
 
         _handleMessage(msg) {
             if (!msg) return;
-            if (msg.type === 'bootstrap' && msg.badges) {
-                this._applyBadges(msg.badges);
+            if (msg.type === 'bootstrap') {
+                this._applyLiveFilter(msg);
+                if (msg.badges) this._applyBadges(msg.badges);
+                if (this._seq === null) {
+                    // First connection: the page was just rendered, nothing to replay.
+                    this._seq = Object.assign({}, msg.seq || {});
+                } else {
+                    this._sendResume();
+                }
+                return;
+            }
+            if (msg.type === 'resumed') {
+                this._resuming = false;
+                return;
+            }
+            if (msg.type === 'resync') {
+                // Missed events are gone from the server buffer: start over from current state.
+                this._resuming = false;
+                this._seq = Object.assign({}, msg.seq || {});
+                this._applyLiveFilter(msg);
+                if (msg.badges) this._applyBadges(msg.badges);
+                this.reloadActiveSection();
+                this._emit('stream.resync', {});
                 return;
             }
             if (msg.type === 'event') {
+                if (msg.seq != null && !this._acceptSeq(msg.stream, Number(msg.seq))) return;
                 this._handleEvent(msg.event, msg.data || {});
             }
         },
 
+        _acceptSeq(stream, seq) {
+            if (!this._seq || !stream) return true;
+            const last = this._seq[stream];
+            if (last == null) {
+                this._seq[stream] = seq;
+                return true;
+            }
+            if (seq <= last) return false; // duplicate (live + replay)
+            if (seq === last + 1) {
+                this._seq[stream] = seq;
+                return true;
+            }
+            // Gap: drop it and let a replay deliver everything in order.
+            if (!this._resuming) this._sendResume();
+            return false;
+        },
+
+        _applyLiveFilter(data) {
+            if (!data) return;
+            if (data.user_id) this._userId = String(data.user_id);
+            if (Array.isArray(data.muted_notification_types)) {
+                this._mutedTypes = new Set(data.muted_notification_types);
+            }
+        },
+
+        // Same rules as the server-side feed (notifications.broadcasts.visible_broadcasts).
+        _inFeed(data) {
+            if (!data || !data.broadcast) return true;
+            const actorId = data.actor && data.actor.id;
+            if (actorId && this._userId && String(actorId) === this._userId) return false;
+            return !this._mutedTypes.has(data.notification_type);
+        },
+
+        _sendResume() {
+            if (!this._ws || this._ws.readyState !== WebSocket.OPEN || !this._seq) return;
+            this._resuming = true;
+            try {
+                this._ws.send(JSON.stringify({
+                    type: 'resume',
+                    last_seq: this._seq.user,
+                    last_role_seq: this._seq.role,
+                }));
+            } catch (e) {
+                this._resuming = false;
+            }
+        },
+
         _handleEvent(eventName, data) {
             if (!eventName) return;
             if (eventName === 'badges.updated') {
@@ -81,9 +170,28 @@
                 return;
             }
 
+            if (eventName === 'section.invalidated') {
+                this._invalidateSections((data && data.sections) || []);
+                this._emit(eventName, data);
+                return;
+            }
+
+            if (eventName === 'notifications.preferences') {
+                this._applyLiveFilter(data);
+                this._emit(eventName, data);
+                return;
+            }
+
             // Notifications
             if (eventName === 'notification.created') {
+                if (!this._inFeed(data)) return;
                 this._insertNotification(data);
+                // Role broadcasts arrive once per role without a per-user badge push.
+                if (data && data.broadcast && this._lastBadges) {
+                    const badges = Object.assign({}, this._lastBadges);
+                    badges.notifications_unread = Number(badges.notifications_unread || 0) + 1;
+                    this._applyBadges(badges);
+                }
                 this._emit(eventName, data);
                 return;
             }
@@ -112,6 +220,57 @@
             this._emit(eventName, data);
         },
 
+        _activeSectionName() {
+            const active = document.querySelector('.content-section.active');
+            return active && active.id ? active.id.replace('Section', '') : '';
+        },
+
+        _dropSectionCache(sectionName) {
+            try { if (window.loadedSections) delete window.loadedSections[sectionName]; } catch (e) {}
+            try { if (window.csrepLoadedSections) delete window.csrepLoadedSections[sectionName]; } catch (e) {}
+            try { if (window.teacherLoadedSections) delete window.teacherLoadedSections[sectionName]; } catch (e) {}
+        },
+
+        // Sections listed in a `section.invalidated` event: cached copies are dropped
+        // (refetched on next open) and the visible one is re-rendered now.
+        _invalidateSections(sections) {
+            const active = this._activeSectionName();
+            sections.forEach((name) => {
+                this._dropSectionCache(name);
+                if (name === active) this._staleSections.add(name);
+            });
+            if (this._staleSections.has(active) && !document.hidden) {
+                this._scheduleSectionReload();
+            }
+        },
+
+        _scheduleSectionReload() {
+            // Several invalidations in a burst (e.g. one per entity) cause one refetch.
+            if (this._reloadTimer) return;
+            this._reloadTimer = setTimeout(() => {
+                this._reloadTimer = null;
+                this.reloadActiveSection();
+            }, 300);
+        },
+
+        // Re-fetch the visible dashboard section (after an invalidation, or when events may have been missed).
+        reloadActiveSection() {
+            const sectionName = this._activeSectionName();
+            this._staleSections.clear();
+            if (!sectionName || sectionName === 'assignment-detail') return;
+            const reload = window.forceReloadSection || window.forceReloadTeacherSection || window.forceReloadCSRepSection;
+            if (typeof reload !== 'function') return;
+            try {
+                this._dropSectionCache(sectionName);
+                window._isAutoRefresh = true;
+                Promise.resolve(reload(sectionName)).finally(() => {
+                    window._isAutoRefresh = false;
+                });
+            } catch (e) {
+                window._isAutoRefresh = false;
+            }
+        },
+
         _emit(eventName, data) {
             try {
                 window.dispatchEvent(new CustomEvent('studyapp:dashboard-event', {
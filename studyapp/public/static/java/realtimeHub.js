@@ -0,0 +1,147 @@
+(function () {
+    if (window.RealtimeHub) return;
+
+    // One /ws/hub/ socket per tab carrying the dashboard, dm, threads and
+    // thread:<id> streams. `RealtimeHub.open(name)` returns a WebSocket-like
+    // object (readyState, send, close, onopen/onmessage/onclose/onerror) so the
+    // existing socket code can use it unchanged. When the hub socket drops every
+    // stream gets `onclose`, and its owner reconnects as it would a dedicated socket.
+    const CONNECTING = 0, OPEN = 1, CLOSED = 3;
+
+    class HubStream {
+        constructor(hub, name) {
+            this._hub = hub;
+            this.name = name;
+            this.readyState = CONNECTING;
+            this.onopen = null;
+            this.onmessage = null;
+            this.onclose = null;
+            this.onerror = null;
+        }
+
+        send(data) {
+            if (this.readyState !== OPEN) throw new Error(`Stream ${this.name} is not open`);
+            const payload = typeof data === 'string' ? JSON.parse(data) : data;
+            this._hub._sendFrame({ stream: this.name, data: payload });
+        }
+
+        close() {
+            if (this.readyState === CLOSED) return;
+            this._hub._unsubscribe(this);
+            this._closed(1000);
+        }
+
+        _opened() {
+            if (this.readyState !== CONNECTING) return;
+            this.readyState = OPEN;
+            if (this.onopen) this.onopen({ type: 'open', target: this });
+        }
+
+        _deliver(data) {
+            if (this.readyState !== OPEN || !this.onmessage) return;
+            this.onmessage({ type: 'message', data: JSON.stringify(data), target: this });
+        }
+
+        _closed(code, reason) {
+            if (this.readyState === CLOSED) return;
+            this.readyState = CLOSED;
+            this._hub._forget(this);
+            if (this.onclose) this.onclose({ type: 'close', code, reason: reason || '', wasClean: code === 1000, target: this });
+        }
+    }
+
+    const RealtimeHub = {
+        _ws: null,
+        _streams: new Map(),
+
+        open(name) {
+            const existing = this._streams.get(name);
+            if (existing) existing.close();
+            const stream = new HubStream(this, name);
+            this._streams.set(name, stream);
+            this._ensureSocket();
+            if (this._ws && this._ws.readyState === WebSocket.OPEN) {
+                this._sendFrame({ type: 'subscribe', stream: name });
+            }
+            return stream;
+        },
+
+        _ensureSocket() {
+            if (this._ws && (this._ws.readyState === WebSocket.OPEN || this._ws.readyState === WebSocket.CONNECTING)) {
+                return;
+            }
+            const proto = window.location.protocol === 'https:' ? 'wss' : 'ws';
+            let ws;
+            try {
+                ws = new WebSocket(`${proto}://${window.location.host}/ws/hub/`);
+            } catch (e) {
+                this._dropAll(1006);
+                return;
+            }
+            this._ws = ws;
+
+            ws.onopen = () => {
+                // Streams opened while the socket was connecting.
+                this._streams.forEach((stream, name) => {
+                    if (stream.readyState === CONNECTING) this._sendFrame({ type: 'subscribe', stream: name });
+                });
+            };
+
+            ws.onmessage = (evt) => {
+                let msg = null;
+                try { msg = JSON.parse(evt.data); } catch (e) { return; }
+                if (!msg) return;
+                if (msg.type === 'subscribed') {
+                    const stream = this._streams.get(msg.stream);
+                    if (stream) stream._opened();
+                    return;
+                }
+                if (msg.type === 'unsubscribed') {
+                    // 'client' echoes our own close(); a newer stream may already use the name.
+                    if (msg.reason === 'client') return;
+                    const stream = this._streams.get(msg.stream);
+                    if (stream) {
+                        if (stream.onerror && msg.reason !== 'closed') stream.onerror({ type: 'error', target: stream });
+                        stream._closed(msg.code || 4403, msg.reason);
+                    }
+                    return;
+                }
+                if (msg.stream) {
+                    const stream = this._streams.get(msg.stream);
+                    if (stream) stream._deliver(msg.data || {});
+                }
+            };
+
+            ws.onclose = (evt) => {
+                if (this._ws === ws) this._ws = null;
+                this._dropAll((evt && evt.code) || 1006);
+            };
+
+            ws.onerror = () => {
+                // onclose follows and closes the streams.
+            };
+        },
+
+        _dropAll(code) {
+            Array.from(this._streams.values()).forEach((stream) => stream._closed(code));
+        },
+
+        _sendFrame(frame) {
+            try {
+                if (this._ws && this._ws.readyState === WebSocket.OPEN) this._ws.send(JSON.stringify(frame));
+            } catch (e) {}
+        },
+
+        _unsubscribe(stream) {
+            if (this._streams.get(stream.name) === stream) {
+                this._sendFrame({ type: 'unsubscribe', stream: stream.name });
+            }
+        },
+
+        _forget(stream) {
+            if (this._streams.get(stream.name) === stream) this._streams.delete(stream.name);
+        },
+    };
+
+    window.RealtimeHub = RealtimeHub;
+})();
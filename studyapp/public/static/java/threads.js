@@ -7,6 +7,11 @@
         _isSending: false,
         _threads: [],
         _threadMap: new Map(),
+        _nextCursor: null,
+        _listUrl: '/threads/api/list/',
+        _prevMsgCursor: null,
+        _newestMsgCursor: null,
+        _markedReadCursor: null,
         _ws: null,
         _listWs: null,
         _participants: [],
@@ -31,6 +36,10 @@
             this._cacheEls(section);
             this._bindUI();
             this._connectListWebSocket();
+            // Messages that arrived while the tab was hidden are read once it's visible again.
+            document.addEventListener('visibilitychange', () => {
+                if (!document.hidden) this._scheduleMarkRead();
+            });
             
             this.refreshThreads();
             this._initialized = true;
@@ -768,13 +777,10 @@
                 if (resp.success) {
                     if (window.showToast) window.showToast('Voicemail sent', 'success');
                     
-                    // Reload messages to show the new voicemail
+                    // Fetch what's newer than the last rendered message, in case the WebSocket missed it
                     if (threadId === this._activeThreadId && this._els.messagesContainer) {
                         try {
-                            const data = await this._apiGet(`/threads/api/${threadId}/messages/`);
-                            if (data.success) {
-                                this._renderMessages(data.messages);
-                            }
+                            await this._catchUpMessages(threadId);
                         } catch (reloadError) {
                             // Ignore reload errors - WebSocket should handle it
                             console.warn('Failed to reload messages after voicemail send:', reloadError);
@@ -831,16 +837,49 @@
             } else {
                 url = '/threads/api/list/';
             }
+            this._listUrl = url;
             try {
                 const data = await this._apiGet(url);
                 this._threads = data.threads || [];
                 this._threadMap = new Map(this._threads.map(t => [t.id, t]));
+                this._nextCursor = data.next_cursor || null;
                 this._renderThreadList();
             } catch (e) {
                 console.error('Failed to load threads:', e);
             }
         },
 
+        async _loadMoreThreads() {
+            if (!this._nextCursor || this._loadingMore) return;
+            this._loadingMore = true;
+            const sep = this._listUrl.includes('?') ? '&' : '?';
+            try {
+                const data = await this._apiGet(`${this._listUrl}${sep}cursor=${encodeURIComponent(this._nextCursor)}`);
+                (data.threads || []).forEach(t => {
+                    if (!this._threadMap.has(t.id)) this._threads.push(t);
+                    this._threadMap.set(t.id, t);
+                });
+                this._nextCursor = data.next_cursor || null;
+                this._renderThreadList();
+            } catch (e) {
+                console.error('Failed to load more threads:', e);
+            } finally {
+                this._loadingMore = false;
+            }
+        },
+
+        async _fetchThread(threadId) {
+            // Deep links can point past the loaded pages.
+            try {
+                const data = await this._apiGet(`/threads/api/list/?id=${encodeURIComponent(threadId)}`);
+                const t = (data.threads || [])[0];
+                if (t) this._threadMap.set(t.id, t);
+                return t || null;
+            } catch (e) {
+                return null;
+            }
+        },
+
         _renderThreadList() {
             const els = this._els;
             if (!els.threadsList) return;
@@ -920,11 +959,19 @@
                 `;
                 els.threadsList.appendChild(card);
             });
+
+            if (this._nextCursor) {
+                const more = document.createElement('button');
+                more.className = 'thread-action-btn thread-load-more';
+                more.innerHTML = '<i class="fas fa-chevron-down"></i> Load more threads';
+                more.addEventListener('click', () => this._loadMoreThreads());
+                els.threadsList.appendChild(more);
+            }
         },
 
         async openThread(threadId) {
             this._activeThreadId = threadId;
-            const t = this._threadMap.get(threadId);
+            const t = this._threadMap.get(threadId) || await this._fetchThread(threadId);
             if (!t) return;
 
             const els = this._els;
@@ -984,11 +1031,7 @@
                 const isResolvedOrClosed = t.status === 'resolved' || t.status === 'closed';
                 this._toggleComposer(!isResolvedOrClosed);
                 
-                this._renderMessages([]); 
-                const data = await this._apiGet(`/threads/api/${threadId}/messages/`);
-                if (data.success) {
-                    this._renderMessages(data.messages);
-                }
+                await this._loadThreadMessages(threadId);
                 
                 this._connectThreadWebSocket(threadId);
             } else if (this._role === 'CS_REP' || this._role === 'ADMIN') {
@@ -1027,11 +1070,7 @@
                     this._toggleComposer(!isResolvedOrClosed);
                     
                     // Load messages
-                    this._renderMessages([]);
-                    const data = await this._apiGet(`/threads/api/${threadId}/messages/`);
-                    if (data.success) {
-                        this._renderMessages(data.messages);
-                    }
+                    await this._loadThreadMessages(threadId);
                     
                     this._connectThreadWebSocket(threadId);
                 } else {
@@ -1086,13 +1125,98 @@
             const container = this._els.messagesContainer;
             if (!container) return;
             container.innerHTML = '';
+            this._renderedIds = new Set();
             messages.forEach(m => this._appendMessage(m));
             container.scrollTop = container.scrollHeight;
         },
 
-        _appendMessage(m) {
+        async _loadThreadMessages(threadId) {
+            // Latest page only; older pages load when scrolling to the top.
+            this._prevMsgCursor = null;
+            this._newestMsgCursor = null;
+            this._renderMessages([]);
+            const data = await this._apiGet(`/threads/api/${threadId}/messages/`);
+            if (!data.success || threadId !== this._activeThreadId) return;
+            this._renderMessages(data.messages);
+            this._prevMsgCursor = data.prev_cursor || null;
+            this._bindOlderMessagesScroll();
+            this._scheduleMarkRead();
+        },
+
+        async _catchUpMessages(threadId) {
+            if (!this._newestMsgCursor) return this._loadThreadMessages(threadId);
+            let after = this._newestMsgCursor;
+            while (after && threadId === this._activeThreadId) {
+                const data = await this._apiGet(`/threads/api/${threadId}/messages/?after=${encodeURIComponent(after)}`);
+                if (!data.success) return;
+                (data.messages || []).forEach(m => this._appendMessage(m));
+                after = data.next_cursor || null;
+            }
+            this._scheduleMarkRead();
+        },
+
+        _bindOlderMessagesScroll() {
+            const container = this._els.messagesContainer;
+            if (!container || container._olderScrollBound) return;
+            container._olderScrollBound = true;
+            container.addEventListener('scroll', () => {
+                if (container.scrollTop < 60) this._loadOlderMessages();
+            });
+        },
+
+        async _loadOlderMessages() {
+            const threadId = this._activeThreadId;
+            const container = this._els.messagesContainer;
+            if (!threadId || !container || !this._prevMsgCursor || this._loadingOlder) return;
+            this._loadingOlder = true;
+            try {
+                const data = await this._apiGet(`/threads/api/${threadId}/messages/?before=${encodeURIComponent(this._prevMsgCursor)}`);
+                if (!data.success || threadId !== this._activeThreadId) return;
+                // Keep the viewport on the message the user was looking at.
+                const fromBottom = container.scrollHeight - container.scrollTop;
+                (data.messages || []).slice().reverse().forEach(m => this._appendMessage(m, { prepend: true }));
+                container.scrollTop = container.scrollHeight - fromBottom;
+                this._prevMsgCursor = data.prev_cursor || null;
+            } catch (e) {
+                console.warn('Failed to load older messages:', e);
+            } finally {
+                this._loadingOlder = false;
+            }
+        },
+
+        _scheduleMarkRead() {
+            // Debounced; the server ignores cursors that don't move forward.
+            clearTimeout(this._markReadTimer);
+            this._markReadTimer = setTimeout(() => this._markRead(), 800);
+        },
+
+        async _markRead() {
+            const threadId = this._activeThreadId;
+            const upTo = this._newestMsgCursor;
+            if (!threadId || !upTo || document.hidden || upTo === this._markedReadCursor) return;
+            const fd = new FormData();
+            fd.append('up_to', upTo);
+            try {
+                const resp = await this._apiPostForm(`/threads/api/${threadId}/read/`, fd);
+                if (resp.success) {
+                    this._markedReadCursor = upTo;
+                    const t = this._threadMap.get(threadId);
+                    if (t) t.unread_count = 0;
+                }
+            } catch (e) {
+                console.warn('Failed to mark thread read:', e);
+            }
+        },
+
+        _appendMessage(m, opts = {}) {
             const container = this._els.messagesContainer;
             if (!container) return;
+            if (m.id) {
+                if (!this._renderedIds) this._renderedIds = new Set();
+                if (this._renderedIds.has(m.id)) return;
+                this._renderedIds.add(m.id);
+            }
+            if (!opts.prepend && m.cursor) this._newestMsgCursor = m.cursor;
 
             const isMe = m.is_me;
             const div = document.createElement('div');
@@ -1110,8 +1234,15 @@
                                 </div>
                             `;
                         }
+                        const thumb = a.thumb_url
+                            ? `<a href="${a.url}" target="_blank" rel="noopener" class="attachment-thumb" style="display:block;margin-bottom:6px;">
+                                   <img src="${a.thumb_url}" alt="${this._escape(a.name)}" loading="lazy" decoding="async"
+                                        style="max-width:240px;max-height:240px;border-radius:8px;display:block;">
+                               </a>`
+                            : '';
                         return `
                             <div class="attachment-item">
+                                ${thumb}
                                 <div class="attachment-actions" style="display:flex;gap:8px;flex-wrap:wrap;align-items:center;">
                                     <a href="${a.url}" target="_blank" rel="noopener" class="attachment-link attachment-view">
                                         <i class="fas fa-file"></i> ${this._escape(a.name)}
@@ -1136,6 +1267,10 @@
                     <div class="message-time">${this._formatTime(m.created_at)}</div>
                 </div>
             `;
+            if (opts.prepend) {
+                container.insertBefore(div, container.firstChild);
+                return;
+            }
             container.appendChild(div);
             container.scrollTop = container.scrollHeight;
         },
@@ -1227,13 +1362,17 @@
                 if (user) formData.append('mentions', user.id);
             });
 
-            if (this._els.fileInput && this._els.fileInput.files.length) {
-                for (let f of this._els.fileInput.files) {
-                    formData.append('files', f);
+            try {
+                if (this._els.fileInput && this._els.fileInput.files.length) {
+                    if (window.ChunkedUpload) {
+                        await window.ChunkedUpload.appendFiles(formData, 'files', Array.from(this._els.fileInput.files));
+                    } else {
+                        for (let f of this._els.fileInput.files) {
+                            formData.append('files', f);
+                        }
+                    }
                 }
-            }
 
-            try {
                 const resp = await this._apiPostForm(`/threads/api/${threadId}/send/`, formData);
                 if (resp.success) {
                     this._els.replyInput.value = '';
@@ -1244,10 +1383,7 @@
                     // to ensure it appears even if WebSocket fails
                     if (threadId === this._activeThreadId && this._els.messagesContainer) {
                         try {
-                            const data = await this._apiGet(`/threads/api/${threadId}/messages/`);
-                            if (data.success) {
-                                this._renderMessages(data.messages);
-                            }
+                            await this._catchUpMessages(threadId);
                         } catch (reloadError) {
                             // Ignore reload errors - WebSocket should handle it
                             console.warn('Failed to reload messages after send:', reloadError);
@@ -1568,7 +1704,9 @@
         _connectThreadWebSocket(threadId) {
             if (this._ws) this._ws.close();
             const proto = location.protocol === 'https:' ? 'wss:' : 'ws:';
-            this._ws = new WebSocket(`${proto}//${location.host}/ws/threads/${threadId}/`);
+            this._ws = window.RealtimeHub
+                ? window.RealtimeHub.open(`thread:${threadId}`)
+                : new WebSocket(`${proto}//${location.host}/ws/threads/${threadId}/`);
             
             this._ws.onmessage = (e) => {
                 const data = JSON.parse(e.data);
@@ -1579,13 +1717,16 @@
                         msg.is_me = String(msg.sender_id) === String(window.currentUserId);
                     }
                     this._appendMessage(msg);
+                    if (!msg.is_me) this._scheduleMarkRead();
                 }
             };
         },
 
         _connectListWebSocket() {
             const proto = location.protocol === 'https:' ? 'wss:' : 'ws:';
-            this._listWs = new WebSocket(`${proto}//${location.host}/ws/thread-list/`);
+            this._listWs = window.RealtimeHub
+                ? window.RealtimeHub.open('threads')
+                : new WebSocket(`${proto}//${location.host}/ws/thread-list/`);
             this._listWs.onmessage = (e) => {
                 const data = JSON.parse(e.data);
                 if (data.type === 'thread_list_update') {
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Optional["RealtimeBatch"]] = contextvars.ContextVar("realtime_batch", default=None)
+
+
+class RealtimeBatch:
+    """
+    Channel-layer sends queued during a request/job and delivered together.
+
+    `flush()` does a single `async_to_sync` hop: messages for the same group are
+    sent in order, different groups are sent concurrently with `asyncio.gather`.
+    """
+
+    def __init__(self):
+        self._items: List[Tuple[str, Dict[str, Any]]] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, group: str, message: Dict[str, Any]) -> None:
+        self._items.append((group, message))
+
+    def flush(self) -> None:
+        items, self._items = self._items, []
+        send_many(items)
+
+
+def send_many(items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+    """
+    Deliver (group, message) pairs in one event-loop hop (best-effort).
+    """
+    by_group: Dict[str, List[Dict[str, Any]]] = {}
+    for group, message in items:
+        by_group.setdefault(group, []).append(message)
+    if not by_group:
+        return
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return
+
+    async def _send_group(group, messages):
+        for message in messages:
+            await channel_layer.group_send(group, message)
+
+    async def _send_all():
+        results = await asyncio.gather(
+            *(_send_group(group, messages) for group, messages in by_group.items()),
+            return_exceptions=True,
+        )
+        for group, result in zip(by_group, results):
+            if isinstance(result, Exception):
+                logger.warning("Realtime send to %s failed: %s", group, result)
+
+    async_to_sync(_send_all)()
+
+
+def current_batch() -> Optional[RealtimeBatch]:
+    return _current.get()
+
+
+@contextmanager
+def realtime_batch():
+    """
+    Queue every realtime send made inside the block and flush them together at the end.
+    Nested blocks join the outer batch.
+    """
+    if _current.get() is not None:
+        yield _current.get()
+        return
+    batch = RealtimeBatch()
+    token = _current.set(batch)
+    try:
+        yield batch
+    finally:
+        _current.reset(token)
+        batch.flush()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterable, Optional, Set
+
+from django.conf import settings
+from django.db import connection, transaction
+
+# Badge publishes requested while a scope is open (one HTTP request, one job, ...).
+_scope: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar("realtime_badge_scope", default=None)
+
+
+def _window_seconds() -> float:
+    return max(0, int(getattr(settings, "REALTIME_BADGE_COALESCE_MS", 250))) / 1000.0
+
+
+class BadgePublishCoalescer:
+    """
+    Collapses badge publishes for the same user into one recompute + one push.
+
+    - Inside a scope (see `badge_scope`), requests are de-duplicated and handed
+      over when the scope closes (request end).
+    - Requests made inside a transaction are only handed over on commit.
+    - Hand-over is throttled per user: the first publish in a window goes out
+      immediately, later ones inside the window collapse into a single trailing
+      publish when the window expires.
+    """
+
+    _MAX_TRACKED_USERS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_published = {}
+        self._pending: Set[str] = set()
+        self._timer: Optional[threading.Timer] = None
+
+    def request(self, user_id: Any) -> None:
+        if not user_id:
+            return
+        uid = str(user_id)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._collect(uid))
+        else:
+            self._collect(uid)
+
+    def _collect(self, uid: str) -> None:
+        scope = _scope.get()
+        if scope is not None:
+            scope.add(uid)
+        else:
+            self.submit([uid])
+
+    def submit(self, user_ids: Iterable[str]) -> None:
+        window = _window_seconds()
+        now = time.monotonic()
+        immediate = []
+        with self._lock:
+            for uid in user_ids:
+                if uid in self._pending:
+                    continue
+                last = self._last_published.get(uid)
+                if window <= 0 or last is None or now - last >= window:
+                    self._last_published[uid] = now
+                    immediate.append(uid)
+                else:
+                    self._pending.add(uid)
+            if self._pending and self._timer is None:
+                self._timer = threading.Timer(window, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+            if len(self._last_published) > self._MAX_TRACKED_USERS:
+                self._last_published = {
+                    k: v for k, v in self._last_published.items() if now - v < window
+                }
+        self._publish(immediate)
+
+    def flush(self) -> None:
+        """
+        Publish every pending (trailing) request now.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            timer, self._timer = self._timer, None
+            now = time.monotonic()
+            for uid in pending:
+                self._last_published[uid] = now
+        if timer is not None:
+            timer.cancel()
+        self._publish(pending)
+
+    def _on_timer(self) -> None:
+        try:
+            self.flush()
+        finally:
+            # Timer threads open their own DB connection; don't leak it.
+            connection.close()
+
+    @staticmethod
+    def _publish(user_ids: Iterable[str]) -> None:
+        from .services import publish_badges_now
+
+        for uid in user_ids:
+            try:
+                publish_badges_now(user_id=uid)
+            except Exception:
+                continue
+
+
+badge_coalescer = BadgePublishCoalescer()
+
+
+@contextmanager
+def badge_scope():
+    """
+    Collect badge publishes for the duration of the block and hand them over once at the end.
+    """
+    pending: Set[str] = set()
+    token = _scope.set(pending)
+    try:
+        yield pending
+    finally:
+        _scope.reset(token)
+        if pending:
+            badge_coalescer.submit(sorted(pending))
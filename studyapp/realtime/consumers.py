@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 from channels.db import database_sync_to_async
-from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
-from .services import get_badge_counts_for_user, user_group_name
+from .multiplex import StreamConsumer, StreamHandler
+from .services import ROLES, get_badge_counts_for_user_id, role_group_name, user_group_name
+from .streams import current_seqs, events_after, role_stream_key, user_stream_key
 
 
-class DashboardConsumer(AsyncJsonWebsocketConsumer):
+class DashboardStream(StreamHandler):
     """
     Centralized per-user dashboard event stream.
 
@@ -14,45 +15,86 @@ class DashboardConsumer(AsyncJsonWebsocketConsumer):
     - notification CRUD events
     - badge count updates
     - cross-app state-change events
+
+    Events carry `stream` ("user" or "role") and `seq`. `bootstrap` reports the
+    current seq of both streams (and `user_id`/`muted_notification_types`, to
+    skip role broadcasts that are not in this user's feed); after a reconnect the client sends
+    `{"type": "resume", "last_seq": .., "last_role_seq": ..}` and gets the missed
+    events replayed, or `{"type": "resync"}` if they are no longer buffered.
     """
 
-    async def connect(self):
-        user = self.scope.get("user")
-        if not user or user.is_anonymous:
-            await self.close(code=4401)
-            return
+    event_types = frozenset({"dashboard.event"})
 
-        self.user = user
-        self.group = user_group_name(user.id)
-        await self.channel_layer.group_add(self.group, self.channel_name)
-        await self.accept()
+    async def open(self):
+        user = self.user
+        if not user or user.is_anonymous:
+            self.close_code = 4401
+            return False
 
-        badges = await self._get_badges()
-        await self.send_json({"type": "bootstrap", "badges": badges})
+        await self.group_add(user_group_name(user.id))
+        # Role-wide broadcasts (publish_to_role) use one group per role.
+        self.streams = {"user": user_stream_key(user.id)}
+        if user.role in ROLES:
+            await self.group_add(role_group_name(user.role))
+            self.streams["role"] = role_stream_key(user.role)
+        return True
 
-    async def disconnect(self, code):
-        try:
-            if getattr(self, "group", None):
-                await self.channel_layer.group_discard(self.group, self.channel_name)
-        except Exception:
-            return
+    async def opened(self):
+        # Read after joining the groups: anything newer arrives live (clients drop dupes by seq).
+        badges, seqs, live = await self._get_bootstrap()
+        await self.send_json({"type": "bootstrap", "badges": badges, "seq": seqs, **live})
 
-    async def receive_json(self, content, **kwargs):
+    async def receive_json(self, content):
         # Keepalive / client pings (best-effort)
         if content.get("type") == "ping":
             await self.send_json({"type": "pong"})
+        elif content.get("type") == "resume":
+            await self._resume(content)
 
     async def dashboard_event(self, event):
-        await self.send_json(
-            {
-                "type": "event",
-                "event": event.get("event"),
-                "data": event.get("data") or {},
-            }
-        )
+        await self.send_json(self._event_frame(event))
+
+    @staticmethod
+    def _event_frame(event):
+        frame = {
+            "type": "event",
+            "event": event.get("event"),
+            "data": event.get("data") or {},
+        }
+        if event.get("seq") is not None:
+            frame["stream"] = event.get("stream")
+            frame["seq"] = event.get("seq")
+        return frame
+
+    async def _resume(self, content):
+        cursors = {"user": content.get("last_seq"), "role": content.get("last_role_seq")}
+        for stream, key in self.streams.items():
+            try:
+                last_seq = int(cursors[stream])
+            except (TypeError, ValueError):
+                continue
+            events = await self._events_after(key, last_seq)
+            if events is None:
+                badges, seqs, live = await self._get_bootstrap()
+                await self.send_json({"type": "resync", "badges": badges, "seq": seqs, **live})
+                return
+            for e in events:
+                await self.send_json(self._event_frame({**e, "stream": stream}))
+        await self.send_json({"type": "resumed"})
+
+    @database_sync_to_async
+    def _get_bootstrap(self):
+        from notifications.broadcasts import live_filter
+
+        badges = get_badge_counts_for_user_id(self.user.id)
+        seqs = current_seqs(list(self.streams.values()))
+        return badges, {stream: seqs[key] for stream, key in self.streams.items()}, live_filter(self.user.id)
 
     @database_sync_to_async
-    def _get_badges(self):
-        return get_badge_counts_for_user(self.user)
+    def _events_after(self, key, last_seq):
+        return events_after(key, last_seq)
 
 
+class DashboardConsumer(StreamConsumer):
+    handler_class = DashboardStream
+    stream_name = "dashboard"
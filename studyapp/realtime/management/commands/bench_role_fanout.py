@@ -0,0 +1,72 @@
+"""
+Benchmark: per-user fanout vs. role-group fanout on the in-memory channel layer.
+Usage: python manage.py bench_role_fanout [--users 10000] [--rounds 1]
+
+Simulates N connected dashboards (no DB rows) and compares:
+- old: one async_to_sync(group_send) per user group (previous publish_to_role)
+- new: one group_send to the role group
+
+Note: the in-memory layer scans every channel on each group_send, so the
+per-user path is quadratic here; on Redis it is one network round-trip per user.
+"""
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from realtime.services import role_group_name, user_group_name
+
+
+class Command(BaseCommand):
+    help = 'Compares per-user and role-group dashboard fanout cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--rounds', type=int, default=1)
+
+    def handle(self, *args, **options):
+        users = max(1, options['users'])
+        rounds = max(1, options['rounds'])
+        layer = InMemoryChannelLayer(expiry=600, group_expiry=86400, capacity=rounds * 2 + 10)
+        role_group = role_group_name('STUDENT')
+        message = {'type': 'dashboard.event', 'event': 'bench.ping', 'data': {}}
+
+        async def connect_all():
+            channels = []
+            for i in range(users):
+                channel = await layer.new_channel()
+                await layer.group_add(user_group_name(f'bench-{i}'), channel)
+                await layer.group_add(role_group, channel)
+                channels.append(channel)
+            return channels
+
+        channels = async_to_sync(connect_all)()
+
+        def old_fanout():
+            for i in range(users):
+                async_to_sync(layer.group_send)(user_group_name(f'bench-{i}'), message)
+
+        def new_fanout():
+            async_to_sync(layer.group_send)(role_group, message)
+
+        results = {}
+        for label, fn in (('per-user', old_fanout), ('role-group', new_fanout)):
+            timings = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            results[label] = min(timings)
+
+        # Every simulated dashboard must have received one message per round per strategy.
+        delivered = sum(layer.channels[c].qsize() for c in channels if c in layer.channels)
+        expected = users * rounds * 2
+        async_to_sync(layer.flush)()
+
+        old, new = results['per-user'], results['role-group']
+        self.stdout.write(f'Simulated users: {users} (best of {rounds} rounds)')
+        self.stdout.write(f'  per-user fanout:   {old * 1000:10.1f} ms  ({old / users * 1e6:.1f} µs/user)')
+        self.stdout.write(f'  role-group fanout: {new * 1000:10.1f} ms  ({new / users * 1e6:.1f} µs/user)')
+        self.stdout.write(f'  delivered {delivered}/{expected} messages')
+        self.stdout.write(self.style.SUCCESS(f'✓ Role-group fanout is {old / new:.1f}x faster'))
@@ -0,0 +1,72 @@
+"""
+Management command to repair drift in the incremental badge counters.
+Usage: python manage.py reconcile_badges [--user <uuid>] [--seed-missing] [--publish]
+
+Run it periodically (e.g. every few minutes from cron). Each counter row is
+recomputed from the source tables and rewritten only if it differs.
+"""
+from django.core.management.base import BaseCommand
+
+from account.models import User
+from realtime.models import BadgeCounter
+from realtime.services import BADGE_FIELDS, get_badge_counts_for_user, get_badge_counts_for_user_id, publish_to_user
+
+
+class Command(BaseCommand):
+    help = 'Recomputes per-user badge counters and fixes any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', dest='user_id', help='Only reconcile this user id')
+        parser.add_argument(
+            '--seed-missing',
+            action='store_true',
+            help='Also create counter rows for active users that do not have one yet',
+        )
+        parser.add_argument(
+            '--publish',
+            action='store_true',
+            help='Push corrected badges to connected dashboards',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user_id']:
+            users = users.filter(id=options['user_id'])
+        elif options['seed_missing']:
+            users = users.filter(is_active=True) | users.filter(badge_counter__isnull=False)
+        else:
+            users = users.filter(badge_counter__isnull=False)
+
+        existing = {
+            str(row['user_id']): row
+            for row in BadgeCounter.objects.values('user_id', *BADGE_FIELDS).iterator()
+        }
+
+        checked = fixed = created = 0
+        for user in users.distinct().order_by('id').iterator(chunk_size=options['batch_size']):
+            checked += 1
+            counts = get_badge_counts_for_user(user)
+            current = existing.get(str(user.id))
+            if current is None:
+                BadgeCounter.objects.create(user=user, **counts)
+                created += 1
+            elif any(int(current[f]) != counts[f] for f in BADGE_FIELDS):
+                BadgeCounter.objects.filter(user=user).update(**counts)
+                fixed += 1
+            else:
+                continue
+
+            if options['publish']:
+                try:
+                    publish_to_user(
+                        user_id=user.id, event='badges.updated', data={'badges': get_badge_counts_for_user_id(user.id)}
+                    )
+                except Exception:
+                    pass
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Checked {checked} users: {fixed} counters corrected, {created} created'
+            )
+        )
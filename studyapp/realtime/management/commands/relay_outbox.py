@@ -0,0 +1,51 @@
+"""
+Management command that relays realtime outbox events to the channel layer.
+Usage: python manage.py relay_outbox [--once] [--batch-size 200] [--interval 0.5] [--shard 0/1]
+
+Run it as a long-lived worker when REALTIME_OUTBOX_RELAY=command (e.g. with
+several web processes sharing a Redis channel layer). `--shard k/n` splits the
+outbox between n relays; each group's events always land on the same shard,
+so per-user ordering is kept.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from realtime.outbox import drain_all
+
+
+class Command(BaseCommand):
+    help = 'Delivers committed realtime outbox events to the channel layer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain what is due and exit')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--interval', type=float, default=0.5, help='Seconds to sleep when idle')
+        parser.add_argument('--shard', default='0/1', help='Shard of the outbox to relay, as k/n')
+
+    def handle(self, *args, **options):
+        try:
+            shard, shards = (int(x) for x in options['shard'].split('/'))
+        except ValueError:
+            raise CommandError('--shard must look like k/n, e.g. 0/2')
+        if shards < 1 or not 0 <= shard < shards:
+            raise CommandError('--shard must satisfy 0 <= k < n')
+
+        kwargs = {'batch_size': options['batch_size'], 'shard': shard, 'shards': shards}
+        if options['once']:
+            delivered, failed, _ = drain_all(**kwargs)
+            self.stdout.write(self.style.SUCCESS(f'✓ Relayed {delivered} events ({failed} failed, will retry)'))
+            return
+
+        self.stdout.write(f'Relaying outbox shard {shard}/{shards} (Ctrl+C to stop)...')
+        try:
+            while True:
+                close_old_connections()
+                delivered, failed, _ = drain_all(**kwargs)
+                if delivered or failed:
+                    self.stdout.write(f'Relayed {delivered} events ({failed} failed)')
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
@@ -0,0 +1,21 @@
+from .batch import realtime_batch
+from .coalescer import badge_scope
+
+
+class RealtimeFlushMiddleware:
+    """
+    Per-request realtime scope, flushed once the response is ready.
+
+    - Every `publish_badges` call made while handling the request (including ones
+      deferred to transaction commit) collapses into one push per user.
+    - Every channel-layer send goes into one `RealtimeBatch`, delivered in a
+      single async task after the view (and its transactions) finished.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with realtime_batch():
+            with badge_scope():
+                return self.get_response(request)
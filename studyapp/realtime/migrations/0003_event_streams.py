@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realtime', '0002_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventStream',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('last_seq', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'realtime_event_streams',
+            },
+        ),
+        migrations.CreateModel(
+            name='StreamEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stream_key', models.CharField(max_length=64)),
+                ('seq', models.BigIntegerField()),
+                ('event', models.CharField(max_length=100)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'realtime_stream_events',
+                'constraints': [models.UniqueConstraint(fields=('stream_key', 'seq'), name='rt_stream_event_seq_uniq')],
+            },
+        ),
+    ]
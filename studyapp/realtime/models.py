@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class BadgeCounter(models.Model):
+    """
+    Per-user badge counters shown in the dashboard sidebars/headers.
+
+    Write paths (messages, discussion threads, notifications, meetings) adjust
+    these incrementally so publishing badges is a single-row read. Rows are
+    seeded lazily from a full recompute the first time a user's badges are read,
+    and `manage.py reconcile_badges` periodically repairs any drift.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="badge_counter",
+    )
+    notifications_unread = models.IntegerField(default=0)
+    messages_unread = models.IntegerField(default=0)
+    threads_unread = models.IntegerField(default=0)
+    meetings_active = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "realtime_badge_counters"
+
+    def __str__(self) -> str:
+        return f"Badges for {self.user_id}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A channel-layer message written in the same transaction as the data it
+    announces (see `realtime.services.send_to_group`).
+
+    Rows become visible to the relay only once that transaction commits; the
+    relay (`realtime.outbox`) claims a batch, delivers it in id order per group
+    outside any transaction, retrying with backoff, and deletes rows once sent.
+    """
+
+    group = models.CharField(max_length=100)
+    message = models.JSONField()
+    # Stable hash slot of `group`, so several relays can split the table without
+    # reordering a group's events.
+    shard = models.PositiveSmallIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    # Lease of the relay currently sending this row; other relays leave it (and
+    # the rest of its group) alone until it is settled or the lease runs out.
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "realtime_outbox_events"
+        indexes = [
+            models.Index(fields=["available_at", "id"], name="rt_outbox_available_idx"),
+            models.Index(fields=["group", "id"], name="rt_outbox_group_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Outbox #{self.id} -> {self.group}"
+
+
+class EventStream(models.Model):
+    """
+    Sequence counter of a dashboard event stream ("user:<id>" or "role:<ROLE>").
+    """
+
+    key = models.CharField(max_length=64, primary_key=True)
+    last_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "realtime_event_streams"
+
+    def __str__(self) -> str:
+        return f"{self.key} @ {self.last_seq}"
+
+
+class StreamEvent(models.Model):
+    """
+    Recent events of a stream, kept so a reconnecting dashboard can replay what
+    it missed. Bounded per stream (see `realtime.streams`); older rows are trimmed.
+    """
+
+    stream_key = models.CharField(max_length=64)
+    seq = models.BigIntegerField()
+    event = models.CharField(max_length=100)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "realtime_stream_events"
+        constraints = [
+            models.UniqueConstraint(fields=["stream_key", "seq"], name="rt_stream_event_seq_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.stream_key}#{self.seq} {self.event}"
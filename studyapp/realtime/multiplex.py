@@ -0,0 +1,272 @@
+"""
+Logical WebSocket streams and the consumers that carry them.
+
+A `StreamHandler` holds the per-stream logic (permission check, group
+subscriptions, client frames, channel-layer events). It runs either alone on a
+dedicated socket (`StreamConsumer`, e.g. `/ws/dashboard/`) or next to other
+streams on one multiplexed socket (`HubConsumer`, `/ws/hub/`).
+
+Hub protocol (JSON frames):
+- client -> server: `{"type": "subscribe", "stream": "thread:<id>"}`,
+  `{"type": "unsubscribe", "stream": ...}`, `{"stream": ..., "data": {...}}`
+  (a frame for that stream), `{"type": "ping"}`
+- server -> client: `{"type": "subscribed"|"unsubscribed", "stream": ...}`,
+  `{"stream": ..., "data": {...}}` (the frame the dedicated socket would send)
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Optional
+
+from channels.consumer import get_handler_name
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Stream name (or "<prefix>:" for parametrised streams) -> handler class path.
+STREAM_HANDLERS = {
+    "dashboard": "realtime.consumers.DashboardStream",
+    "dm": "messages.consumers.DirectMessagesStream",
+    "threads": "thread.consumers.ThreadListStream",
+    "thread:": "thread.consumers.ThreadStream",
+}
+
+
+class StreamHandler:
+    """
+    Base class for one logical stream.
+
+    - `open()` checks access and joins groups; return False (optionally
+      setting `close_code`) to refuse.
+    - `opened()` runs once the client can receive (bootstrap frames etc.).
+    - `receive_json()` gets client frames, `send_json()` sends frames.
+    - Channel-layer events are routed here if their raw type is in
+      `event_types` and `accepts()` agrees; they're handled by the method named
+      like the type (dots replaced by underscores), as in a Channels consumer.
+    """
+
+    event_types: frozenset = frozenset()
+    close_code: Optional[int] = None
+
+    def __init__(self, conn: "_StreamHost", name: str, param: Optional[str] = None):
+        self.conn = conn
+        self.name = name
+        self.param = param
+        self._joined = []
+        self.user = conn.scope.get("user")
+        self.channel_layer = conn.channel_layer
+        self.channel_name = conn.channel_name
+        self.scope = conn.scope
+
+    async def open(self) -> bool:
+        return True
+
+    async def opened(self) -> None:
+        return None
+
+    async def close_stream(self) -> None:
+        return None
+
+    async def receive_json(self, content: Dict[str, Any]) -> None:
+        return None
+
+    async def send_json(self, content: Dict[str, Any]) -> None:
+        await self.conn.stream_send(self, content)
+
+    async def close(self, code: Optional[int] = None) -> None:
+        await self.conn.stream_close(self, code)
+
+    async def group_add(self, group: str) -> None:
+        if group not in self._joined:
+            self._joined.append(group)
+            await self.conn.join_group(group)
+
+    async def group_discard(self, group: str) -> None:
+        if group in self._joined:
+            self._joined.remove(group)
+            await self.conn.leave_group(group)
+
+    async def teardown(self) -> None:
+        """
+        Run `close_stream()` and leave every group this stream joined.
+        """
+        try:
+            await self.close_stream()
+        finally:
+            for group in list(self._joined):
+                try:
+                    await self.group_discard(group)
+                except Exception:
+                    continue
+
+    def accepts(self, message: Dict[str, Any]) -> bool:
+        return message.get("type") in self.event_types
+
+    async def dispatch(self, message: Dict[str, Any]) -> None:
+        handler = getattr(self, get_handler_name(message), None)
+        if handler:
+            await handler(message)
+
+
+class _StreamHost(AsyncJsonWebsocketConsumer):
+    """
+    Shared plumbing: reference-counted group membership, so two streams on the
+    same socket can share a group.
+    """
+
+    def _groups(self) -> Dict[str, int]:
+        if not hasattr(self, "_group_refs"):
+            self._group_refs = {}
+        return self._group_refs
+
+    async def join_group(self, group: str) -> None:
+        refs = self._groups()
+        if not refs.get(group):
+            await self.channel_layer.group_add(group, self.channel_name)
+        refs[group] = refs.get(group, 0) + 1
+
+    async def leave_group(self, group: str) -> None:
+        refs = self._groups()
+        n = refs.get(group, 0)
+        if n <= 1:
+            refs.pop(group, None)
+            if n:
+                await self.channel_layer.group_discard(group, self.channel_name)
+        else:
+            refs[group] = n - 1
+
+
+class StreamConsumer(_StreamHost):
+    """
+    Dedicated socket for a single stream (the pre-hub endpoints).
+    """
+
+    handler_class = StreamHandler
+    stream_name = ""
+
+    async def connect(self):
+        param = (self.scope.get("url_route") or {}).get("kwargs", {}).get("thread_id")
+        handler = self.handler_class(self, self.stream_name, param)
+        if not await handler.open():
+            await handler.teardown()
+            await self.close(code=handler.close_code)
+            return
+        self.handler = handler
+        await self.accept()
+        await handler.opened()
+
+    async def disconnect(self, code):
+        handler = getattr(self, "handler", None)
+        if handler:
+            await handler.teardown()
+
+    async def receive_json(self, content, **kwargs):
+        handler = getattr(self, "handler", None)
+        if handler:
+            await handler.receive_json(content)
+
+    async def dispatch(self, message):
+        if message["type"].startswith("websocket."):
+            return await super().dispatch(message)
+        handler = getattr(self, "handler", None)
+        if handler:
+            await handler.dispatch(message)
+
+    async def stream_send(self, handler, content):
+        await self.send_json(content)
+
+    async def stream_close(self, handler, code=None):
+        await self.close(code=code)
+
+
+def _handler_class_for(stream: str):
+    if stream in STREAM_HANDLERS and not stream.endswith(":"):
+        return import_string(STREAM_HANDLERS[stream]), None
+    prefix, sep, param = stream.partition(":")
+    if sep and param and f"{prefix}:" in STREAM_HANDLERS:
+        return import_string(STREAM_HANDLERS[f"{prefix}:"]), param
+    return None, None
+
+
+class HubConsumer(_StreamHost):
+    """
+    One socket per tab carrying any number of named streams (`/ws/hub/`).
+
+    Authentication happens once for the socket; each stream does its own
+    permission check on subscribe.
+    """
+
+    MAX_STREAMS = 32
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or user.is_anonymous:
+            await self.close(code=4401)
+            return
+        self.streams: Dict[str, StreamHandler] = {}
+        await self.accept()
+
+    async def disconnect(self, code):
+        for handler in list(getattr(self, "streams", {}).values()):
+            try:
+                await handler.teardown()
+            except Exception:
+                logger.debug("Closing stream %s failed", handler.name, exc_info=True)
+
+    async def receive_json(self, content, **kwargs):
+        frame_type = content.get("type")
+        stream = str(content.get("stream") or "")
+        if frame_type == "ping":
+            await self.send_json({"type": "pong"})
+        elif frame_type == "subscribe":
+            await self._subscribe(stream)
+        elif frame_type == "unsubscribe":
+            await self._unsubscribe(stream, reason="client")
+        elif stream in self.streams and isinstance(content.get("data"), dict):
+            await self.streams[stream].receive_json(content["data"])
+
+    async def _subscribe(self, stream: str):
+        if stream in self.streams:
+            await self.send_json({"type": "subscribed", "stream": stream})
+            return
+        handler_class, param = _handler_class_for(stream)
+        if handler_class is None or len(self.streams) >= self.MAX_STREAMS:
+            await self.send_json({"type": "unsubscribed", "stream": stream, "reason": "unknown_stream"})
+            return
+        handler = handler_class(self, stream, param)
+        if not await handler.open():
+            await handler.teardown()
+            await self.send_json({"type": "unsubscribed", "stream": stream, "reason": "forbidden"})
+            return
+        self.streams[stream] = handler
+        await self.send_json({"type": "subscribed", "stream": stream})
+        await handler.opened()
+
+    async def _unsubscribe(self, stream: str, *, reason: str, code: Optional[int] = None):
+        handler = self.streams.pop(stream, None)
+        if not handler:
+            return
+        try:
+            await handler.teardown()
+        except Exception:
+            logger.debug("Closing stream %s failed", stream, exc_info=True)
+        frame = {"type": "unsubscribed", "stream": stream, "reason": reason}
+        if code is not None:
+            frame["code"] = code
+        await self.send_json(frame)
+
+    async def dispatch(self, message):
+        if message["type"].startswith("websocket."):
+            return await super().dispatch(message)
+        for handler in list(getattr(self, "streams", {}).values()):
+            if handler.accepts(message):
+                await handler.dispatch(message)
+
+    async def stream_send(self, handler, content):
+        if self.streams.get(handler.name) is handler:
+            await self.send_json({"stream": handler.name, "data": content})
+
+    async def stream_close(self, handler, code=None):
+        if self.streams.get(handler.name) is handler:
+            await self._unsubscribe(handler.name, reason="closed", code=code)
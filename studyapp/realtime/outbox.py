@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import zlib
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .models import OutboxEvent
+from .streams import PENDING_KEY, number_messages
+
+logger = logging.getLogger(__name__)
+
+SHARD_SLOTS = 64
+MAX_ATTEMPTS = 8
+IDLE_POLL_SECONDS = 5.0
+# How soon to look again when rows were held back by another relay's claim.
+BUSY_RETRY_SECONDS = 0.1
+# How long a claimed batch is reserved for its relay; a relay that dies
+# mid-send has its rows picked up again after this (at-least-once delivery).
+CLAIM_LEASE = timedelta(seconds=60)
+
+
+def shard_for(group: str) -> int:
+    return zlib.crc32(group.encode("utf-8")) % SHARD_SLOTS
+
+
+def relay_mode() -> str:
+    """
+    "inprocess" (default): a background thread in each web process drains the
+    outbox right after commits. "command": only `manage.py relay_outbox` does.
+    """
+    return str(getattr(settings, "REALTIME_OUTBOX_RELAY", "inprocess") or "inprocess").lower()
+
+
+def enqueue(items: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+    """
+    Write (group, message) pairs to the outbox in the current transaction and
+    wake the relay once it commits.
+    """
+    rows = [OutboxEvent(group=group, message=message, shard=shard_for(group)) for group, message in items]
+    if not rows:
+        return 0
+    OutboxEvent.objects.bulk_create(rows, batch_size=500)
+    transaction.on_commit(outbox_relay.kick)
+    return len(rows)
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(2 ** attempts, 300))
+
+
+def _deliver(by_group: Dict[str, List[OutboxEvent]]) -> Tuple[List[int], Dict[int, str]]:
+    """
+    Send each group's rows in order (groups concurrently). A failure stops that
+    group so later events are not delivered ahead of the failed one.
+    """
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return [], {}
+    delivered: List[int] = []
+    failed: Dict[int, str] = {}
+
+    async def _send_group(rows):
+        for row in rows:
+            try:
+                await channel_layer.group_send(row.group, row.message)
+            except Exception as exc:
+                failed[row.id] = str(exc) or exc.__class__.__name__
+                return
+            delivered.append(row.id)
+
+    async def _send_all():
+        await asyncio.gather(*(_send_group(rows) for rows in by_group.values()))
+
+    async_to_sync(_send_all)()
+    return delivered, failed
+
+
+class DrainResult(NamedTuple):
+    delivered: int
+    failed: int
+    # Due rows held back because another relay is sending their group.
+    waiting: int
+
+
+def _claim(now, batch_size: int, shard: int, shards: int) -> Tuple[Dict[str, List[OutboxEvent]], int]:
+    """
+    Lease the next batch to this relay and commit, so nothing is locked while
+    it sends. Returns the claimed rows by group, and how many due rows had to
+    wait for another relay.
+    """
+    with transaction.atomic():
+        qs = OutboxEvent.objects.filter(available_at__lte=now).filter(
+            Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+        )
+        if shards > 1:
+            qs = qs.filter(shard__in=[s for s in range(SHARD_SLOTS) if s % shards == shard])
+        # Rows another relay is claiming right now are skipped, not waited for.
+        rows = list(qs.select_for_update(skip_locked=True).order_by("id")[:batch_size])
+        if not rows:
+            return {}, 0
+
+        # A group is only sent if its oldest outstanding row is in this batch;
+        # otherwise an earlier event is waiting for a retry or is being sent by
+        # another relay, and must go first.
+        first_ids = dict(
+            OutboxEvent.objects.filter(group__in={r.group for r in rows})
+            .values("group")
+            .annotate(first=Min("id"))
+            .values_list("group", "first")
+        )
+        by_group: Dict[str, List[OutboxEvent]] = {}
+        for row in rows:
+            if row.group in by_group or first_ids.get(row.group) == row.id:
+                by_group.setdefault(row.group, []).append(row)
+        claimed = [row for group_rows in by_group.values() for row in group_rows]
+        OutboxEvent.objects.filter(id__in=[row.id for row in claimed]).update(claimed_until=now + CLAIM_LEASE)
+
+        # Dashboard events get their stream seq here, in claim order, and keep
+        # it if they have to be retried.
+        pending = [row for row in sorted(claimed, key=lambda r: r.id) if PENDING_KEY in row.message]
+        if pending:
+            number_messages([row.message for row in pending])
+            OutboxEvent.objects.bulk_update(pending, ["message"], batch_size=500)
+
+        # A blocked group whose head is already due is held by another relay
+        # (a head waiting out its retry backoff is not).
+        blocked = {row.group for row in rows if row.group not in by_group}
+        held = set(
+            OutboxEvent.objects.filter(id__in=[first_ids[g] for g in blocked], available_at__lte=now)
+            .values_list("group", flat=True)
+        ) if blocked else set()
+    return by_group, sum(1 for row in rows if row.group in held)
+
+
+def _settle(by_group: Dict[str, List[OutboxEvent]], delivered: List[int], failed: Dict[int, str], now) -> None:
+    """
+    Delete what was sent, schedule retries for failures and release the rest
+    of the claim (rows after a failure in their group).
+    """
+    with transaction.atomic():
+        if delivered:
+            OutboxEvent.objects.filter(id__in=delivered).delete()
+        for row in (r for rows_ in by_group.values() for r in rows_ if r.id in failed):
+            attempts = row.attempts + 1
+            if attempts >= MAX_ATTEMPTS:
+                logger.error("Dropping outbox event %s for %s after %s attempts: %s", row.id, row.group, attempts, failed[row.id])
+                OutboxEvent.objects.filter(id=row.id).delete()
+                continue
+            OutboxEvent.objects.filter(id=row.id).update(
+                attempts=attempts,
+                available_at=now + _backoff(attempts),
+                last_error=failed[row.id][:1000],
+                claimed_until=None,
+            )
+        sent = set(delivered)
+        unsent = [r.id for rows_ in by_group.values() for r in rows_ if r.id not in failed and r.id not in sent]
+        if unsent:
+            OutboxEvent.objects.filter(id__in=unsent).update(claimed_until=None)
+
+
+def drain(*, batch_size: int = 200, shard: int = 0, shards: int = 1) -> DrainResult:
+    """
+    Deliver one batch of due outbox rows: claim them (one short transaction),
+    send them with no transaction open, then record the outcome.
+    """
+    now = timezone.now()
+    by_group, waiting = _claim(now, batch_size, shard, shards)
+    if not by_group:
+        return DrainResult(0, 0, waiting)
+    delivered, failed = [], {}
+    try:
+        delivered, failed = _deliver(by_group)
+    finally:
+        _settle(by_group, delivered, failed, now)
+    return DrainResult(len(delivered), len(failed), waiting)
+
+
+def drain_all(*, batch_size: int = 200, shard: int = 0, shards: int = 1) -> DrainResult:
+    """
+    Drain until no due rows are left (or only blocked/failing ones are).
+    `waiting` is from the last pass: rows another relay still had claimed.
+    """
+    total_delivered = total_failed = 0
+    while True:
+        delivered, failed, waiting = drain(batch_size=batch_size, shard=shard, shards=shards)
+        total_delivered += delivered
+        total_failed += failed
+        if not delivered:
+            return DrainResult(total_delivered, total_failed, waiting)
+
+
+class OutboxRelay:
+    """
+    In-process relay: a daemon thread woken on commit (and every few seconds for
+    retries, sooner while another relay holds rows back) that drains the outbox.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def kick(self) -> None:
+        if relay_mode() != "inprocess":
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="realtime-outbox-relay", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        timeout, retry = IDLE_POLL_SECONDS, BUSY_RETRY_SECONDS
+        while True:
+            self._wake.wait(timeout=timeout)
+            self._wake.clear()
+            timeout = IDLE_POLL_SECONDS
+            try:
+                # Rows held back by another relay go soon after it is done, not
+                # on the next idle poll; the re-check backs off while it lasts.
+                if drain_all().waiting:
+                    timeout, retry = retry, min(retry * 2, IDLE_POLL_SECONDS)
+                else:
+                    retry = BUSY_RETRY_SECONDS
+            except Exception:
+                logger.exception("Outbox relay failed")
+            finally:
+                connection.close()
+
+
+outbox_relay = OutboxRelay()
@@ -1,9 +1,10 @@
 from django.urls import re_path
 
 from .consumers import DashboardConsumer
+from .multiplex import HubConsumer
 
 websocket_urlpatterns = [
     re_path(r"^ws/dashboard/$", DashboardConsumer.as_asgi()),
+    # One multiplexed socket per tab carrying dashboard/dm/threads/thread:<id> streams.
+    re_path(r"^ws/hub/$", HubConsumer.as_asgi()),
 ]
-
-
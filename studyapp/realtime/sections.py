@@ -0,0 +1,97 @@
+"""
+Section invalidation for the server-rendered dashboard sections.
+
+Each dashboard section (`<role>_section_view` in account/views.py) declares the
+entity types its template is rendered from. Write paths call
+`invalidate_sections(entity, ...)` and every affected user gets one
+`section.invalidated` event listing the sections to refetch; clients re-render
+only those (the visible one right away, others on next open).
+
+Sections whose data is loaded client-side (messages, threads, notifications,
+invoice tables) are kept live by their own events and are not listed here.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.contrib.auth import get_user_model
+
+SECTION_DEPENDENCIES: Dict[str, Dict[str, set]] = {
+    "STUDENT": {
+        "dashboard": {"assignment", "meeting"},
+        "tracker": {"assignment"},
+        "tutors": {"assignment"},
+        "meetings": {"meeting", "assignment"},
+        "onlineExams": {"exam"},
+        "homework": {"homework"},
+        "announcements": {"announcement"},
+    },
+    "TEACHER": {
+        "dashboard": {"assignment"},
+        "my_assignments": {"assignment"},
+        "student_management": {"assignment", "student"},
+        "meetings": {"meeting", "assignment"},
+        "online_exam": {"exam", "assignment"},
+        "homework": {"homework"},
+        "announcements": {"announcement"},
+        "feedback": {"feedback"},
+    },
+    "CS_REP": {
+        "overview": {"assignment", "invoice", "student", "teacher"},
+        "announcements": {"announcement"},
+    },
+    "ADMIN": {
+        "dashboard": {"assignment", "invoice", "student", "teacher"},
+        "students": {"student", "assignment"},
+        "assignment-requests": {"assignment", "teacher"},
+        "user-management": {"student", "teacher", "csrep"},
+        "content-review": {"assignment", "exam", "homework"},
+        "announcements": {"announcement"},
+        "feedback-reports": {"feedback"},
+        "meetings-record": {"meeting"},
+        "visitors": {"visitor"},
+    },
+}
+
+
+def sections_for(role: str, entity: str) -> List[str]:
+    return sorted(
+        section
+        for section, entities in SECTION_DEPENDENCIES.get(role, {}).items()
+        if entity in entities
+    )
+
+
+def invalidate_sections(
+    entity: str,
+    *,
+    user_ids: Iterable[Any] = (),
+    roles: Iterable[str] = (),
+    data: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Tell affected dashboards that sections depending on `entity` are stale.
+
+    `roles` go out as one role-group event each; `user_ids` are looked up to
+    pick their role's sections (users already covered by `roles` are skipped).
+    `data` (ids, action, ...) rides along for client-side listeners.
+    """
+    from .services import publish_many, publish_to_role
+
+    payload = dict(data or {})
+    roles = {r for r in roles if r in SECTION_DEPENDENCIES}
+    for role in sorted(roles):
+        sections = sections_for(role, entity)
+        if sections:
+            publish_to_role(role=role, event="section.invalidated", data={**payload, "entity": entity, "sections": sections})
+
+    ids = {str(uid) for uid in user_ids if uid}
+    if not ids:
+        return
+    User = get_user_model()
+    events = []
+    for uid, role in User.objects.filter(id__in=ids).exclude(role__in=roles).values_list("id", "role"):
+        sections = sections_for(role, entity)
+        if sections:
+            events.append((uid, "section.invalidated", {**payload, "entity": entity, "sections": sections}))
+    publish_many(events)
@@ -1,17 +1,55 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional, Tuple
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
 from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
-from django.db.models.functions import Coalesce
+from django.db.models.functions import Coalesce, Greatest
+
+from .batch import current_batch, send_many
+from .streams import EPHEMERAL_EVENTS, PENDING_KEY, number_messages, role_stream_key, user_stream_key
 
 User = get_user_model()
 
 
+def send_to_group(group: str, message: Dict[str, Any]) -> None:
+    """
+    Send a raw channel-layer message to a group from sync Django code.
+
+    - Inside a transaction, the message is written to the outbox
+      (`realtime.outbox`) and relayed only after commit (dropped on rollback);
+      dashboard events are numbered by the relay.
+    - Inside a `realtime_batch()` (every HTTP request, see RealtimeFlushMiddleware),
+      it is queued and delivered with the rest of the batch.
+    - Otherwise it is sent immediately.
+    """
+    send_to_groups([(group, message)])
+
+
+def send_to_groups(items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+    """
+    `send_to_group` for many (group, message) pairs; one outbox insert inside a transaction.
+    """
+    items = list(items)
+    if not items:
+        return
+    if connection.in_atomic_block:
+        from .outbox import enqueue
+
+        enqueue(items)
+        return
+    number_messages([message for _, message in items])
+    batch = current_batch()
+    if batch is not None:
+        for group, message in items:
+            batch.add(group, message)
+    else:
+        send_many(items)
+
+
 def publish_to_users(*, user_ids, event: str, data: Optional[Dict[str, Any]] = None) -> None:
     """
     Publish a dashboard event to many users (best-effort).
@@ -25,17 +63,20 @@ def publish_to_users(*, user_ids, event: str, data: Optional[Dict[str, Any]] = N
             continue
 
 
-def publish_to_role(*, role: str, event: str, data: Optional[Dict[str, Any]] = None) -> int:
+ROLES = {"STUDENT", "TEACHER", "CS_REP", "ADMIN"}
+
+
+def publish_to_role(*, role: str, event: str, data: Optional[Dict[str, Any]] = None) -> None:
     """
-    Publish a dashboard event to all active users of a role.
-    Returns recipient count.
+    Publish a dashboard event to every connected dashboard of a role.
+
+    One `group_send` to the role group joined by `DashboardConsumer`; no user
+    table scan. Only logged-in (hence active) users have a dashboard socket.
     """
     r = (role or "").strip().upper()
-    if r not in {"STUDENT", "TEACHER", "CS_REP", "ADMIN"}:
-        return 0
-    ids = list(User.objects.filter(role=r, is_active=True).values_list("id", flat=True))
-    publish_to_users(user_ids=ids, event=event, data=data)
-    return len(ids)
+    if r not in ROLES:
+        return
+    send_to_group(role_group_name(r), _dashboard_message(event, data or {}, role_stream_key(r)))
 
 
 def user_group_name(user_id: Any) -> str:
@@ -43,27 +84,60 @@ def user_group_name(user_id: Any) -> str:
     return f"dashboard_user_{user_id}"
 
 
+def role_group_name(role: str) -> str:
+    return f"dashboard_role_{role}"
+
+
 def publish_to_user(*, user_id: Any, event: str, data: Optional[Dict[str, Any]] = None) -> None:
     """
     Publish a single dashboard event to a user's dashboard stream.
     Safe to call from sync Django code.
     """
-    channel_layer = get_channel_layer()
-    if not channel_layer:
-        return
-    async_to_sync(channel_layer.group_send)(
-        user_group_name(user_id),
-        {
-            "type": "dashboard.event",
-            "event": event,
-            "data": data or {},
-        },
+    publish_many([(user_id, event, data)])
+
+
+def publish_many(events: Iterable[Tuple[Any, str, Optional[Dict[str, Any]]]]) -> None:
+    """
+    Publish (user_id, event, data) dashboard events in one go, e.g. one
+    `notification.created` per recipient after a bulk insert.
+
+    Each event gets the next sequence number of the user's stream and is kept
+    in its replay buffer (see `realtime.streams`) when it is sent, i.e. after
+    commit when published inside a transaction.
+    """
+    send_to_groups(
+        (user_group_name(user_id), _dashboard_message(event, data or {}, user_stream_key(user_id)))
+        for user_id, event, data in events
+        if user_id
     )
 
 
-def publish_badges(*, user_id: Any) -> Dict[str, int]:
+def _dashboard_message(event: str, data: Dict[str, Any], stream_key: str) -> Dict[str, Any]:
+    message = {"type": "dashboard.event", "event": event, "data": data}
+    if event not in EPHEMERAL_EVENTS:
+        # Numbered on the way out (`realtime.streams.number_messages`).
+        message[PENDING_KEY] = stream_key
+    return message
+
+
+BADGE_FIELDS = ("notifications_unread", "messages_unread", "threads_unread", "meetings_active")
+
+
+def publish_badges(*, user_id: Any) -> None:
+    """
+    Request a badge push for the user.
+
+    Requests are coalesced per user (see `realtime.coalescer`), so calling this
+    in loops or several times per request costs one counter read and one push.
+    """
+    from .coalescer import badge_coalescer
+
+    badge_coalescer.request(user_id)
+
+
+def publish_badges_now(*, user_id: Any) -> Dict[str, int]:
     """
-    Recompute badge counts from DB and publish them to the user.
+    Read the user's badge counters and publish them immediately.
     Returns the counts used.
     """
     counts = get_badge_counts_for_user_id(user_id)
@@ -71,23 +145,87 @@ def publish_badges(*, user_id: Any) -> Dict[str, int]:
     return counts
 
 
+def adjust_badges(*, user_ids, **deltas: int) -> None:
+    """
+    Apply relative changes to badge counters, e.g. `adjust_badges(user_ids=[a, b], messages_unread=1)`.
+
+    Users without a counter row are skipped: their row is seeded from a full
+    recompute on first read, which already reflects this write.
+    """
+    from .models import BadgeCounter
+
+    updates = {
+        field: Greatest(F(field) + Value(int(delta)), Value(0))
+        for field, delta in deltas.items()
+        if field in BADGE_FIELDS and delta
+    }
+    ids = {str(x) for x in (user_ids or []) if x}
+    if not updates or not ids:
+        return
+    BadgeCounter.objects.filter(user_id__in=ids).update(**updates)
+
+
+def reset_badges(*, user_ids, **values: int) -> None:
+    """
+    Set badge counters to absolute values, e.g. `reset_badges(user_ids=[uid], notifications_unread=0)`.
+    """
+    from .models import BadgeCounter
+
+    updates = {field: max(0, int(value)) for field, value in values.items() if field in BADGE_FIELDS}
+    ids = {str(x) for x in (user_ids or []) if x}
+    if not updates or not ids:
+        return
+    BadgeCounter.objects.filter(user_id__in=ids).update(**updates)
+
+
 def get_badge_counts_for_user_id(user_id: Any) -> Dict[str, int]:
     """
-    Single source-of-truth badge counts for the whole UI.
+    Single source-of-truth badge counts for the whole UI: one counter row read.
+
+    Role broadcasts have no per-user rows to count incrementally; their unread
+    count comes from the shared cache (two round-trips) and is only recounted
+    after a broadcast or the user's receipts/cursor/preferences change (see
+    notifications.broadcasts). It is added to the stored personal
+    `notifications_unread`.
     """
+    from .models import BadgeCounter
+    from notifications.broadcasts import cached_unread_broadcast_count
+
+    row = BadgeCounter.objects.filter(user_id=user_id).values(*BADGE_FIELDS).first()
+    if row is not None:
+        counts = {field: int(row[field] or 0) for field in BADGE_FIELDS}
+    else:
+        counts = seed_badge_counter(user_id)
+    try:
+        counts["notifications_unread"] += cached_unread_broadcast_count(user_id)
+    except (ValueError, ValidationError):
+        pass
+    return counts
+
+
+def seed_badge_counter(user_id: Any) -> Dict[str, int]:
+    """
+    Recompute a user's badges from scratch and store them as the counter row.
+    """
+    from .models import BadgeCounter
+
     try:
         user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
-        return {
-            "notifications_unread": 0,
-            "messages_unread": 0,
-            "threads_unread": 0,
-            "meetings_active": 0,
-        }
-    return get_badge_counts_for_user(user)
+    except (User.DoesNotExist, ValueError, ValidationError):
+        return {field: 0 for field in BADGE_FIELDS}
+    counts = get_badge_counts_for_user(user)
+    BadgeCounter.objects.update_or_create(user_id=user.id, defaults=counts)
+    return counts
 
 
 def get_badge_counts_for_user(user: User) -> Dict[str, int]:
+    """
+    Full recompute of badge counts from the underlying tables.
+
+    Expensive (correlated sums over every DM/discussion thread); only used to
+    seed and reconcile `BadgeCounter` rows. `notifications_unread` here is
+    personal notifications only (see get_badge_counts_for_user_id).
+    """
     from notifications.models import Notification
     from meeting.models import Meeting
     from messages.models import Message, ThreadParticipant as DMParticipant
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import EventStream, StreamEvent
+
+logger = logging.getLogger(__name__)
+
+# State snapshots, not deltas: a reconnecting client gets fresh ones in `bootstrap`,
+# so they are neither numbered nor buffered.
+EPHEMERAL_EVENTS = {"badges.updated"}
+
+# Trim a stream's buffer when its sequence crosses a multiple of this, instead of on every append.
+_TRIM_EVERY = 32
+
+# Field a dashboard message carries until it is numbered (see `number_messages`).
+PENDING_KEY = "stream_key"
+
+
+def buffer_size() -> int:
+    return max(1, int(getattr(settings, "REALTIME_STREAM_BUFFER", 200)))
+
+
+def user_stream_key(user_id: Any) -> str:
+    return f"user:{user_id}"
+
+
+def role_stream_key(role: str) -> str:
+    return f"role:{role}"
+
+
+def _reserve(counts: Dict[str, int]) -> Dict[str, int]:
+    """
+    Atomically bump each stream's counter by `counts[key]`; returns the new last_seq per key.
+    """
+    keys = sorted(counts)
+    qn = connection.ops.quote_name
+    table, key_col, seq_col = qn(EventStream._meta.db_table), qn("key"), qn("last_seq")
+    values = ", ".join(["(%s, %s)"] * len(keys))
+    params: List[Any] = []
+    for key in keys:
+        params.extend([key, counts[key]])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({key_col}, {seq_col}) VALUES {values} "
+            f"ON CONFLICT ({key_col}) DO UPDATE SET {seq_col} = {table}.{seq_col} + EXCLUDED.{seq_col} "
+            f"RETURNING {key_col}, {seq_col}",
+            params,
+        )
+        return {key: int(last_seq) for key, last_seq in cursor.fetchall()}
+
+
+def append(events: Sequence[Tuple[str, str, Dict[str, Any]]]) -> List[Optional[int]]:
+    """
+    Number and buffer (stream_key, event, data) triples.
+
+    Returns the seq assigned to each event (None for ephemeral events), in input
+    order. Events of one stream get consecutive numbers in input order.
+    """
+    counts = Counter(key for key, event, _ in events if event not in EPHEMERAL_EVENTS)
+    if not counts:
+        return [None] * len(events)
+
+    size = buffer_size()
+    with transaction.atomic():
+        last = _reserve(counts)
+        next_seq = {key: last[key] - n + 1 for key, n in counts.items()}
+        seqs: List[Optional[int]] = []
+        rows = []
+        for key, event, data in events:
+            if event in EPHEMERAL_EVENTS:
+                seqs.append(None)
+                continue
+            seq = next_seq[key]
+            next_seq[key] += 1
+            seqs.append(seq)
+            rows.append(StreamEvent(stream_key=key, seq=seq, event=event, data=data))
+        StreamEvent.objects.bulk_create(rows, batch_size=500)
+
+        for key, n in counts.items():
+            if last[key] // _TRIM_EVERY != (last[key] - n) // _TRIM_EVERY:
+                StreamEvent.objects.filter(stream_key=key, seq__lte=last[key] - size).delete()
+    return seqs
+
+
+def number_messages(messages: Sequence[Dict[str, Any]]) -> None:
+    """
+    Number and buffer dashboard messages still carrying PENDING_KEY, in place
+    and in list order: the key is replaced by `stream` ("user"/"role") and `seq`.
+
+    Called when the messages are about to be sent (by the outbox relay, or by
+    `send_to_groups` outside a transaction), never inside a request transaction,
+    so stream counters are only held for this short call. Best-effort: if it
+    fails the messages still go out, just without a seq (clients treat them as
+    live-only).
+    """
+    pending = [m for m in messages if PENDING_KEY in m]
+    if not pending:
+        return
+    try:
+        seqs = append([(m[PENDING_KEY], m["event"], m["data"]) for m in pending])
+    except Exception:
+        logger.warning("Could not sequence %s dashboard events", len(pending), exc_info=True)
+        seqs = [None] * len(pending)
+    for message, seq in zip(pending, seqs):
+        key = message.pop(PENDING_KEY)
+        if seq is not None:
+            message.update(stream=key.partition(":")[0], seq=seq)
+
+
+def current_seqs(keys: Sequence[str]) -> Dict[str, int]:
+    found = dict(EventStream.objects.filter(key__in=keys).values_list("key", "last_seq"))
+    return {key: int(found.get(key, 0)) for key in keys}
+
+
+def events_after(key: str, last_seq: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Buffered events of `key` newer than `last_seq`, oldest first, or None if the
+    client must resync (some of them were already trimmed, or the cursor is bogus).
+    """
+    current = current_seqs([key])[key]
+    if last_seq > current or last_seq < 0:
+        return None
+    if last_seq == current:
+        return []
+    rows = list(
+        StreamEvent.objects.filter(stream_key=key, seq__gt=last_seq)
+        .order_by("seq")
+        .values("seq", "event", "data")[: buffer_size()]
+    )
+    # Trimming is lazy, so rows older than the buffer may linger; only a
+    # contiguous run up to `current` is a complete replay.
+    if not rows or rows[0]["seq"] != last_seq + 1 or rows[-1]["seq"] != current:
+        return None
+    return rows
@@ -0,0 +1,118 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from account.models import User
+from notifications.models import Notification
+
+from . import outbox
+from .models import BadgeCounter, EventStream, OutboxEvent
+from .services import adjust_badges, get_badge_counts_for_user_id, publish_to_user, reset_badges
+from .streams import events_after, user_stream_key
+
+
+class BadgeCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student@example.com', 'student', 'pw', role='STUDENT')
+
+    def _stored(self):
+        return BadgeCounter.objects.get(user=self.user)
+
+    def test_row_is_seeded_from_a_full_recompute_on_first_read(self):
+        Notification.objects.create(recipient=self.user, notification_type='system', title='x')
+        self.assertFalse(BadgeCounter.objects.filter(user=self.user).exists())
+
+        self.assertEqual(get_badge_counts_for_user_id(self.user.id)['notifications_unread'], 1)
+        self.assertEqual(self._stored().notifications_unread, 1)
+
+    def test_deltas_apply_to_seeded_rows_and_never_go_negative(self):
+        get_badge_counts_for_user_id(self.user.id)
+        adjust_badges(user_ids=[self.user.id], messages_unread=3, threads_unread=2)
+        adjust_badges(user_ids=[self.user.id], messages_unread=-1, threads_unread=-5)
+
+        counts = get_badge_counts_for_user_id(self.user.id)
+        self.assertEqual(counts['messages_unread'], 2)
+        self.assertEqual(counts['threads_unread'], 0)
+
+        reset_badges(user_ids=[self.user.id], messages_unread=0)
+        self.assertEqual(self._stored().messages_unread, 0)
+
+    def test_delta_for_a_user_without_a_row_is_left_to_the_seed(self):
+        adjust_badges(user_ids=[self.user.id], notifications_unread=1)
+        self.assertFalse(BadgeCounter.objects.filter(user=self.user).exists())
+
+    def test_reconcile_rewrites_drifted_rows_and_seeds_missing_ones(self):
+        get_badge_counts_for_user_id(self.user.id)
+        adjust_badges(user_ids=[self.user.id], notifications_unread=4)
+        other = User.objects.create_user('teacher@example.com', 'teacher', 'pw', role='TEACHER')
+
+        out = StringIO()
+        call_command('reconcile_badges', '--seed-missing', stdout=out)
+
+        self.assertIn('1 counters corrected, 1 created', out.getvalue())
+        self.assertEqual(self._stored().notifications_unread, 0)
+        self.assertTrue(BadgeCounter.objects.filter(user=other).exists())
+
+
+class OutboxDrainTests(TestCase):
+    def _event(self, group, **fields):
+        return OutboxEvent.objects.create(group=group, message={'type': 'test.event'}, **fields)
+
+    def test_group_claimed_by_another_relay_waits_for_it(self):
+        head = self._event('a', claimed_until=timezone.now() + timedelta(seconds=30))
+        self._event('a')
+        self._event('b')
+
+        result = outbox.drain()
+        self.assertEqual((result.delivered, result.waiting), (1, 1))
+        self.assertEqual(list(OutboxEvent.objects.values_list('group', flat=True)), ['a', 'a'])
+
+        # Once the other relay has sent its row, the rest of the group follows.
+        head.delete()
+        self.assertEqual(outbox.drain_all(), (1, 0, 0))
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_failed_send_is_released_for_a_retry(self):
+        event = self._event('a')
+        later = self._event('a')
+
+        with mock.patch.object(outbox, '_deliver', return_value=([], {event.id: 'redis down'})):
+            self.assertEqual(outbox.drain(), (0, 1, 0))
+
+        event.refresh_from_db()
+        self.assertEqual((event.attempts, event.last_error, event.claimed_until), (1, 'redis down', None))
+        self.assertGreater(event.available_at, timezone.now())
+        later.refresh_from_db()
+        self.assertIsNone(later.claimed_until)
+        # The group stays behind its failed head, which is not another relay's.
+        self.assertEqual(outbox.drain(), (0, 0, 0))
+
+
+class DashboardStreamTests(TestCase):
+    def test_events_published_in_a_transaction_are_numbered_by_the_relay(self):
+        user = User.objects.create_user('student@example.com', 'student', 'pw', role='STUDENT')
+        key = user_stream_key(user.id)
+        OutboxEvent.objects.all().delete()  # sign-up events
+        for n in (1, 2):
+            publish_to_user(user_id=user.id, event='notification.created', data={'n': n})
+        publish_to_user(user_id=user.id, event='badges.updated', data={})
+        # Nothing is reserved while the publishing transaction is open.
+        self.assertFalse(EventStream.objects.exists())
+
+        sent = []
+        deliver = outbox._deliver
+
+        def spy(by_group):
+            sent.extend(row.message for rows in by_group.values() for row in rows)
+            return deliver(by_group)
+
+        with mock.patch.object(outbox, '_deliver', spy):
+            self.assertEqual(outbox.drain_all().delivered, 3)
+
+        self.assertEqual([(m.get('stream'), m.get('seq')) for m in sent], [('user', 1), ('user', 2), (None, None)])
+        self.assertTrue(all('stream_key' not in m for m in sent))
+        self.assertEqual([e['data']['n'] for e in events_after(key, 0)], [1, 2])
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -104,6 +105,12 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        # Timings such as thread.message_fanout_ms; raise to WARNING to silence.
+        'realtime.metrics': {
+            'handlers': ['console'],
+            'level': os.getenv('REALTIME_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
     },
 }
 
@@ -135,6 +142,8 @@ INSTALLED_APPS = [
     'messages',
     'notifications',
     'realtime',
+    'uploads',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -144,6 +153,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'account.middleware.SecurityAuditMiddleware',
+    'realtime.middleware.RealtimeFlushMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -187,6 +197,61 @@ else:
         },
     }
 
+# Caches. 'shared' must be visible to every worker (cached user cards and their versions,
+# see account/cards.py): Redis when REDIS_URL is set, else a file cache (SHARED_CACHE_PATH)
+# shared by the workers of one node. 'default' stays per-process unless Redis is available.
+SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'studyapp-cache'))
+if REDIS_URL:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL},
+        'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL},
+    }
+else:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': SHARED_CACHE_PATH,
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        },
+    }
+
+# Badge pushes for the same user inside this window collapse into one recompute + push.
+REALTIME_BADGE_COALESCE_MS = int(os.environ.get('REALTIME_BADGE_COALESCE_MS', 250))
+
+# Who delivers realtime events written to the outbox inside transactions:
+# 'inprocess' (background thread in each web process) or 'command' (`manage.py relay_outbox`).
+REALTIME_OUTBOX_RELAY = os.environ.get('REALTIME_OUTBOX_RELAY', 'inprocess')
+
+# Background jobs (jobs app): 'inprocess' (background thread in each web process)
+# or 'command' (`manage.py run_workers`).
+JOBS_RUNNER = os.environ.get('JOBS_RUNNER', 'inprocess')
+# notify_users audiences larger than this are delivered by a job, in chunks.
+NOTIFICATIONS_ASYNC_THRESHOLD = int(os.environ.get('NOTIFICATIONS_ASYNC_THRESHOLD', 500))
+NOTIFICATIONS_FANOUT_CHUNK = int(os.environ.get('NOTIFICATIONS_FANOUT_CHUNK', 1000))
+
+# Notification retention (`manage.py purge_notifications`): days kept per notification_type,
+# NOTIFICATIONS_RETENTION_DAYS for types not listed. 0/None keeps them forever.
+NOTIFICATIONS_RETENTION_DAYS = int(os.environ.get('NOTIFICATIONS_RETENTION_DAYS', 180))
+NOTIFICATIONS_RETENTION_DAYS_BY_TYPE = {
+    'message': 30,
+    'system': 90,
+    'invoice': 365,
+}
+
+# Dashboard events kept per user/role stream for replay after a reconnect.
+REALTIME_STREAM_BUFFER = int(os.environ.get('REALTIME_STREAM_BUFFER', 200))
+
+# DM presence store shared by all workers (see messages/presence.py). Empty = Redis when
+# REDIS_URL is set, else a local SQLite file (MESSAGES_PRESENCE_PATH) for single-node setups.
+MESSAGES_PRESENCE_BACKEND = os.environ.get('MESSAGES_PRESENCE_BACKEND', '')
+MESSAGES_PRESENCE_PATH = os.environ.get('MESSAGES_PRESENCE_PATH', str(BASE_DIR / 'presence.sqlite3'))
+MESSAGES_PRESENCE_TTL = int(os.environ.get('MESSAGES_PRESENCE_TTL', 90))
+
+# Websocket DM sends are written in batches: whatever arrives within this window, up to MAX_BATCH rows.
+MESSAGES_WRITER_FLUSH_MS = int(os.environ.get('MESSAGES_WRITER_FLUSH_MS', 5))
+MESSAGES_WRITER_MAX_BATCH = int(os.environ.get('MESSAGES_WRITER_MAX_BATCH', 200))
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
@@ -277,4 +342,18 @@ EMAIL_VERIFICATION_TOKEN_EXPIRY_HOURS = int(os.environ.get('EMAIL_VERIFICATION_T
 
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100 MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 104857600
+# Multipart files above this spill to a temp file instead of worker RAM; it is
+# also the in-memory limit for an ASGI request body, so keep it above one chunk.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', 5 * 1024 * 1024))
+
+# Chunked uploads (uploads app): per-chunk and per-file limits, and how long
+# unfinished or unclaimed uploads are kept before purge_stale_uploads removes them.
+UPLOADS_CHUNK_MAX_BYTES = int(os.getenv('UPLOADS_CHUNK_MAX_BYTES', 4 * 1024 * 1024))
+UPLOADS_MAX_BYTES = int(os.getenv('UPLOADS_MAX_BYTES', 500 * 1024 * 1024))
+UPLOADS_EXPIRE_HOURS = int(os.getenv('UPLOADS_EXPIRE_HOURS', 24))
+
+# WebP thumbnails/previews for uploaded images (uploads.thumbnails): "pool"
+# derives them in a process pool after commit, "inline" in the saving thread,
+# "off" disables them.
+THUMBNAILS_MODE = os.getenv('THUMBNAILS_MODE', 'pool')
+THUMBNAILS_WORKERS = int(os.getenv('THUMBNAILS_WORKERS', 2))
@@ -37,6 +37,7 @@ urlpatterns = [
     path('pre-signin/', include('preSigninMessages.urls')),
     path('todo/', include('todo.urls')),
     path('invoice/', include('invoice.urls')),
+    path('uploads/', include('uploads.urls')),
 ]
 
 if settings.DEBUG:
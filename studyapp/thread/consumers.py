@@ -1,35 +1,37 @@
 import json
-from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
+from realtime.multiplex import StreamConsumer, StreamHandler
 from .models import Thread, ThreadParticipant
 
-class ThreadConsumer(AsyncJsonWebsocketConsumer):
-    async def connect(self):
-        self.thread_id = self.scope['url_route']['kwargs']['thread_id']
+class ThreadStream(StreamHandler):
+    """
+    Live messages/typing of one discussion thread ("thread:<id>").
+    """
+    event_types = frozenset({'chat_message', 'chat_typing'})
+
+    async def open(self):
+        self.thread_id = self.param
         self.thread_group_name = f'thread_{self.thread_id}'
-        self.user = self.scope['user']
 
-        if not self.user.is_authenticated:
-            await self.close()
-            return
+        if not self.user or not self.user.is_authenticated:
+            return False
 
         # Check if user is participant
         if not await self._is_participant(self.thread_id, self.user):
-            await self.close()
-            return
-
-        await self.channel_layer.group_add(
-            self.thread_group_name,
-            self.channel_name
-        )
-        await self.accept()
-
-    async def disconnect(self, close_code):
-        if hasattr(self, 'thread_group_name'):
-            await self.channel_layer.group_discard(
-                self.thread_group_name,
-                self.channel_name
-            )
+            return False
+
+        await self.group_add(self.thread_group_name)
+        return True
+
+    def accepts(self, message):
+        # A hub socket may carry several thread streams; only take events of this thread.
+        if not super().accepts(message):
+            return False
+        if message['type'] == 'chat_message':
+            thread_id = (message.get('message') or {}).get('thread_id')
+        else:
+            thread_id = message.get('thread_id')
+        return str(thread_id) == str(self.thread_id)
 
     async def receive_json(self, content):
         # We handle typing indicators via WS
@@ -39,6 +41,7 @@ class ThreadConsumer(AsyncJsonWebsocketConsumer):
                 self.thread_group_name,
                 {
                     'type': 'chat_typing',
+                    'thread_id': str(self.thread_id),
                     'user_id': str(self.user.id),
                     'user_name': self.user.get_full_name(),
                     'is_typing': content.get('is_typing', False)
@@ -68,27 +71,27 @@ class ThreadConsumer(AsyncJsonWebsocketConsumer):
         except:
             return False
 
-class ThreadListConsumer(AsyncJsonWebsocketConsumer):
-    async def connect(self):
-        self.user = self.scope['user']
-        if not self.user.is_authenticated:
-            await self.close()
-            return
+class ThreadListStream(StreamHandler):
+    """
+    Thread list updates for the current user ("threads").
+    """
+    event_types = frozenset({'thread_list_update'})
+
+    async def open(self):
+        if not self.user or not self.user.is_authenticated:
+            return False
 
         self.group_name = f'user_thread_list_{self.user.id}'
-        await self.channel_layer.group_add(
-            self.group_name,
-            self.channel_name
-        )
-        await self.accept()
-
-    async def disconnect(self, close_code):
-        if hasattr(self, 'group_name'):
-            await self.channel_layer.group_discard(
-                self.group_name,
-                self.channel_name
-            )
+        await self.group_add(self.group_name)
+        return True
 
     async def thread_list_update(self, event):
         await self.send_json(event)
 
+class ThreadConsumer(StreamConsumer):
+    handler_class = ThreadStream
+    stream_name = 'thread'
+
+class ThreadListConsumer(StreamConsumer):
+    handler_class = ThreadListStream
+    stream_name = 'threads'
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:57
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thread', '0004_threadattachment_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threadmessage',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('content', config='english'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='threadmessage',
+            index=models.Index(fields=['thread', 'created_at'], name='disc_msg_thread_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threadmessage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='disc_msg_search_gin'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 import uuid
 import os
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
@@ -83,9 +85,20 @@ class ThreadMessage(models.Model):
         blank=True
     )
 
+    # Full-text search document, computed by Postgres on every insert/update (see messages.search)
+    search_vector = models.GeneratedField(
+        expression=SearchVector('content', config='english'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
     class Meta:
         db_table = 'discussion_messages'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['thread', 'created_at'], name='disc_msg_thread_created_idx'),
+            GinIndex(fields=['search_vector'], name='disc_msg_search_gin'),
+        ]
 
     def __str__(self):
         return f"Message by {self.sender.get_full_name()} in {self.thread.subject}"
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from .models import ThreadMessage, ThreadParticipant
+
+
+def unread_count_for(participant: ThreadParticipant) -> int:
+    """
+    Unread messages in one discussion thread for one participant (based on its
+    read cursor); the same rule the `threads_unread` badge counter follows.
+    """
+    cursor = participant.last_read_at or participant.joined_at
+    return (
+        ThreadMessage.objects.filter(thread_id=participant.thread_id, created_at__gt=cursor)
+        .exclude(sender_id=participant.user_id)
+        .count()
+    )
@@ -1,3 +1,136 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from account.models import User
+from realtime.services import get_badge_counts_for_user_id
+
+from .models import Thread, ThreadParticipant, ThreadMessage
+
+# A fresh in-memory "shared" cache instead of the on-disk one other processes use.
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'thread-tests'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ThreadListTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin@example.com', 'admin', 'pw', role='ADMIN')
+        self.rep = User.objects.create_user('rep@example.com', 'rep', 'pw', role='CS_REP')
+        self.client.force_login(self.admin)
+
+    def _make_threads(self, n, **fields):
+        threads = []
+        for i in range(n):
+            t = Thread.objects.create(subject=f'Thread {len(threads)}', created_by=self.admin, **fields)
+            ThreadParticipant.objects.create(thread=t, user=self.admin)
+            ThreadParticipant.objects.create(thread=t, user=self.rep)
+            ThreadMessage.objects.create(thread=t, sender=self.rep, content=f'hello {i}')
+            threads.append(t)
+        return threads
+
+    def _list_queries(self, **params):
+        # Measure with cold user cards so every call does the same work.
+        caches['shared'].clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('thread:list'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_query_count_does_not_grow_with_threads(self):
+        self._make_threads(2)
+        few, data = self._list_queries()
+        self.assertEqual(len(data['threads']), 2)
+
+        self._make_threads(20)
+        many, data = self._list_queries()
+        self.assertEqual(len(data['threads']), 22)
+        self.assertEqual(few, many)
+
+    def test_unread_count_and_preview(self):
+        (t,) = self._make_threads(1)
+        ThreadMessage.objects.create(thread=t, sender=self.admin, content='my own reply')
+        _, data = self._list_queries()
+        row = data['threads'][0]
+        self.assertEqual(row['unread_count'], 1)
+        self.assertEqual(row['last_message_preview'], 'my own reply')
+        self.assertEqual({p['id'] for p in row['participants']}, {str(self.admin.id), str(self.rep.id)})
+
+    def test_pagination_and_filters(self):
+        self._make_threads(5)
+        self._make_threads(2, thread_type='invoice', status='closed')
+
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            _, data = self._list_queries(**params)
+            seen += [t['id'] for t in data['threads']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+        _, data = self._list_queries(type='invoice', status='closed')
+        self.assertEqual(len(data['threads']), 2)
+        _, data = self._list_queries(status='active')
+        self.assertEqual(len(data['threads']), 5)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ThreadBadgeTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin@example.com', 'admin', 'pw', role='ADMIN')
+        self.rep = User.objects.create_user('rep@example.com', 'rep', 'pw', role='CS_REP')
+        self.client.force_login(self.admin)
+
+    def _threads_unread(self, user):
+        return get_badge_counts_for_user_id(user.id)['threads_unread']
+
+    def _create_thread(self):
+        response = self.client.post(reverse('thread:create'), {
+            'threadSubject': 'Invoice', 'threadType': 'general', 'threadMessage': 'hello',
+            'threadRecipient': str(self.rep.id),
+        })
+        return Thread.objects.get(id=response.json()['thread_id'])
+
+    def _send(self, thread, content):
+        with self.assertLogs('realtime.metrics', 'INFO'):
+            self.client.post(reverse('thread:send', args=[thread.id]), {'content': content})
+
+    def test_counter_follows_sends_reads_and_deletes(self):
+        self.assertEqual(self._threads_unread(self.rep), 0)
+        thread = self._create_thread()
+        self.assertEqual(self._threads_unread(self.rep), 1)
+
+        self._send(thread, 'one more')
+        self.assertEqual(self._threads_unread(self.rep), 2)
+        self.assertEqual(self._threads_unread(self.admin), 0)
+
+        self.client.force_login(self.rep)
+        self.client.post(reverse('thread:read', args=[thread.id]))
+        self.assertEqual(self._threads_unread(self.rep), 0)
+
+        self._send(thread, 'reply')
+        self.assertEqual(self._threads_unread(self.admin), 1)
+
+        self.client.force_login(self.admin)
+        self.client.post(reverse('thread:delete', args=[thread.id]))
+        self.assertEqual(self._threads_unread(self.admin), 0)
+        self.assertEqual(self._threads_unread(self.rep), 0)
+
+    def test_failed_broadcast_does_not_lose_the_unread_increment(self):
+        thread = self._create_thread()
+        with mock.patch('thread.views.send_to_groups', side_effect=ConnectionError('redis down')):
+            with self.assertLogs('thread.views', 'WARNING'):
+                response = self.client.post(reverse('thread:send', args=[thread.id]), {'content': 'one more'})
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(self._threads_unread(self.rep), 2)
@@ -8,6 +8,7 @@ urlpatterns = [
     path('api/create/', views.create_thread, name='create'),
     path('api/<uuid:thread_id>/messages/', views.get_thread_messages, name='messages'),
     path('api/<uuid:thread_id>/send/', views.send_message, name='send'),
+    path('api/<uuid:thread_id>/read/', views.mark_thread_read, name='read'),
     path('api/<uuid:thread_id>/status/', views.update_thread_status, name='status'),
     path('api/<uuid:thread_id>/delete/', views.delete_thread, name='delete'),
 ]
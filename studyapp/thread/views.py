@@ -2,92 +2,196 @@ import json
 import uuid
 import logging
 import os
+import time
+from datetime import datetime, timezone as dt_timezone
 from django.db import transaction
+from django.db.models import (
+    Case, CharField, Count, Exists, IntegerField, OuterRef, Prefetch, Q, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce, Left
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST, require_GET
 from .models import Thread, ThreadParticipant, ThreadMessage, ThreadAttachment
+from .services import unread_count_for
+from account.cards import get_user_card, get_user_cards
 from account.models import User, Student, Teacher, CSRep, Admin
 from account.decorators import admin_required
 from assingment.models import Assignment
 from invoice.models import Invoice
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from realtime.services import publish_badges
+from realtime.services import adjust_badges, publish_badges, send_to_group, send_to_groups
+from uploads.services import UploadError, files_from_request
+from uploads.thumbnails import thumb_url
 
 logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger('realtime.metrics')
+
+
+def _cursor(at, obj_id):
+    """
+    Keyset position of a list row: "<timestamp ISO>,<id>".
+    """
+    return f"{at.isoformat()},{obj_id}"
+
+
+def _parse_cursor(raw):
+    at, sep, obj_id = (raw or '').rpartition(',')
+    if not sep:
+        raise ValueError('bad cursor')
+    parsed = datetime.fromisoformat(at)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed, uuid.UUID(obj_id)
+
+
+def _serialize_message(m, viewer=None, attachments=None, mentions=None, cards=None):
+    sender = (cards or {}).get(str(m.sender_id)) or get_user_card(m.sender)
+    data = {
+        'id': str(m.id),
+        'thread_id': str(m.thread_id),
+        'sender_id': str(m.sender_id),
+        'sender_name': sender['full_name'],
+        'sender_role': sender['role_display'],
+        'content': m.content,
+        'created_at': m.created_at.isoformat(),
+        'cursor': _cursor(m.created_at, m.id),
+        'is_system': m.is_system_message,
+        'attachments': [
+            {
+                'url': a.file.url,
+                'thumb_url': thumb_url(a.file),
+                'name': a.file_name,
+                'type': a.file_type,
+                'duration_ms': a.duration_ms
+            }
+            for a in (m.attachments.all() if attachments is None else attachments)
+        ],
+        'mentions': [
+            {'id': str(u.id), 'name': u.get_full_name()}
+            for u in (m.mentions.all() if mentions is None else mentions)
+        ]
+    }
+    if viewer is not None:
+        data['is_me'] = m.sender_id == viewer.id
+    return data
+
 
 @login_required
 @require_GET
 def get_thread_list(request):
     """
-    Returns list of threads the current user is participating in.
-    Supports filtering by type and status.
+    Returns a page of the threads the current user is participating in,
+    most recently active first.
+    Supports filtering by type and status, `id` for a single thread,
+    `limit` (default 50, max 100) and `cursor` (the previous page's `next_cursor`).
+
+    One query for the page (unread count and last-message preview are
+    subqueries) plus one prefetch for the participants, however many threads;
+    people are rendered from cached user cards.
     """
     filter_type = request.GET.get('type')
     filter_status = request.GET.get('status')
-    
-    participations = ThreadParticipant.objects.filter(user=request.user)
-    thread_ids = participations.values_list('thread_id', flat=True)
-    
-    threads = Thread.objects.filter(id__in=thread_ids).select_related('created_by', 'assignment', 'invoice')
-    
+    try:
+        limit = max(1, min(int(request.GET.get('limit') or 50), 100))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid limit'}, status=400)
+    try:
+        cursor = _parse_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        thread_id = uuid.UUID(request.GET['id']) if request.GET.get('id') else None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor or id'}, status=400)
+
+    # Same unread rule as the badge counters (services.unread_count_for).
+    unread = (
+        ThreadMessage.objects.filter(
+            thread_id=OuterRef('thread_id'),
+            created_at__gt=Coalesce(OuterRef('last_read_at'), OuterRef('joined_at')),
+        )
+        .exclude(sender=request.user)
+        .order_by()
+        .values('thread_id')
+        .annotate(n=Count('*'))
+        .values('n')
+    )
+    preview = (
+        ThreadMessage.objects.filter(thread_id=OuterRef('thread_id'))
+        .annotate(
+            preview=Case(
+                When(
+                    Q(content='') & Exists(ThreadAttachment.objects.filter(message=OuterRef('pk'))),
+                    then=Value('[Attachment]'),
+                ),
+                default=Left('content', 100),
+            )
+        )
+        .order_by('-created_at')
+        .values('preview')[:1]
+    )
+
+    participations = (
+        ThreadParticipant.objects.filter(user=request.user)
+        .select_related('thread__assignment', 'thread__invoice')
+        .prefetch_related(
+            Prefetch('thread__participants', queryset=ThreadParticipant.objects.order_by('joined_at'))
+        )
+        .annotate(
+            activity_at=Coalesce('thread__last_message_at', 'thread__created_at'),
+            unread_count=Coalesce(Subquery(unread, output_field=IntegerField()), 0),
+            last_message_preview=Subquery(preview, output_field=CharField()),
+        )
+    )
     if filter_type and filter_type != 'all':
-        threads = threads.filter(thread_type=filter_type)
+        participations = participations.filter(thread__thread_type=filter_type)
     if filter_status:
-        threads = threads.filter(status=filter_status)
-    
-    data = []
-    for t in threads:
-        # Get unread count
-        try:
-            p = participations.get(thread=t)
-            if p.last_read_at:
-                unread_count = t.messages.filter(created_at__gt=p.last_read_at).count()
-            else:
-                unread_count = t.messages.count()
-        except ThreadParticipant.DoesNotExist:
-            unread_count = 0
-
-        # Get participants summary
-        part_users = t.participants.select_related('user').all()
-        participants_list = []
-        for pu in part_users:
-            role = pu.user.get_role_display()
-            participants_list.append({
-                'id': str(pu.user.id),
-                'name': pu.user.get_full_name(),
-                'role': role,
-                'is_me': pu.user == request.user
-            })
-
-        # Last message preview
-        last_msg = t.messages.order_by('-created_at').first()
-        preview = ""
-        if last_msg:
-            preview = last_msg.content[:100]
-            if not preview and last_msg.attachments.exists():
-                preview = "[Attachment]"
+        participations = participations.filter(thread__status=filter_status)
+    if thread_id:
+        participations = participations.filter(thread_id=thread_id)
+    if cursor:
+        activity, last_id = cursor
+        participations = participations.filter(
+            Q(activity_at__lt=activity) | Q(activity_at=activity, thread_id__lt=last_id)
+        )
+    page = list(participations.order_by('-activity_at', '-thread_id')[:limit + 1])
+    has_more, page = len(page) > limit, page[:limit]
 
+    cards = get_user_cards(
+        [pu.user_id for p in page for pu in p.thread.participants.all()]
+        + [p.thread.created_by_id for p in page]
+    )
+    data = []
+    for p in page:
+        t = p.thread
+        participants_list = [
+            {
+                'id': str(pu.user_id),
+                'name': cards[str(pu.user_id)]['full_name'],
+                'role': cards[str(pu.user_id)]['role_display'],
+                'is_me': pu.user_id == request.user.id,
+            }
+            for pu in t.participants.all()
+            if str(pu.user_id) in cards
+        ]
+        creator = cards.get(str(t.created_by_id)) if t.created_by_id else None
         data.append({
             'id': str(t.id),
             'subject': t.subject,
             'thread_type': t.thread_type,
             'status': t.status,
-            'created_by': t.created_by.get_full_name() if t.created_by else "System",
+            'created_by': creator['full_name'] if creator else "System",
             'created_at': t.created_at.isoformat(),
             'updated_at': t.updated_at.isoformat(),
             'last_message_at': t.last_message_at.isoformat() if t.last_message_at else None,
-            'last_message_preview': preview,
-            'unread_count': unread_count,
+            'last_message_preview': p.last_message_preview or "",
+            'unread_count': p.unread_count,
             'participants': participants_list,
             'assignment_code': t.assignment.assignment_code if t.assignment else None,
             'invoice_id': str(t.invoice.id) if t.invoice else None,
         })
-    
-    return JsonResponse({'success': True, 'threads': data})
+
+    next_cursor = _cursor(page[-1].activity_at, page[-1].thread_id) if has_more else None
+    return JsonResponse({'success': True, 'threads': data, 'next_cursor': next_cursor})
 
 @login_required
 @require_POST
@@ -186,6 +290,10 @@ def create_thread(request):
                     file_type='file'
                 )
 
+            # The initial message is unread for everyone but the creator.
+            recipients = ThreadParticipant.objects.filter(thread=thread).exclude(user=request.user)
+            adjust_badges(user_ids=recipients.values_list('user_id', flat=True), threads_unread=1)
+
         # Notify via WebSocket
         _notify_thread_created(thread)
 
@@ -204,63 +312,131 @@ def create_thread(request):
 @login_required
 @require_GET
 def get_thread_messages(request, thread_id):
+    """
+    One page of a thread's messages, oldest first, in (created_at, id) order.
+
+    - no cursor: the latest `limit` messages (default 50, max 200)
+    - `before=<cursor>`: the page right before it (scrolling back)
+    - `after=<cursor>`: the page right after it (catching up)
+
+    `prev_cursor` is null once the start of the thread is reached and
+    `next_cursor` once the page reaches the newest message. Reading does not
+    mark anything as read; the client posts to `mark_thread_read` for that.
+    """
     thread = get_object_or_404(Thread, id=thread_id)
     # Security: check if participant
     if not ThreadParticipant.objects.filter(thread=thread, user=request.user).exists():
         return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
-    
-    messages = thread.messages.all().select_related('sender').prefetch_related('attachments', 'mentions')
-    
-    data = []
-    for m in messages:
-        attachments = []
-        for a in m.attachments.all():
-            attachments.append({
-                'url': a.file.url,
-                'name': a.file_name,
-                'type': a.file_type,
-                'duration_ms': a.duration_ms
-            })
-        
-        mentions = [{'id': str(u.id), 'name': u.get_full_name()} for u in m.mentions.all()]
-        
-        data.append({
-            'id': str(m.id),
-            'sender_id': str(m.sender.id),
-            'sender_name': m.sender.get_full_name(),
-            'sender_role': m.sender.get_role_display(),
-            'content': m.content,
-            'created_at': m.created_at.isoformat(),
-            'is_system': m.is_system_message,
-            'is_me': m.sender == request.user,
-            'attachments': attachments,
-            'mentions': mentions
-        })
-    
-    # Mark as read
-    ThreadParticipant.objects.filter(thread=thread, user=request.user).update(last_read_at=timezone.now())
+
     try:
-        publish_badges(user_id=request.user.id)
-    except Exception:
-        pass
-    
-    return JsonResponse({'success': True, 'messages': data})
+        limit = max(1, min(int(request.GET.get('limit') or 50), 200))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid limit'}, status=400)
+    before, after = request.GET.get('before'), request.GET.get('after')
+    if before and after:
+        return JsonResponse({'success': False, 'error': 'Use either before or after, not both'}, status=400)
+    try:
+        cursor = _parse_cursor(before or after) if (before or after) else None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor'}, status=400)
+
+    qs = thread.messages.prefetch_related('attachments', 'mentions')
+    if after:
+        created, message_id = cursor
+        qs = qs.filter(Q(created_at__gt=created) | Q(created_at=created, id__gt=message_id))
+        page = list(qs.order_by('created_at', 'id')[:limit + 1])
+        has_newer, page = len(page) > limit, page[:limit]
+        has_older = True
+    else:
+        if before:
+            created, message_id = cursor
+            qs = qs.filter(Q(created_at__lt=created) | Q(created_at=created, id__lt=message_id))
+        page = list(qs.order_by('-created_at', '-id')[:limit + 1])
+        has_older, page = len(page) > limit, page[:limit][::-1]
+        has_newer = bool(before)
+
+    cards = get_user_cards(m.sender_id for m in page)
+    return JsonResponse({
+        'success': True,
+        'messages': [_serialize_message(m, request.user, cards=cards) for m in page],
+        'prev_cursor': _cursor(page[0].created_at, page[0].id) if page and has_older else None,
+        'next_cursor': _cursor(page[-1].created_at, page[-1].id) if page and has_newer else None,
+    })
+
+
+@login_required
+@require_POST
+def mark_thread_read(request, thread_id):
+    """
+    Move the caller's read cursor up to `up_to` (a message cursor; default:
+    the newest message). The cursor only ever moves forward, so repeated or
+    stale calls write nothing and publish no badges.
+    """
+    try:
+        up_to = _parse_cursor(request.POST['up_to'])[0] if request.POST.get('up_to') else None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor'}, status=400)
+
+    cleared = 0
+    with transaction.atomic():
+        # Row lock: two tabs marking the same thread must not both decrement the badge.
+        my_part = (
+            ThreadParticipant.objects.select_for_update()
+            .filter(thread_id=thread_id, user=request.user)
+            .first()
+        )
+        if not my_part:
+            return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+        if up_to is None:
+            up_to = (
+                ThreadMessage.objects.filter(thread_id=thread_id)
+                .order_by('-created_at')
+                .values_list('created_at', flat=True)
+                .first()
+            )
+        up_to = min(up_to, timezone.now()) if up_to else None
+        current = my_part.last_read_at or my_part.joined_at
+        if up_to is None or up_to <= current:
+            return JsonResponse({'success': True, 'advanced': False})
+
+        cleared = (
+            ThreadMessage.objects.filter(thread_id=thread_id, created_at__gt=current, created_at__lte=up_to)
+            .exclude(sender=request.user)
+            .count()
+        )
+        ThreadParticipant.objects.filter(id=my_part.id).update(last_read_at=up_to)
+        if cleared:
+            adjust_badges(user_ids=[request.user.id], threads_unread=-cleared)
+
+    if cleared:
+        try:
+            publish_badges(user_id=request.user.id)
+        except Exception:
+            pass
+
+    return JsonResponse({'success': True, 'advanced': True, 'last_read_at': up_to.isoformat()})
+
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024  # 25MB per attachment, multipart and chunked alike, as in DMs
 
 @login_required
 @require_POST
 def send_message(request, thread_id):
     try:
         thread = get_object_or_404(Thread, id=thread_id)
-        if not ThreadParticipant.objects.filter(thread=thread, user=request.user).exists():
+        # Resolved once: the access check and the fanout both use it.
+        participant_ids = list(ThreadParticipant.objects.filter(thread=thread).values_list('user_id', flat=True))
+        if request.user.id not in participant_ids:
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
         
         content = request.POST.get('content', '').strip()
         mention_ids = request.POST.getlist('mentions')
         
         # Check if we have either content or files (including voicemail)
-        has_files = bool(request.FILES)
+        # Finalized chunked uploads (see the uploads app) count as files too.
+        upload_tokens = request.POST.getlist('upload_tokens')
+        has_files = bool(request.FILES) or bool(upload_tokens)
         has_voice = bool(request.FILES.get('voice'))
-        has_regular_files = bool(request.FILES.getlist('files'))
+        has_regular_files = bool(request.FILES.getlist('files')) or bool(upload_tokens)
         
         if not content and not has_files:
             return JsonResponse({'success': False, 'error': 'Message cannot be empty'}, status=400)
@@ -269,6 +445,8 @@ def send_message(request, thread_id):
         logger.info(f"Sending message to thread {thread_id}: content={bool(content)}, voice={has_voice}, files={has_regular_files}")
 
         msg = None
+        attachments = []
+        mentioned = []
         try:
             with transaction.atomic():
                 msg = ThreadMessage.objects.create(
@@ -280,15 +458,15 @@ def send_message(request, thread_id):
                 # Handle mentions with error handling
                 if mention_ids:
                     try:
-                        valid_users = User.objects.filter(id__in=mention_ids)
-                        if valid_users.exists():
-                            msg.mentions.set(valid_users)
+                        mentioned = list(User.objects.filter(id__in=mention_ids))
+                        if mentioned:
+                            msg.mentions.set(mentioned)
                     except Exception as e:
                         # Log error but don't fail the message send
                         logger.warning(f"Failed to set mentions for message {msg.id}: {str(e)}")
                 
                 # Files
-                files = request.FILES.getlist('files')
+                files = files_from_request(request, 'files', max_bytes=MAX_UPLOAD_BYTES)
                 for f in files:
                     try:
                         # Validate and sanitize file name
@@ -312,12 +490,12 @@ def send_message(request, thread_id):
                         # Log file details before saving
                         logger.info(f"Attempting to save file: {file_name} (Size: {f.size} bytes) for message {msg.id}")
                         
-                        ThreadAttachment.objects.create(
+                        attachments.append(ThreadAttachment.objects.create(
                             message=msg,
                             file=f,
                             file_name=file_name,
                             file_type='file'
-                        )
+                        ))
                         logger.info(f"Successfully saved file: {file_name}")
                     except Exception as e:
                         logger.error(f"Failed to create attachment for message {msg.id}: {str(e)}", exc_info=True)
@@ -345,13 +523,13 @@ def send_message(request, thread_id):
                             if not hasattr(voice, 'name') or not voice.name:
                                 voice.name = 'voicemail.webm'
                             
-                            ThreadAttachment.objects.create(
+                            attachments.append(ThreadAttachment.objects.create(
                                 message=msg,
                                 file=voice,
                                 file_name='voicemail.webm',
                                 file_type='audio',
                                 duration_ms=duration if duration > 0 else None
-                            )
+                            ))
                             logger.info(f"Successfully saved voicemail for message {msg.id}")
                     except Exception as e:
                         error_msg = str(e)
@@ -361,13 +539,13 @@ def send_message(request, thread_id):
                         
                 thread.last_message_at = timezone.now()
                 thread.save()
+
+                # Unread for everyone but the sender; written with the message,
+                # unlike the best-effort broadcast below.
+                adjust_badges(user_ids=[uid for uid in participant_ids if uid != request.user.id], threads_unread=1)
                 
-            # Reload message with all relationships for broadcasting
-            if msg:
-                msg = ThreadMessage.objects.select_related('thread', 'sender').prefetch_related(
-                    'attachments', 'mentions', 'thread__participants__user'
-                ).get(id=msg.id)
-                
+        except UploadError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Failed to create message in thread {thread_id}: {error_msg}", exc_info=True)
@@ -382,21 +560,13 @@ def send_message(request, thread_id):
                 'error': f'Failed to send message: {error_msg[:100]}'
             }, status=500)
         
-        # Broadcast via WebSocket (don't fail if this fails)
+        # Broadcast via WebSocket and push badges (don't fail if this fails)
         if msg:
             try:
-                _broadcast_message(msg)
+                _broadcast_message(msg, participant_ids, attachments=attachments, mentions=mentioned)
             except Exception as e:
                 logger.warning(f"Failed to broadcast message {msg.id}: {str(e)}")
                 # Continue even if broadcast fails
-
-            # Badge counts: unread increased for participants (and potentially reduced for sender via read cursor)
-            try:
-                participant_ids = list(ThreadParticipant.objects.filter(thread=thread).values_list("user_id", flat=True))
-                for uid in participant_ids:
-                    publish_badges(user_id=uid)
-            except Exception:
-                pass
         
         return JsonResponse({'success': True, 'message_id': str(msg.id)})
         
@@ -405,10 +575,9 @@ def send_message(request, thread_id):
         return JsonResponse({'success': False, 'error': 'An unexpected error occurred. Please try again.'}, status=500)
 
 def _notify_thread_created(thread):
-    channel_layer = get_channel_layer()
     participants = thread.participants.all()
     for p in participants:
-        async_to_sync(channel_layer.group_send)(
+        send_to_group(
             f"user_thread_list_{p.user.id}",
             {
                 "type": "thread_list_update",
@@ -418,10 +587,9 @@ def _notify_thread_created(thread):
         )
 
 def _notify_thread_updated(thread):
-    channel_layer = get_channel_layer()
     participants = thread.participants.all()
     for p in participants:
-        async_to_sync(channel_layer.group_send)(
+        send_to_group(
             f"user_thread_list_{p.user.id}",
             {
                 "type": "thread_list_update",
@@ -430,53 +598,40 @@ def _notify_thread_updated(thread):
             }
         )
 
-def _broadcast_message(message):
-    channel_layer = get_channel_layer()
-    attachments = []
-    for a in message.attachments.all():
-        attachments.append({
-            'url': a.file.url,
-            'name': a.file_name,
-            'type': a.file_type,
-            'duration_ms': a.duration_ms
-        })
-    
-    data = {
-        'id': str(message.id),
-        'thread_id': str(message.thread.id),
-        'sender_id': str(message.sender.id),
-        'sender_name': message.sender.get_full_name(),
-        'sender_role': message.sender.get_role_display(),
-        'content': message.content,
-        'created_at': message.created_at.isoformat(),
-        'is_system': message.is_system_message,
-        'attachments': attachments,
-        'mentions': [{'id': str(u.id), 'name': u.get_full_name()} for u in message.mentions.all()]
+def _broadcast_message(message, participant_ids, attachments=None, mentions=None):
+    """
+    Fan a new message out in one pass: the message is serialized once and the
+    thread event, every participant's list update and the badge pushes go out
+    as one batch (one channel-layer hop, or one outbox row inside a transaction).
+    Fanout time is logged to `realtime.metrics`.
+    """
+    started = time.perf_counter()
+    data = _serialize_message(message, attachments=attachments, mentions=mentions)
+
+    preview = message.content[:50] + "..." if len(message.content) > 50 else message.content
+    if not preview and data['attachments']:
+        preview = "[Attachment]"
+    list_update = {
+        "type": "thread_list_update",
+        "action": "updated",
+        "thread_id": str(message.thread_id),
+        "last_message_preview": preview
     }
-    
-    async_to_sync(channel_layer.group_send)(
-        f"thread_{message.thread.id}",
-        {
-            "type": "chat_message",
-            "message": data
-        }
+    send_to_groups(
+        [(f"thread_{message.thread_id}", {"type": "chat_message", "message": data})]
+        + [(f"user_thread_list_{uid}", list_update) for uid in participant_ids]
+    )
+
+    # Badge pushes (counters were updated with the message), coalesced per user
+    for uid in participant_ids:
+        publish_badges(user_id=uid)
+
+    metrics_logger.info(
+        "thread.message_fanout_ms=%.2f thread=%s recipients=%d",
+        (time.perf_counter() - started) * 1000,
+        message.thread_id,
+        len(participant_ids),
     )
-    
-    # Also update thread list for all participants
-    for p in message.thread.participants.all():
-        preview = message.content[:50] + "..." if len(message.content) > 50 else message.content
-        if not preview and attachments:
-            preview = "[Attachment]"
-            
-        async_to_sync(channel_layer.group_send)(
-            f"user_thread_list_{p.user.id}",
-            {
-                "type": "thread_list_update",
-                "action": "updated",
-                "thread_id": str(message.thread.id),
-                "last_message_preview": preview
-            }
-        )
 
 
 @login_required
@@ -516,17 +671,22 @@ def delete_thread(request, thread_id):
     try:
         thread = get_object_or_404(Thread, id=thread_id)
         
-        # Get participant IDs before deleting (for notifications)
-        participant_ids = list(ThreadParticipant.objects.filter(thread=thread).values_list("user_id", flat=True))
-        
-        # Delete the thread (this will cascade delete participants, messages, and attachments)
-        thread.delete()
+        with transaction.atomic():
+            # Get participant IDs (and what each has unread) before deleting (for notifications)
+            participants = list(ThreadParticipant.objects.filter(thread=thread))
+            participant_ids = [p.user_id for p in participants]
+            unread_by_user = {p.user_id: unread_count_for(p) for p in participants}
+
+            # Delete the thread (this will cascade delete participants, messages, and attachments)
+            thread.delete()
+            for uid, unread in unread_by_user.items():
+                if unread:
+                    adjust_badges(user_ids=[uid], threads_unread=-unread)
         
         # Notify participants via WebSocket
         try:
-            channel_layer = get_channel_layer()
             for uid in participant_ids:
-                async_to_sync(channel_layer.group_send)(
+                send_to_group(
                     f"user_{uid}",
                     {
                         "type": "thread.deleted",
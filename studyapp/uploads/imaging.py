@@ -0,0 +1,46 @@
+"""
+Image derivatives (WebP thumbnails and previews).
+
+Runs inside the worker processes of `uploads.thumbnails`, so it only uses
+Pillow and the filesystem: no Django settings, models or database.
+"""
+from __future__ import annotations
+
+import os
+from typing import Dict, List
+
+from PIL import Image, ImageOps
+
+# Variant name -> longest edge in pixels.
+VARIANTS: Dict[str, int] = {"thumb": 320, "preview": 1280}
+
+
+def derivative_path(path: str, variant: str) -> str:
+    """
+    Derivatives sit next to the original: `photo.jpg` -> `photo.jpg.thumb.webp`.
+    """
+    return f"{path}.{variant}.webp"
+
+
+def derive(path: str, variants: Dict[str, int] = VARIANTS, quality: int = 80) -> List[str]:
+    """
+    Write every variant of the image at `path`; returns the files written.
+    Raises for files Pillow can't read (callers treat that as "not an image").
+    """
+    written = []
+    with Image.open(path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode in ("P", "PA", "LA", "RGBA") or "transparency" in im.info:
+            im = im.convert("RGBA")
+        else:
+            im = im.convert("RGB")
+        for name, edge in variants.items():
+            variant = im.copy()
+            variant.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            out = derivative_path(path, name)
+            tmp = f"{out}.tmp"
+            variant.save(tmp, "WEBP", quality=quality, method=4)
+            # Readers never see a half-written derivative.
+            os.replace(tmp, out)
+            written.append(out)
+    return written
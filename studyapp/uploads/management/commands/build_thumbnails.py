@@ -0,0 +1,39 @@
+"""
+Management command that derives WebP thumbnails/previews for stored images.
+Usage: python manage.py build_thumbnails [--model thread.ThreadAttachment] [--force]
+
+New uploads are handled by the post_save hook in uploads.thumbnails; this
+backfills files saved before it existed (or regenerates them with --force).
+"""
+from concurrent.futures import wait
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from uploads.thumbnails import SOURCES, enqueue
+
+
+class Command(BaseCommand):
+    help = 'Backfills WebP thumbnails and previews for uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', help='Only this model label, e.g. thread.ThreadAttachment')
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that are already up to date')
+
+    def handle(self, *args, **options):
+        sources = [(label, field) for label, field in SOURCES if not options['model'] or label.lower() == options['model'].lower()]
+        if not sources:
+            raise CommandError(f"Unknown model {options['model']!r}; choose from {', '.join(l for l, _ in SOURCES)}")
+
+        futures = []
+        for label, field in sources:
+            model = apps.get_model(label)
+            rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).only('pk', field)
+            for obj in rows.iterator():
+                future = enqueue(getattr(obj, field), force=options['force'])
+                if future is not None:
+                    futures.append(future)
+
+        done, _ = wait(futures)
+        failed = sum(1 for f in done if f.exception() is not None)
+        self.stdout.write(self.style.SUCCESS(f'✓ Derived {len(done) - failed} image(s), {failed} unreadable'))
@@ -0,0 +1,56 @@
+"""
+Management command that removes chunked uploads nobody will use.
+Usage: python manage.py purge_stale_uploads [--hours 24] [--dry-run]
+
+Deletes uploads still in progress or finalized but never claimed after
+`--hours` (default UPLOADS_EXPIRE_HOURS), with their partial files, and the
+rows of uploads already claimed (their file now belongs to an attachment).
+Links left behind by claims that never reached storage go after `--hours` too.
+"""
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from uploads.models import ChunkedUpload
+from uploads.services import discard_upload, stale_claim_links
+
+
+class Command(BaseCommand):
+    help = 'Deletes abandoned chunked uploads and their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=getattr(settings, 'UPLOADS_EXPIRE_HOURS', 24))
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=max(0, options['hours']))
+        stale = ChunkedUpload.objects.filter(
+            status__in=[ChunkedUpload.STATUS_UPLOADING, ChunkedUpload.STATUS_COMPLETE],
+            updated_at__lt=cutoff,
+        )
+        consumed = ChunkedUpload.objects.filter(status=ChunkedUpload.STATUS_CONSUMED)
+        links = stale_claim_links(cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'Would remove {stale.count()} stale upload(s), {consumed.count()} claimed row(s) '
+                f'and {len(links)} leftover claim file(s)'
+            )
+            return
+
+        removed = 0
+        for upload in stale.iterator():
+            discard_upload(upload)
+            removed += 1
+        cleared, _ = consumed.delete()
+        for path in links:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Removed {removed} stale upload(s), {cleared} claimed row(s) and {len(links)} leftover claim file(s)'
+        ))
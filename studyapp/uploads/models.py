@@ -0,0 +1,51 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class ChunkedUpload(models.Model):
+    """
+    A file sent in chunks (see `uploads.views`).
+
+    Bytes are appended to `partial_path()` under MEDIA_ROOT as they arrive and
+    `offset` is how many are stored, so an interrupted upload resumes from
+    there. Finalizing issues `token`, which the send/submit APIs accept in
+    place of a multipart file (`uploads.services.files_from_request`).
+    """
+
+    STATUS_UPLOADING = "uploading"
+    STATUS_COMPLETE = "complete"
+    STATUS_CONSUMED = "consumed"
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, "Uploading"),
+        (STATUS_COMPLETE, "Complete"),
+        (STATUS_CONSUMED, "Consumed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="chunked_uploads")
+
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    # Optional hex SHA-256 of the whole file, checked on finalize.
+    sha256 = models.CharField(max_length=64, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_UPLOADING, db_index=True)
+    token = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "chunked_uploads"
+
+    def __str__(self) -> str:
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    def partial_path(self) -> str:
+        return os.path.join(settings.MEDIA_ROOT, "uploads", "partial", f"{self.id}.part")
@@ -0,0 +1,282 @@
+"""
+Chunked, resumable uploads.
+
+A client creates an upload (name, size, optional SHA-256), appends chunks at
+the current offset, and finalizes it to get a token. The send/submit APIs take
+tokens next to multipart files through `files_from_request`. Each chunk is
+streamed to disk in small pieces, so a worker never holds more than one chunk
+(UPLOADS_CHUNK_MAX_BYTES) of an upload in memory.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import secrets
+import shutil
+from functools import partial
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+
+from .models import ChunkedUpload
+
+_PIECE = 64 * 1024
+
+
+def chunk_max_bytes() -> int:
+    return int(getattr(settings, "UPLOADS_CHUNK_MAX_BYTES", 4 * 1024 * 1024))
+
+
+def max_upload_bytes() -> int:
+    return int(getattr(settings, "UPLOADS_MAX_BYTES", 500 * 1024 * 1024))
+
+
+class UploadError(Exception):
+    """
+    Rejected upload operation; `status` is the HTTP status to answer with.
+    """
+
+    def __init__(self, message: str, status: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class ChunkedUploadFile(UploadedFile):
+    """
+    A finalized upload in the shape of a `request.FILES` entry. It exposes
+    `temporary_file_path()`, so FileSystemStorage moves the file into place
+    instead of copying it.
+
+    What storage moves is a hard link to the partial file (a copy where links
+    are unsupported), never the partial itself: the claim is part of the
+    caller's transaction, and if that rolls back the upload must still be whole
+    for the token to be used again. The partial is removed on commit.
+    """
+
+    def __init__(self, upload: ChunkedUpload):
+        self.upload = upload
+        self._path = f"{upload.partial_path()}.{secrets.token_hex(8)}"
+        try:
+            os.link(upload.partial_path(), self._path)
+        except OSError:
+            shutil.copyfile(upload.partial_path(), self._path)
+        # Claim time, for `stale_claim_links` (a link shares the partial's mtime).
+        os.utime(self._path)
+        # Opened on demand (`open()`, `chunks()`), so no handle outlives its use.
+        super().__init__(None, upload.filename, upload.content_type, upload.size)
+
+    def temporary_file_path(self) -> str:
+        return self._path
+
+    def open(self, mode="rb"):
+        self._close_handle()
+        self.file = open(self._path, mode)
+        return self
+
+    def chunks(self, chunk_size=None):
+        with open(self._path, "rb") as fh:
+            yield from File(fh).chunks(chunk_size)
+
+    def _close_handle(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        self._close_handle()
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            # Already moved into place by the storage.
+            pass
+
+
+def create_upload(owner, *, filename: str, size: int, content_type: str = "", sha256: str = "") -> ChunkedUpload:
+    filename = os.path.basename(filename or "").strip()[:255] or "unnamed"
+    if size <= 0:
+        raise UploadError("Upload size must be positive.")
+    if size > max_upload_bytes():
+        raise UploadError("File too large.", status=413)
+    sha256 = (sha256 or "").strip().lower()
+    if sha256 and (len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256)):
+        raise UploadError("sha256 must be 64 hex characters.")
+
+    upload = ChunkedUpload(
+        owner=owner, filename=filename, content_type=(content_type or "")[:255], size=size, sha256=sha256
+    )
+    os.makedirs(os.path.dirname(upload.partial_path()), exist_ok=True)
+    with open(upload.partial_path(), "wb"):
+        pass
+    upload.save()
+    return upload
+
+
+def _check_chunk_checksum(header: str, digest: bytes) -> None:
+    # tus-style "Upload-Checksum: sha256 <base64 digest>"
+    algorithm, _, value = (header or "").strip().partition(" ")
+    if algorithm.lower() != "sha256":
+        raise UploadError("Only sha256 chunk checksums are supported.")
+    try:
+        expected = base64.b64decode(value.strip(), validate=True)
+    except ValueError:
+        raise UploadError("Malformed chunk checksum.")
+    if expected != digest:
+        raise UploadError("Chunk checksum mismatch.", status=460)
+
+
+def append_chunk(upload_id, owner, *, offset: int, length: int, stream, checksum: str = "") -> int:
+    """
+    Write `length` bytes read from `stream` at `offset`; returns the new offset.
+    The offset must be the upload's current one (409 with the real offset otherwise).
+    """
+    with transaction.atomic():
+        # Row lock: two tabs resuming the same upload can't interleave chunks.
+        upload = ChunkedUpload.objects.select_for_update().filter(id=upload_id, owner=owner).first()
+        if upload is None:
+            raise UploadError("Upload not found.", status=404)
+        if upload.status != ChunkedUpload.STATUS_UPLOADING:
+            raise UploadError("Upload is already finalized.", status=409, offset=upload.offset)
+        if offset != upload.offset:
+            raise UploadError("Offset does not match the stored data.", status=409, offset=upload.offset)
+        if length <= 0:
+            raise UploadError("Empty chunk.")
+        if length > chunk_max_bytes():
+            raise UploadError(f"Chunks are limited to {chunk_max_bytes()} bytes.", status=413)
+        if upload.offset + length > upload.size:
+            raise UploadError("Chunk runs past the declared size.", status=413)
+
+        digest = hashlib.sha256()
+        written = 0
+        with open(upload.partial_path(), "r+b") as fh:
+            # Anything past the offset is left over from a chunk that never completed.
+            fh.seek(upload.offset)
+            fh.truncate()
+            while written < length:
+                piece = stream.read(min(_PIECE, length - written))
+                if not piece:
+                    break
+                fh.write(piece)
+                digest.update(piece)
+                written += len(piece)
+            try:
+                if written != length:
+                    raise UploadError("Chunk was shorter than its Content-Length.", offset=upload.offset)
+                if checksum:
+                    _check_chunk_checksum(checksum, digest.digest())
+            except UploadError as exc:
+                fh.truncate(upload.offset)
+                exc.offset = upload.offset
+                raise
+            fh.flush()
+            os.fsync(fh.fileno())
+
+        upload.offset += written
+        upload.save(update_fields=["offset", "updated_at"])
+    return upload.offset
+
+
+def finalize_upload(upload_id, owner) -> ChunkedUpload:
+    """
+    Check the upload is whole (and matches its SHA-256, if declared) and issue its token.
+    Finalizing twice returns the same token.
+    """
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().filter(id=upload_id, owner=owner).first()
+        if upload is None:
+            raise UploadError("Upload not found.", status=404)
+        if upload.status == ChunkedUpload.STATUS_COMPLETE:
+            return upload
+        if upload.status != ChunkedUpload.STATUS_UPLOADING:
+            raise UploadError("Upload was already used.", status=409)
+        if upload.offset != upload.size:
+            raise UploadError("Upload is incomplete.", status=409, offset=upload.offset)
+        if upload.sha256:
+            digest = hashlib.sha256()
+            with open(upload.partial_path(), "rb") as fh:
+                for piece in iter(lambda: fh.read(1024 * 1024), b""):
+                    digest.update(piece)
+            if digest.hexdigest() != upload.sha256:
+                raise UploadError("File checksum mismatch.", status=460)
+
+        upload.status = ChunkedUpload.STATUS_COMPLETE
+        upload.token = secrets.token_urlsafe(32)
+        upload.save(update_fields=["status", "token", "updated_at"])
+    return upload
+
+
+def _remove_partial(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard_upload(upload: ChunkedUpload) -> None:
+    _remove_partial(upload.partial_path())
+    upload.delete()
+
+
+def stale_claim_links(before) -> List[str]:
+    """
+    Paths of claim links (see `ChunkedUploadFile`) last modified before `before`
+    that storage never moved, e.g. because the send failed first.
+    """
+    directory = os.path.join(settings.MEDIA_ROOT, "uploads", "partial")
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return []
+    cutoff = before.timestamp()
+    return [
+        e.path for e in entries
+        if not e.name.endswith(".part") and e.is_file() and e.stat().st_mtime < cutoff
+    ]
+
+
+def claim_uploads(owner, tokens, max_bytes: Optional[int] = None) -> List[ChunkedUploadFile]:
+    """
+    Exchange upload tokens for file objects usable wherever a `request.FILES`
+    entry is. Each token works once and only for the user who uploaded it;
+    a file over `max_bytes` is rejected before any token is used up.
+
+    The claim joins the caller's transaction: on rollback the tokens are valid
+    again, and the partial files are only removed once it commits.
+    """
+    tokens = list(dict.fromkeys(t.strip() for t in tokens or [] if t and t.strip()))
+    if not tokens:
+        return []
+    with transaction.atomic():
+        uploads = {
+            u.token: u
+            for u in ChunkedUpload.objects.select_for_update().filter(
+                owner=owner, token__in=tokens, status=ChunkedUpload.STATUS_COMPLETE
+            )
+        }
+        if len(uploads) != len(tokens):
+            raise UploadError("Unknown or already used upload token.")
+        if max_bytes is not None and any(u.size > max_bytes for u in uploads.values()):
+            raise UploadError(f"File too large (max {max_bytes // (1024 * 1024)}MB).")
+        ChunkedUpload.objects.filter(id__in=[u.id for u in uploads.values()]).update(
+            status=ChunkedUpload.STATUS_CONSUMED
+        )
+        # Linked before the removal below can run (at once, outside a transaction).
+        files = [ChunkedUploadFile(uploads[t]) for t in tokens]
+        for upload in uploads.values():
+            transaction.on_commit(partial(_remove_partial, upload.partial_path()))
+    return files
+
+
+def files_from_request(request, field: str, token_field: str = "upload_tokens", max_bytes: Optional[int] = None) -> list:
+    """
+    `request.FILES.getlist(field)` plus the finalized chunked uploads named in `token_field`.
+    Raises UploadError for a bad token, or for a file of either kind over `max_bytes`.
+    """
+    files = request.FILES.getlist(field)
+    if max_bytes is not None and any(f.size > max_bytes for f in files):
+        raise UploadError(f"File too large (max {max_bytes // (1024 * 1024)}MB).")
+    return files + claim_uploads(request.user, request.POST.getlist(token_field), max_bytes=max_bytes)
@@ -0,0 +1,67 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import RequestFactory, TestCase, override_settings
+
+from account.models import User
+
+from .models import ChunkedUpload
+from .services import UploadError, append_chunk, claim_uploads, create_upload, files_from_request, finalize_upload
+
+
+def finished_upload(owner, data=b'hello world', filename='notes.txt'):
+    upload = create_upload(owner, filename=filename, size=len(data))
+    append_chunk(upload.id, owner, offset=0, length=len(data), stream=io.BytesIO(data))
+    return finalize_upload(upload.id, owner)
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+
+
+class ClaimUploadsTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('student@example.com', 'student', 'pw', role='STUDENT')
+
+    def test_rolled_back_claim_keeps_the_upload(self):
+        upload = finished_upload(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                (f,) = claim_uploads(self.user, [upload.token])
+                raise RuntimeError('send failed')
+        f.close()
+
+        self.assertTrue(os.path.exists(upload.partial_path()))
+        with self.captureOnCommitCallbacks(execute=True):
+            (f,) = claim_uploads(self.user, [upload.token])
+        self.assertEqual(b''.join(f.chunks()), b'hello world')
+        self.assertFalse(os.path.exists(upload.partial_path()))
+        f.close()
+
+    def test_oversized_upload_is_rejected_before_use(self):
+        upload = finished_upload(self.user)
+        with self.assertRaises(UploadError):
+            claim_uploads(self.user, [upload.token], max_bytes=4)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, ChunkedUpload.STATUS_COMPLETE)
+
+    def test_request_limit_covers_multipart_files_too(self):
+        upload = finished_upload(self.user)
+        request = RequestFactory().post('/', {
+            'files': SimpleUploadedFile('big.txt', b'x' * 32),
+            'upload_tokens': upload.token,
+        })
+        request.user = self.user
+        with self.assertRaises(UploadError):
+            files_from_request(request, 'files', max_bytes=16)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, ChunkedUpload.STATUS_COMPLETE)
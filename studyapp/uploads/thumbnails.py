@@ -0,0 +1,156 @@
+"""
+Background thumbnail/preview derivation for uploaded images.
+
+Saving a model listed in SOURCES queues `uploads.imaging.derive` on a process
+pool once the transaction commits, so Pillow never runs inside a request.
+Derivatives are WebP files stored next to the original. Serializers expose them
+through `thumb_url` / `preview_url`, which return None until the file exists,
+and clients then fall back to the original.
+
+THUMBNAILS_MODE: "pool" (default), "inline" (derive in the saving thread;
+handy for scripts) or "off".
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .imaging import VARIANTS, derivative_path, derive
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tif", ".tiff"})
+
+# (model label, file field) pairs whose images get derivatives.
+SOURCES = (
+    ("study_messages.MessageAttachment", "file"),
+    ("thread.ThreadAttachment", "file"),
+    ("assingment.AssignmentFile", "file"),
+    ("homework.HomeworkFile", "file"),
+    (settings.AUTH_USER_MODEL, "profile_picture"),
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _mode() -> str:
+    return getattr(settings, "THUMBNAILS_MODE", "pool")
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded ASGI/WSGI worker can deadlock the child.
+            _executor = ProcessPoolExecutor(
+                max_workers=max(1, int(getattr(settings, "THUMBNAILS_WORKERS", 2))),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _local_path(field_file) -> Optional[str]:
+    if not field_file or not field_file.name:
+        return None
+    if os.path.splitext(field_file.name)[1].lower() not in IMAGE_EXTENSIONS:
+        return None
+    try:
+        return field_file.path
+    except NotImplementedError:
+        # Remote storage: no local file to derive from.
+        return None
+
+
+def derivative_url(field_file, variant: str) -> Optional[str]:
+    path = _local_path(field_file)
+    if not path or not os.path.exists(derivative_path(path, variant)):
+        return None
+    return field_file.storage.url(f"{field_file.name}.{variant}.webp")
+
+
+def thumb_url(field_file) -> Optional[str]:
+    return derivative_url(field_file, "thumb")
+
+
+def preview_url(field_file) -> Optional[str]:
+    return derivative_url(field_file, "preview")
+
+
+def needs_derivatives(field_file) -> bool:
+    path = _local_path(field_file)
+    if not path or not os.path.exists(path):
+        return False
+    original = os.path.getmtime(path)
+    for variant in VARIANTS:
+        out = derivative_path(path, variant)
+        if not os.path.exists(out) or os.path.getmtime(out) < original:
+            return True
+    return False
+
+
+def _report(path: str, future: Future) -> None:
+    exc = future.exception()
+    if exc is not None:
+        # Unreadable or not really an image: the original stays the only version.
+        logger.info("No derivatives for %s: %s", path, exc)
+
+
+def enqueue(field_file, *, force: bool = False) -> Optional[Future]:
+    """
+    Queue derivation for one stored file; returns the Future, or None when
+    there is nothing to do (not an image, already derived, disabled).
+    """
+    mode = _mode()
+    if mode == "off" or not (force or needs_derivatives(field_file)):
+        return None
+    path = _local_path(field_file)
+    if path is None:
+        return None
+    if mode == "inline":
+        future = Future()
+        try:
+            future.set_result(derive(path))
+        except Exception as exc:
+            future.set_exception(exc)
+    else:
+        future = _pool().submit(derive, path)
+    future.add_done_callback(lambda f: _report(path, f))
+    return future
+
+
+def _enqueue_quietly(field_file) -> None:
+    # Derivatives are an optimization; never fail the write that triggered them.
+    try:
+        enqueue(field_file)
+    except Exception:
+        logger.warning("Could not queue derivatives for %s", field_file.name, exc_info=True)
+
+
+def _receiver(field_name: str):
+    def _on_save(sender, instance, **kwargs):
+        field_file = getattr(instance, field_name, None)
+        if not field_file or not field_file.name or kwargs.get("raw"):
+            return
+        transaction.on_commit(lambda: _enqueue_quietly(field_file))
+
+    return _on_save
+
+
+def connect_signals() -> None:
+    for label, field_name in SOURCES:
+        post_save.connect(
+            _receiver(field_name),
+            sender=apps.get_model(label),
+            weak=False,
+            dispatch_uid=f"uploads.thumbnails:{label}.{field_name}",
+        )
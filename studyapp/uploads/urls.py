@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'uploads'
+
+urlpatterns = [
+    path('api/', views.create_upload_api, name='create'),
+    path('api/<uuid:upload_id>/', views.upload_detail_api, name='detail'),
+    path('api/<uuid:upload_id>/finalize/', views.finalize_upload_api, name='finalize'),
+]
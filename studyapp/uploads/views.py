@@ -0,0 +1,131 @@
+import json
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods, require_POST
+
+from .models import ChunkedUpload
+from .services import (
+    UploadError,
+    append_chunk,
+    chunk_max_bytes,
+    create_upload,
+    discard_upload,
+    finalize_upload,
+)
+
+
+def _serialize_upload(upload):
+    return {
+        'id': str(upload.id),
+        'filename': upload.filename,
+        'content_type': upload.content_type,
+        'size': upload.size,
+        'offset': upload.offset,
+        'status': upload.status,
+        'chunk_size': chunk_max_bytes(),
+    }
+
+
+def _error(exc):
+    body = {'success': False, 'error': str(exc)}
+    if exc.offset is not None:
+        body['offset'] = exc.offset
+    response = JsonResponse(body, status=exc.status)
+    if exc.offset is not None:
+        response['Upload-Offset'] = str(exc.offset)
+    return response
+
+
+@login_required
+@require_POST
+def create_upload_api(request):
+    """
+    Start a chunked upload. Fields (form or JSON): filename, size, content_type,
+    sha256 (optional, hex digest of the whole file).
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+    else:
+        data = request.POST
+    try:
+        size = int(data.get('size') or 0)
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'error': 'Invalid size'}, status=400)
+    try:
+        upload = create_upload(
+            request.user,
+            filename=data.get('filename') or '',
+            size=size,
+            content_type=data.get('content_type') or '',
+            sha256=data.get('sha256') or '',
+        )
+    except UploadError as exc:
+        return _error(exc)
+    response = JsonResponse({'success': True, 'upload': _serialize_upload(upload)}, status=201)
+    response['Upload-Offset'] = '0'
+    return response
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PATCH', 'DELETE'])
+def upload_detail_api(request, upload_id):
+    """
+    GET/HEAD: current offset (to resume). PATCH: append the request body at
+    the `Upload-Offset` header, optionally verified with
+    `Upload-Checksum: sha256 <base64>`. DELETE: abandon the upload.
+    """
+    if request.method == 'PATCH':
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Upload-Offset and Content-Length are required'}, status=400)
+        try:
+            new_offset = append_chunk(
+                upload_id,
+                request.user,
+                offset=offset,
+                length=length,
+                stream=request,
+                checksum=request.headers.get('Upload-Checksum', ''),
+            )
+        except UploadError as exc:
+            return _error(exc)
+        response = JsonResponse({'success': True, 'offset': new_offset})
+        response['Upload-Offset'] = str(new_offset)
+        return response
+
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, owner=request.user)
+    if request.method == 'DELETE':
+        if upload.status == ChunkedUpload.STATUS_CONSUMED:
+            return JsonResponse({'success': False, 'error': 'Upload was already used'}, status=409)
+        discard_upload(upload)
+        return JsonResponse({'success': True})
+
+    response = JsonResponse({'success': True, 'upload': _serialize_upload(upload)})
+    response['Upload-Offset'] = str(upload.offset)
+    response['Upload-Length'] = str(upload.size)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@login_required
+@require_POST
+def finalize_upload_api(request, upload_id):
+    """
+    Complete an upload; returns the token to pass as `upload_tokens` to the send/submit APIs.
+    """
+    try:
+        upload = finalize_upload(upload_id, request.user)
+    except UploadError as exc:
+        return _error(exc)
+    return JsonResponse({
+        'success': True,
+        'token': upload.token,
+        'upload': _serialize_upload(upload),
+    })